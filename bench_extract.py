@@ -0,0 +1,97 @@
+import re
+import json
+import time
+import argparse
+
+from bs4 import BeautifulSoup
+
+from product_extract import extract_product, normalize, product_fields
+
+# 상품 페이지 파싱 마이크로벤치마크
+#   legacy: BeautifulSoup 트리 2번 + __NEXT_DATA__ json.loads 2번 (기존 zcx/sel 경로)
+#   fast  : product_extract.extract_product (트리 없이 한 번만 디코딩)
+# 실제 페이지를 저장해 둔 html 파일을 --html 로 넘기면 그걸로 측정하고, 없으면 합성 페이지를 만든다.
+
+
+def legacy_extract(html: str):
+    soup = BeautifulSoup(html, "html.parser")
+    soup = BeautifulSoup(html, "html.parser")  # scrape_product_fields 안의 재파싱
+    node = soup.find("script", id="__NEXT_DATA__", type="application/json")
+    if node:
+        info = product_fields(json.loads(node.text)["props"]["pageProps"]["meta"]["data"])
+        d = json.loads(node.text)["props"]["pageProps"]["meta"]["data"]
+        gallery = [normalize(x["imageUrl"]) for x in d.get("goodsImages", []) if "imageUrl" in x]
+    else:
+        m = re.search(r"window\.__MSS__\.product\.state\s*=\s*({.*?});", html, re.S)
+        d = json.loads(m.group(1))
+        info = product_fields(d)
+        gallery = [normalize(x["imageUrl"]) for x in d.get("goodsImages", []) if "imageUrl" in x]
+    meta = soup.find("meta", attrs={"property": "og:image"})
+    thumbnail = [normalize(meta["content"])] if meta and meta.get("content") else []
+    return info, thumbnail + gallery
+
+
+def synth_page(n_blocks: int = 400, window_state: bool = False) -> str:
+    d = {
+        "goodsNo": 3456789,
+        "goodsNm": "테스트 상품",
+        "goodsNmEng": "test product",
+        "styleNo": "AB-1234",
+        "sex": ["남성", "여성"],
+        "brandInfo": {"brand": "brand", "brandName": "브랜드"},
+        "category": {"categoryDepth1Name": "상의", "categoryDepth2Name": "티셔츠"},
+        "goodsPrice": {"salePrice": 39000},
+        "goodsReview": {"totalCount": 120, "satisfactionScore": 4.8},
+        "goodsMaterial": {"materials": [{"name": "두께", "items": [{"name": "보통", "isSelected": True}]}]},
+        "goodsImages": [{"imageUrl": f"/images/goods_img/20240101/3456789/3456789_{k}_500.jpg"} for k in range(12)],
+        "goodsContents": "<p>상세 설명 {}; </p>" * 50,
+    }
+    body = "".join(
+        f'<div class="sc-item-{k}"><span>item {k}</span><a href="/products/{k}">link</a><img src="//image.msscdn.net/{k}.jpg"></div>'
+        for k in range(n_blocks)
+    )
+    head = '<meta property="og:image" content="//image.msscdn.net/images/goods_img/20240101/3456789/3456789_500.jpg">'
+    if window_state:
+        script = f"<script>window.__MSS__.product.state = {json.dumps(d, ensure_ascii=False)};\nwindow.__MSS__.ready = true;</script>"
+    else:
+        payload = {"props": {"pageProps": {"meta": {"data": d}}}}
+        script = f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(payload, ensure_ascii=False)}</script>'
+    return f"<html><head>{head}</head><body>{body}{script}</body></html>"
+
+
+def bench(fn, html, repeat: int) -> float:
+    fn(html)
+    st = time.perf_counter()
+    for _ in range(repeat):
+        fn(html)
+    return (time.perf_counter() - st) / repeat
+
+
+def main(html_files, repeat: int):
+    if html_files:
+        pages = [(path, open(path, "r", encoding="utf-8").read()) for path in html_files]
+    else:
+        pages = [("synthetic/__NEXT_DATA__", synth_page()), ("synthetic/window_state", synth_page(window_state=True))]
+
+    for name, html in pages:
+        fast = extract_product(html.encode("utf-8"))
+        t_fast = bench(extract_product, html.encode("utf-8"), repeat)
+        try:
+            legacy = legacy_extract(html)
+        except ValueError as e:
+            # 비탐욕 {.*?}; 정규식이 JSON 내부의 "};" 에서 잘리는 경우
+            print(f"{name} ({len(html) / 1024:.0f} KB) | legacy 파싱 실패: {e} | fast {t_fast * 1e3:.3f} ms")
+            continue
+        same = legacy == fast
+        t_legacy = bench(legacy_extract, html, repeat)
+        print(f"{name} ({len(html) / 1024:.0f} KB) | legacy {t_legacy * 1e3:.2f} ms | fast {t_fast * 1e3:.3f} ms "
+              f"| x{t_legacy / t_fast:.1f} | same={same}")
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="상품 페이지 파싱 마이크로벤치마크")
+    p.add_argument("--html", nargs="*", default=[], help="저장해 둔 상품 페이지 html 파일들")
+    p.add_argument("--repeat", type=int, default=50)
+    args = p.parse_args()
+
+    main(args.html, args.repeat)
@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import argparse
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from storage_backend import get_bucket
+from upload_manifest import UploadManifest, get_manifest
+
+# 버킷 내부 오브젝트 일괄 복사 (서버 사이드 copy).
+#   1) 원본 prefix (들) 를 한 번만 목록 조회해서 "확장자 없는 경로 → 실제 이름/크기/md5" 를 만든다
+#      (.jpg 로 시도했다가 실패하면 .png 로 다시 시도하는 왕복이 없어진다)
+#   2) 복사는 storage_backend 공용 스레드 풀에서 batch 단위로 동시에
+#   3) 끝난 대상은 upload manifest 에 기록 → 중간에 끊겨도 다시 돌리면 남은 것만 복사
+#      add() 가 돌려주는 경로는 "예약된" 경로다. 실제로 있는지는 flush() 뒤 succeeded() 로 거른다
+#   4) batch 마다 처리량(개/s, MB/s) 출력
+
+class SourceIndex:
+    def __init__(self, bucket, prefix: Union[str, Iterable[str]], cache_path: Optional[str] = None):
+        """
+        prefix 는 하나 또는 여러 개 (여러 개면 동시에 조회해서 합친다).
+        cache_path 가 있으면 목록을 파일로 남겨 재시작 때 다시 조회하지 않는다.
+        """
+        prefixes = [prefix] if isinstance(prefix, str) else sorted(set(prefix))
+        self.by_logical: Dict[str, Tuple[str, int, Optional[str]]] = {}
+        t0 = time.time()
+        rows = None
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, "r") as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+        if rows is None:
+            rows = [list(r) for r in bucket.list_meta_many(prefixes)]
+            if cache_path:
+                with open(cache_path + ".tmp", "w") as f:
+                    f.write("".join(json.dumps(r) + "\n" for r in rows))
+                os.replace(cache_path + ".tmp", cache_path)
+        for name, size, md5 in rows:
+            self.by_logical.setdefault(os.path.splitext(name)[0], (name, size, md5))
+        where = prefixes[0] if len(prefixes) == 1 else f"{{{len(prefixes)} prefixes}}"
+        print(f"[LIST] gs://{bucket.name}/{where} → {len(rows)}개 ({time.time() - t0:.1f}s)")
+
+    def resolve(self, path: str) -> Optional[Tuple[str, int, Optional[str]]]:
+        """확장자가 틀려도(.jpg ↔ .png) 같은 논리 경로의 실제 오브젝트를 찾는다."""
+        return self.by_logical.get(os.path.splitext(path)[0])
+
+
+class CopyEngine:
+    def __init__(self, bucket, index: SourceIndex, manifest: Optional[UploadManifest] = None,
+                 batch_size: int = 500, keep_ext: bool = True):
+        self.bucket = bucket
+        self.index = index
+        self.manifest = manifest if manifest is not None else get_manifest()
+        self.batch_size = batch_size
+        self.keep_ext = keep_ext
+        self.pending: List[Tuple[str, str, int, Optional[str]]] = []
+        self.stats = {"copied": 0, "skipped": 0, "missing": 0, "failed": 0, "bytes": 0}
+        self.failures: List[Dict] = []
+        self.done: Set[str] = set()  # 복사됐거나 manifest 상 이미 있는 대상 경로
+        self.t0 = time.time()
+        self._lock = threading.Lock()
+
+    def add(self, src: str, dst: str) -> Optional[str]:
+        """
+        복사 한 건을 예약하고 실제 대상 경로를 돌려준다 (원본이 없으면 None).
+        keep_ext 면 dst 의 확장자를 원본의 실제 확장자로 맞춘다.
+        """
+        hit = self.index.resolve(src)
+        if hit is None:
+            with self._lock:
+                self.stats["missing"] += 1
+                self.failures.append({"src": src, "dst": dst, "error": "source not found"})
+            return None
+        name, size, md5 = hit
+        if self.keep_ext:
+            dst = os.path.splitext(dst)[0] + os.path.splitext(name)[1]
+        if self.manifest:
+            row = self.manifest.get(self.bucket.name, dst)
+            if row and (md5 is None or row["checksum"] in (None, md5)):
+                with self._lock:
+                    self.stats["skipped"] += 1
+                    self.done.add(dst)
+                return dst
+        with self._lock:
+            self.pending.append((name, dst, size, md5))
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self.flush()
+        return dst
+
+    def add_many(self, pairs: Iterable[Tuple[str, str]]) -> List[Optional[str]]:
+        return [self.add(s, d) for s, d in pairs]
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, self.pending = self.pending, []
+        if not batch:
+            return
+        meta = {(name, dst): (size, md5) for name, dst, size, md5 in batch}
+        t = time.time()
+        for src, dst, err in self.bucket.copy_many([(name, dst) for name, dst, _, _ in batch]):
+            size, md5 = meta[(src, dst)]
+            if err is None:
+                self.stats["copied"] += 1
+                self.stats["bytes"] += size or 0
+                self.done.add(dst)
+                if self.manifest:
+                    self.manifest.record(self.bucket.name, dst, size, md5, source_url=f"gs://{self.bucket.name}/{src}")
+            else:
+                self.stats["failed"] += 1
+                self.failures.append({"src": src, "dst": dst, "error": str(err)})
+        dt = max(time.time() - t, 1e-6)
+        print(f"[COPY] batch {len(batch)}개 {len(batch) / dt:.0f}/s | {self.report_line()}")
+
+    def succeeded(self, dsts: Iterable[Optional[str]]) -> List[str]:
+        """add() 가 돌려준 경로 중 실제로 복사가 끝난 것만 (flush() 뒤에 불러야 의미가 있다)."""
+        return [d for d in dsts if d and d in self.done]
+
+    def report_line(self) -> str:
+        s = self.stats
+        el = max(time.time() - self.t0, 1e-6)
+        return (f"copied={s['copied']} skipped={s['skipped']} missing={s['missing']} failed={s['failed']} | "
+                f"{s['copied'] / el:.0f}/s, {s['bytes'] / el / 1e6:.1f}MB/s")
+
+    def close(self, report_path: Optional[str] = None) -> Dict:
+        self.flush()
+        report = {**self.stats, "elapsed_sec": round(time.time() - self.t0, 1), "failures": self.failures}
+        if report_path:
+            with open(report_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[COPY-DONE] {self.report_line()}")
+        return report
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="버킷 내부 일괄 복사 (plan: 한 줄에 {\"src\":..., \"dst\":...})")
+    p.add_argument("--plan", type=str, required=True, help="복사 계획 JSONL")
+    p.add_argument("--bucket", type=str, default="vton-mss-snap")
+    p.add_argument("--src_prefix", type=str, default="images/", help="원본 목록 조회 prefix (한 번만 조회)")
+    p.add_argument("--listing_cache", type=str, default=None, help="목록 캐시 파일 (재시작 시 재조회 생략)")
+    p.add_argument("--batch_size", type=int, default=500)
+    p.add_argument("--report", type=str, default="./copy_report.json")
+    args = p.parse_args()
+
+    bucket = get_bucket(args.bucket)
+    engine = CopyEngine(bucket, SourceIndex(bucket, args.src_prefix, args.listing_cache), batch_size=args.batch_size)
+    with open(args.plan, "r") as f:
+        for line in f:
+            if line.strip():
+                d = json.loads(line)
+                engine.add(d["src"], d["dst"])
+    engine.close(args.report)
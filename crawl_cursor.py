@@ -0,0 +1,135 @@
+import os
+import json
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+from record_sink import JsonlSink
+
+
+class CrawlCursor:
+    """
+    id 구간 [start, end) 크롤의 재시작 지점.
+
+    - done_upto : 여기까지는 빈틈없이 처리 완료 (성공/실패 무관)
+    - done_above: done_upto 이후에 순서와 상관없이 먼저 끝난 id 들 (async/드라이버 풀)
+    - inflight  : 요청을 보냈지만 아직 결과를 못 받은 id 들. 재시작하면 다시 가져온다.
+    {prefix}.cursor.json 으로 원자적으로(tmp → rename) 저장한다.
+    before_save 가 있으면 저장 직전에 호출한다 (결과 sink 를 디스크에 먼저 내려서 cursor 가 앞서가지 않게).
+    """
+
+    def __init__(self, path: str, start: int, end: int, save_every: int = 500,
+                 before_save: Optional[Callable[[], None]] = None):
+        self.path = path
+        self.start = start
+        self.end = end
+        self.save_every = save_every
+        self.before_save = before_save
+
+        self.done_upto = start - 1
+        self.done_above = set()
+        self.inflight = set()
+        self.resumed = False
+        self._dirty = 0
+
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                state = json.load(f)
+            if (state["start"], state["end"]) != (start, end):
+                raise ValueError(f"cursor {path} 는 [{state['start']}, {state['end']}) 구간용입니다")
+            self.done_upto = state["done_upto"]
+            self.done_above = set(state.get("done_above", []))
+            self.inflight = set(state.get("inflight", []))
+            self.resumed = True
+
+    def is_done(self, pid: int) -> bool:
+        return pid <= self.done_upto or pid in self.done_above
+
+    def mark_started(self, pid: int) -> None:
+        self.inflight.add(pid)
+
+    def mark_done(self, pid: int, autosave: bool = True) -> None:
+        self.inflight.discard(pid)
+        if pid > self.done_upto:
+            self.done_above.add(pid)
+            while self.done_upto + 1 in self.done_above:
+                self.done_above.remove(self.done_upto + 1)
+                self.done_upto += 1
+        self._dirty += 1
+        if autosave and self._dirty >= self.save_every:
+            self.save()
+
+    def pending(self) -> Iterator[int]:
+        # 순회 중에 mark_done 으로 done_upto 가 밀려도 다시 내보내지 않도록 매번 is_done 으로 확인
+        for pid in range(self.done_upto + 1, self.end):
+            if not self.is_done(pid):
+                yield pid
+
+    def claim_iter(self, ids: Optional[Iterable[int]] = None) -> Iterator[int]:
+        """꺼내가는 순간 inflight 로 기록하면서 미처리 id 를 흘려준다."""
+        for pid in (self.pending() if ids is None else ids):
+            self.mark_started(pid)
+            yield pid
+
+    def remaining(self) -> int:
+        return (self.end - self.done_upto - 1) - len(self.done_above)
+
+    def save(self) -> None:
+        if self.before_save:
+            self.before_save()
+        state = {
+            "start": self.start,
+            "end": self.end,
+            "done_upto": self.done_upto,
+            "done_above": sorted(self.done_above),
+            "inflight": sorted(self.inflight),
+        }
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._dirty = 0
+
+
+def open_resumable_run(prefix: str, start: int, end: int, record_id: Callable[[dict], int],
+                       upload: Optional[Callable[[str], None]] = None,
+                       restore: Optional[Callable[[], None]] = None,
+                       **sink_kwargs) -> Tuple[JsonlSink, CrawlCursor]:
+    """
+    JsonlSink + CrawlCursor 를 같은 prefix 로 묶어서 연다.
+
+    세그먼트가 확정될 때마다 cursor 를 먼저 저장하고 세그먼트 → cursor 순으로 업로드하므로,
+    원격에 남은 cursor 는 항상 원격 세그먼트들과 짝이 맞는다.
+    로컬에 아무것도 없으면 restore() 로 원격 세그먼트/cursor 를 먼저 내려받는다.
+    """
+    cursor_path = f"{prefix}.cursor.json"
+    if restore and not os.path.exists(cursor_path):
+        try:
+            restore()
+        except Exception as e:
+            print(f"[WARN] restore {prefix} failed: {e}")
+
+    cursor = CrawlCursor(cursor_path, start, end)
+
+    def on_seal(path):
+        cursor.save()
+        if upload:
+            upload(path)
+            upload(cursor_path)
+
+    sink = JsonlSink(prefix, upload=on_seal, **sink_kwargs)
+    # done 으로 기록되는 id 의 레코드는 cursor 보다 먼저 fsync 되어 있어야 한다
+    cursor.before_save = sink.flush
+
+    # cursor 저장 이후에 sink 에 들어간 레코드도 완료로 반영 (중복 수집 방지)
+    if sink.count:
+        for rec in sink:
+            pid = record_id(rec)
+            if start <= pid < end:
+                cursor.mark_done(pid, autosave=False)
+        cursor.resumed = True
+    if cursor.resumed:
+        print(f"[RESUME] {prefix}: {sink.count}개 레코드 재사용, done_upto={cursor.done_upto}, "
+              f"inflight {len(cursor.inflight)}개 재시도, 남은 id {cursor.remaining()}개")
+        cursor.inflight.clear()
+    return sink, cursor
@@ -0,0 +1,201 @@
+import re
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, Iterable, List, Optional
+
+# 카테고리/브랜드 목록 페이지에서 실제 상품번호(goodsNo)를 모아 frontier 를 만든다.
+# 목록은 JSON API 든 HTML 이든 상관없이 "goodsNo":123 / /products/123 패턴만 뽑는다.
+
+LISTING_BASE = "https://api.musinsa.com"
+CATEGORY_LISTING = "{base}/api2/dp/v1/plp/goods?gf=A&sortCode=NEW&category={code}&size=60&page={page}&caller=CATEGORY"
+BRAND_LISTING = "{base}/api2/dp/v1/plp/goods?gf=A&sortCode=NEW&brand={code}&size=60&page={page}&caller=BRAND"
+
+_GOODS_NO = re.compile(r'"goodsNo"\s*:\s*"?(\d{4,9})')
+_PRODUCT_HREF = re.compile(r'/products/(\d{4,9})')
+
+
+def extract_goods_nos(body: str) -> List[int]:
+    ids = [int(x) for x in _GOODS_NO.findall(body)]
+    ids += [int(x) for x in _PRODUCT_HREF.findall(body)]
+    return list(dict.fromkeys(ids))
+
+
+class Frontier:
+    """순서를 유지하는 중복 제거 id 목록. path 가 있으면 한 줄에 id 하나씩 append 로 저장한다."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._ids: Dict[int, None] = {}
+        self._fh = None
+        if path:
+            try:
+                with open(path, "r") as f:
+                    for line in f:
+                        if line.strip():
+                            self._ids[int(line)] = None
+            except FileNotFoundError:
+                pass
+            self._fh = open(path, "a")
+
+    def add_many(self, ids: Iterable[int]) -> int:
+        new = [pid for pid in ids if pid not in self._ids]
+        for pid in new:
+            self._ids[pid] = None
+        if self._fh and new:
+            self._fh.write("".join(f"{pid}\n" for pid in new))
+            self._fh.flush()
+        return len(new)
+
+    def __contains__(self, pid: int) -> bool:
+        return pid in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self):
+        return iter(list(self._ids))
+
+    def close(self):
+        if self._fh:
+            self._fh.close()
+            self._fh = None
+
+
+def listing_seeds(categories: Iterable[str] = (), brands: Iterable[str] = (), base: str = LISTING_BASE) -> List[str]:
+    seeds = [CATEGORY_LISTING.replace("{base}", base).replace("{code}", c) for c in categories if c]
+    seeds += [BRAND_LISTING.replace("{base}", base).replace("{code}", b) for b in brands if b]
+    return seeds
+
+
+def discover(seeds: Iterable[str], session, frontier: Frontier, max_pages: int = 50,
+             stop_after_empty: int = 1, delay: float = 0.2) -> Frontier:
+    """
+    seed 마다 page=1.. 를 따라가며 goodsNo 를 frontier 에 모은다.
+    그 seed 에서 처음 보는 id 가 안 나오는 페이지(빈 페이지, 같은 목록 반복)가 stop_after_empty 번
+    이어지면 그 seed 는 끝. 다른 seed 가 이미 모은 id 와 겹치는 것만으로는 멈추지 않는다
+    (브랜드 seed 의 앞 페이지가 카테고리 seed 와 겹쳐도 뒤쪽의 그 브랜드만의 상품까지 간다).
+    """
+    for seed in seeds:
+        empty = 0
+        seen = set()
+        for page in range(1, max_pages + 1):
+            url = seed.replace("{page}", str(page))
+            try:
+                r = session.get(url, timeout=15)
+                r.raise_for_status()
+            except Exception as e:
+                print(f"[DISCOVER-ERR] {url} : {e}")
+                break
+            ids = extract_goods_nos(r.text)
+            new = frontier.add_many(ids)
+            fresh = len(set(ids) - seen)
+            seen.update(ids)
+            print(f"[DISCOVER] {url} -> {len(ids)}개, 신규 {new}개 (frontier {len(frontier)})")
+            if fresh == 0:
+                empty += 1
+                if empty >= stop_after_empty:
+                    break
+            else:
+                empty = 0
+            time.sleep(delay)
+    return frontier
+
+
+# ---------- 로컬 stand-in 서버 ----------
+def _standin_ids(code: str, page: int, size: int, pages: int) -> List[int]:
+    if page > pages:
+        return []
+    base = 1000000 + (sum(map(ord, code)) % 97) * 10000
+    start = base + (page - 1) * size
+    return list(range(start, start + size * 3, 3))[:size]
+
+
+def _standin_product_html(pid: int) -> str:
+    d = {
+        "goodsNo": pid,
+        "goodsNm": f"상품 {pid}",
+        "goodsNmEng": f"product {pid}",
+        "styleNo": f"ST-{pid}",
+        "sex": ["남성", "여성"],
+        "brandInfo": {"brand": "standin", "brandName": "스탠드인"},
+        "category": {"categoryDepth1Name": "상의", "categoryDepth2Name": "티셔츠"},
+        "goodsPrice": {"salePrice": 10000 + pid % 1000},
+        "goodsReview": {"totalCount": pid % 50, "satisfactionScore": 4.5},
+        "goodsImages": [{"imageUrl": f"/images/goods_img/20240101/{pid}/{pid}_{k}_500.jpg"} for k in range(3)],
+    }
+    payload = json.dumps({"props": {"pageProps": {"meta": {"data": d}}}}, ensure_ascii=False)
+    return (
+        f'<html><head><meta property="og:image" content="//image.msscdn.net/images/goods_img/20240101/{pid}/{pid}_500.jpg">'
+        f'</head><body><script id="__NEXT_DATA__" type="application/json">{payload}</script></body></html>'
+    )
+
+
+def make_standin_handler(pages: int = 3, size: int = 60):
+    class StandinHandler(BaseHTTPRequestHandler):
+        def _send(self, code: int, body: str, ctype: str):
+            data = body.encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            u = urlparse(self.path)
+            q = parse_qs(u.query)
+            if u.path.startswith("/api2/dp/v1/plp/goods"):
+                code = (q.get("category") or q.get("brand") or [""])[0]
+                page = int((q.get("page") or ["1"])[0])
+                ids = _standin_ids(code, page, size, pages)
+                body = {"data": {"list": [{"goodsNo": pid} for pid in ids],
+                                 "pagination": {"page": page, "totalPages": pages}}}
+                return self._send(200, json.dumps(body), "application/json")
+            m = re.match(r"^/products/(\d+)$", u.path)
+            if m and int(m.group(1)) % 7:
+                return self._send(200, _standin_product_html(int(m.group(1))), "text/html; charset=utf-8")
+            return self._send(404, "not found", "text/plain")
+
+        def log_message(self, *args):
+            pass
+
+    return StandinHandler
+
+
+def serve_standin(port: int = 8765, pages: int = 3, size: int = 60, background: bool = False):
+    """목록 API 와 상품 페이지를 흉내내는 로컬 서버. 상품번호가 7의 배수면 404."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_standin_handler(pages, size))
+    print(f"[STANDIN] http://127.0.0.1:{server.server_address[1]}")
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="목록 페이지 기반 상품번호 수집 / 로컬 stand-in 서버")
+    p.add_argument("--standin", action="store_true", help="stand-in 서버 실행")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--pages", type=int, default=3, help="stand-in 목록 페이지 수")
+    p.add_argument("--categories", type=str, default="", help="쉼표 구분 카테고리 코드 (예: 001,002)")
+    p.add_argument("--brands", type=str, default="", help="쉼표 구분 브랜드 코드")
+    p.add_argument("--listing_base", type=str, default=LISTING_BASE)
+    p.add_argument("--max_pages", type=int, default=50)
+    p.add_argument("--out", type=str, default="frontier.txt")
+    args = p.parse_args()
+
+    if args.standin:
+        serve_standin(args.port, args.pages)
+    else:
+        import requests
+        session = requests.Session()
+        session.headers.update({"User-Agent": "Mozilla/5.0"})
+        frontier = discover(
+            listing_seeds(args.categories.split(","), args.brands.split(","), args.listing_base),
+            session, Frontier(args.out), max_pages=args.max_pages,
+        )
+        frontier.close()
+        print(f"frontier: {len(frontier)}개 → {args.out}")
@@ -0,0 +1,55 @@
+import time
+from typing import Dict, List, Optional
+
+# 무한 스크롤 페이지에서 "아직 보고하지 않은 카드"만 브라우저 안에서 골라 돌려받는다.
+#   - page_source 로 DOM 전체를 직렬화/전송/재파싱하지 않는다 → 스크롤 깊이와 상관없이 한 번에 새 카드만큼만
+#   - 이미 보고한 key(data-key, href 등)는 window 쪽 Set 에 남는다. 새 문서로 이동(driver.get)하면 자연히 초기화
+#   - html=True 면 카드의 outerHTML 조각을, 아니면 key 문자열만 돌려준다
+
+HARVEST_JS = """
+const sel = arguments[0], keyAttr = arguments[1], html = arguments[2];
+const all = window.__harvested = window.__harvested || {};
+const seen = all[sel] = all[sel] || new Set();
+const out = [];
+for (const el of document.querySelectorAll(sel)) {
+  const key = el.getAttribute(keyAttr);
+  if (!key || seen.has(key)) continue;
+  seen.add(key);
+  out.push(html ? el.outerHTML : key);
+}
+return out;
+"""
+
+TEXT_JS = """
+const el = document.querySelector(arguments[0]);
+return el ? el.textContent : null;
+"""
+
+
+class DomHarvester:
+    def __init__(self, driver, selector: str, key_attr: str = "data-key", html: bool = False):
+        self.driver = driver
+        self.selector = selector
+        self.key_attr = key_attr
+        self.html = html
+        self.stats = {"calls": 0, "items": 0, "bytes": 0, "sec": 0.0}
+
+    def harvest(self) -> List[str]:
+        """지난 호출 이후 새로 나타난 카드들 (key 또는 outerHTML)."""
+        t = time.time()
+        out = self.driver.execute_script(HARVEST_JS, self.selector, self.key_attr, self.html) or []
+        self.stats["calls"] += 1
+        self.stats["items"] += len(out)
+        self.stats["bytes"] += sum(len(x) for x in out)
+        self.stats["sec"] += time.time() - t
+        return out
+
+    def text(self, css: str) -> Optional[str]:
+        """css 에 맞는 첫 요소의 텍스트 (없으면 None)."""
+        return self.driver.execute_script(TEXT_JS, css)
+
+    def report_line(self) -> str:
+        s = self.stats
+        per = s["bytes"] / max(s["calls"], 1)
+        return (f"[HARVEST] {self.selector} calls={s['calls']} items={s['items']} "
+                f"{s['bytes'] / 1e3:.1f}KB ({per / 1e3:.1f}KB/call, {s['sec']:.2f}s)")
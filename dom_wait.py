@@ -0,0 +1,93 @@
+import os
+import time
+import threading
+from typing import Dict, Iterable, Union
+
+# 고정 sleep 대신 페이지 안의 MutationObserver 로 "필요한 요소가 생겼다" 는 신호를 기다린다.
+#   - sels 의 선택자가 모두 min_count 개 이상이거나, min_height 보다 scrollHeight 가 커지면 바로 반환
+#   - 조건을 못 채우면 timeout(기본: 원래 고정 대기 시간)에서 끝 → 기존보다 오래 기다리는 일은 없다
+#   - JS 실행이 안 되면 예전처럼 fixed_sec 만큼 sleep
+# 절약한 시간(fixed_sec - 실제 대기)은 전역 STATS 에 모으고 REPORT_EVERY 번마다 한 줄 출력한다.
+# DOM_WAIT=0 이면 항상 고정 sleep (비교용).
+
+ENABLED = os.environ.get("DOM_WAIT", "1") != "0"
+REPORT_EVERY = 100
+
+WAIT_JS = """
+const sels = arguments[0], minCount = arguments[1], minHeight = arguments[2], timeoutMs = arguments[3];
+const done = arguments[arguments.length - 1];
+const ok = () => (sels.length > 0 && sels.every(s => document.querySelectorAll(s).length >= minCount))
+              || (minHeight > 0 && document.body && document.body.scrollHeight > minHeight);
+if (ok()) { done(true); return; }
+let finished = false, scheduled = false;
+const finish = (v) => { if (finished) return; finished = true; obs.disconnect(); clearTimeout(timer); done(v); };
+// 변경이 몰려 와도 30ms 에 한 번만 검사
+const obs = new MutationObserver(() => {
+  if (scheduled) return;
+  scheduled = true;
+  setTimeout(() => { scheduled = false; if (ok()) finish(true); }, 30);
+});
+const timer = setTimeout(() => finish(ok()), timeoutMs);
+obs.observe(document.documentElement, {childList: true, subtree: true, attributes: false});
+"""
+
+COUNT_JS = "return document.querySelectorAll(arguments[0]).length;"
+
+STATS: Dict[str, float] = {"waits": 0, "ready": 0, "timeout": 0, "fallback": 0, "waited_sec": 0.0, "saved_sec": 0.0}
+_lock = threading.Lock()
+
+
+def _record(key: str, waited: float, fixed_sec: float) -> None:
+    with _lock:
+        STATS["waits"] += 1
+        STATS[key] += 1
+        STATS["waited_sec"] += waited
+        STATS["saved_sec"] += max(fixed_sec - waited, 0.0)
+        show = STATS["waits"] % REPORT_EVERY == 0
+    if show:
+        print(report_line())
+
+
+def wait_for(driver, sels: Union[str, Iterable[str]], fixed_sec: float, min_count: int = 1,
+             min_height: int = 0, timeout: float = None) -> bool:
+    """
+    조건이 채워지면 True, timeout 까지 안 채워지면 False.
+    fixed_sec 은 이 자리에 있던 고정 sleep 시간 (절약 시간 계산/폴백용).
+    """
+    sels = [sels] if isinstance(sels, str) else list(sels)
+    timeout = fixed_sec if timeout is None else timeout
+    t0 = time.time()
+    if not ENABLED:
+        time.sleep(fixed_sec)
+        _record("fallback", fixed_sec, fixed_sec)
+        return False
+    try:
+        ok = bool(driver.execute_async_script(WAIT_JS, sels, min_count, min_height, int(timeout * 1000)))
+    except Exception as e:
+        print(f"[WAIT-ERR] {sels} : {e}")
+        left = fixed_sec - (time.time() - t0)
+        if left > 0:
+            time.sleep(left)
+        _record("fallback", time.time() - t0, fixed_sec)
+        return False
+    _record("ready" if ok else "timeout", time.time() - t0, fixed_sec)
+    return ok
+
+
+def count(driver, sel: str) -> int:
+    try:
+        return int(driver.execute_script(COUNT_JS, sel) or 0)
+    except Exception:
+        return 0
+
+
+def wait_for_more(driver, sel: str, baseline: int, fixed_sec: float, min_height: int = 0,
+                  timeout: float = None) -> bool:
+    """스크롤 뒤 카드가 baseline 개보다 많아지거나 (가상 스크롤이면) 페이지가 min_height 보다 길어질 때까지."""
+    return wait_for(driver, sel, fixed_sec, min_count=baseline + 1, min_height=min_height, timeout=timeout)
+
+
+def report_line() -> str:
+    s = STATS
+    return (f"[WAIT] waits={int(s['waits'])} ready={int(s['ready'])} timeout={int(s['timeout'])} "
+            f"fallback={int(s['fallback'])} | waited {s['waited_sec']:.1f}s, saved {s['saved_sec']:.1f}s")
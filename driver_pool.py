@@ -0,0 +1,260 @@
+import os
+import time
+import atexit
+import signal
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+# Chrome 드라이버 수명 관리.
+#   - 페이지마다 새 Chrome 을 띄우지 않고 슬롯별 드라이버를 재사용한다
+#   - max_pages 페이지를 넘기거나 드라이버 프로세스 트리 RSS 가 max_rss_mb 를 넘으면 종료 후 새로 띄운다
+#   - watchdog 스레드가 hang_sec 넘게 get() 에서 안 돌아오는 드라이버를 프로세스째 죽이고 교체한다
+#   - quit 이 안 먹히면 프로세스 트리를 SIGKILL, 프로세스 종료 시(atexit) 남은 드라이버 정리
+#   - Chrome 이 죽었거나 세션이 사라진 드라이버(invalid session id 등)는 돌려받을 때 바로 교체
+# RSS 는 psutil 이 있으면 psutil, 없으면 /proc 에서 읽는다 (리눅스).
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class DriverHung(Exception):
+    pass
+
+
+# selenium 을 import 하지 않고 이름/메시지로 본다 (세션이 없어져서 이 드라이버로는 더 못 쓰는 경우)
+_GONE_TYPES = ("InvalidSessionIdException", "NoSuchWindowException", "SessionNotCreatedException")
+_GONE_MESSAGES = ("invalid session id", "session deleted", "chrome not reachable", "disconnected:",
+                  "target window already closed", "tab crashed", "no such window")
+
+
+def session_gone(e: BaseException) -> bool:
+    if type(e).__name__ in _GONE_TYPES:
+        return True
+    msg = str(e).lower()
+    return any(m in msg for m in _GONE_MESSAGES)
+
+
+def _children(pid: int) -> List[int]:
+    """pid 의 모든 자손 pid."""
+    if psutil is not None:
+        try:
+            return [c.pid for c in psutil.Process(pid).children(recursive=True)]
+        except psutil.Error:
+            return []
+    parent: Dict[int, int] = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", "r") as f:
+                stat = f.read()
+            parent[int(name)] = int(stat[stat.rfind(")") + 2:].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+    out, todo = [], [pid]
+    while todo:
+        p = todo.pop()
+        kids = [c for c, pp in parent.items() if pp == p]
+        out.extend(kids)
+        todo.extend(kids)
+    return out
+
+
+def _rss_mb(pids: List[int]) -> float:
+    total = 0
+    for pid in pids:
+        try:
+            if psutil is not None:
+                total += psutil.Process(pid).memory_info().rss
+            else:
+                with open(f"/proc/{pid}/statm", "r") as f:
+                    total += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except Exception:
+            continue
+    return total / 1e6
+
+
+def _service_pid(driver) -> Optional[int]:
+    try:
+        return driver.service.process.pid
+    except AttributeError:
+        return None
+
+
+class _Slot:
+    def __init__(self, idx: int):
+        self.idx = idx
+        self.driver = None
+        self.pages = 0
+        self.busy_since: Optional[float] = None
+        self.hung = False
+        self.broken = False
+
+
+class DriverPool:
+    def __init__(self, factory: Callable[[], object], size: int = 1, max_pages: int = 300,
+                 max_rss_mb: float = 1500, hang_sec: float = 60, watch_every: float = 2.0):
+        self.factory = factory
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.hang_sec = hang_sec
+        self.slots = [_Slot(i) for i in range(size)]
+        self._free = list(self.slots)
+        self._cv = threading.Condition()
+        self.stats = {"started": 0, "recycled_pages": 0, "recycled_rss": 0, "hung": 0, "crashed": 0, "pages": 0}
+        self._stop = threading.Event()
+        self._watch = threading.Thread(target=self._watchdog, args=(watch_every,), daemon=True)
+        self._watch.start()
+        atexit.register(self.close)
+
+    # ----- 생성/종료 -----
+    def _start(self, slot: _Slot) -> None:
+        slot.driver = self.factory()
+        slot.pages = 0
+        slot.hung = False
+        slot.broken = False
+        self.stats["started"] += 1
+
+    def _kill(self, driver) -> None:
+        pid = _service_pid(driver)
+        if pid is None:
+            return
+        for p in _children(pid) + [pid]:
+            try:
+                os.kill(p, signal.SIGKILL)
+            except OSError:
+                pass
+
+    def _stop_driver(self, slot: _Slot) -> None:
+        driver, slot.driver = slot.driver, None
+        if driver is None:
+            return
+        pid = _service_pid(driver)
+        leftover = _children(pid) if pid else []
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"[DRIVER] slot {slot.idx} quit failed: {e}")
+        # quit 뒤에도 남은 chrome 프로세스는 강제로
+        for p in leftover:
+            try:
+                os.kill(p, signal.SIGKILL)
+            except OSError:
+                pass
+
+    # ----- 빌려주기 -----
+    def _acquire(self) -> _Slot:
+        with self._cv:
+            while not self._free:
+                self._cv.wait()
+            slot = self._free.pop()
+        if slot.driver is None:
+            try:
+                self._start(slot)
+            except BaseException:
+                # Chrome 이 못 뜨면 슬롯을 돌려놔야 다음 page() 가 영원히 기다리지 않는다
+                with self._cv:
+                    self._free.append(slot)
+                    self._cv.notify()
+                raise
+        return slot
+
+    def _release(self, slot: _Slot) -> None:
+        slot.busy_since = None
+        slot.pages += 1
+        self.stats["pages"] += 1
+        if slot.hung:
+            self._stop_driver(slot)
+        elif slot.broken or not self._alive(slot.driver):
+            print(f"[DRIVER] slot {slot.idx} session gone after {slot.pages} pages → replace")
+            self.stats["crashed"] += 1
+            self._stop_driver(slot)
+        elif slot.pages >= self.max_pages:
+            self.stats["recycled_pages"] += 1
+            self._stop_driver(slot)
+        elif self.max_rss_mb:
+            pid = _service_pid(slot.driver)
+            rss = _rss_mb(_children(pid) + [pid]) if pid else 0
+            if rss > self.max_rss_mb:
+                print(f"[DRIVER] slot {slot.idx} RSS {rss:.0f}MB > {self.max_rss_mb:.0f}MB, recycle after {slot.pages} pages")
+                self.stats["recycled_rss"] += 1
+                self._stop_driver(slot)
+        with self._cv:
+            self._free.append(slot)
+            self._cv.notify()
+
+    @staticmethod
+    def _alive(driver) -> bool:
+        """chromedriver 프로세스가 살아 있는지 (알 수 없으면 살아 있다고 본다)."""
+        try:
+            return driver.service.process.poll() is None
+        except AttributeError:
+            return True
+
+    def _get(self, slot: _Slot, url: str) -> None:
+        slot.busy_since = time.time()
+        try:
+            slot.driver.get(url)
+        except Exception as e:
+            if slot.hung:
+                raise DriverHung(f"driver hung > {self.hang_sec}s on {url}")
+            if session_gone(e):
+                slot.broken = True
+            raise
+        finally:
+            slot.busy_since = None
+
+    @contextmanager
+    def page(self, url: Optional[str] = None, before_get: Optional[Callable] = None):
+        """
+        드라이버 하나를 빌려 url 로 이동한 뒤 넘겨준다. 멈춰서 watchdog 이 죽인 경우 새 드라이버로 한 번 더.
+        before_get(driver) 는 이동 직전에 호출 (capture 로그 비우기 등).
+        """
+        slot = self._acquire()
+        try:
+            if url:
+                for attempt in range(2):
+                    if before_get:
+                        before_get(slot.driver)
+                    try:
+                        self._get(slot, url)
+                        break
+                    except DriverHung:
+                        if attempt == 1:
+                            raise
+                        self._stop_driver(slot)
+                        self._start(slot)
+            try:
+                yield slot.driver
+            except Exception as e:
+                # 페이지를 다루다가 세션이 사라진 경우도 돌려받을 때 교체
+                if session_gone(e):
+                    slot.broken = True
+                raise
+        finally:
+            self._release(slot)
+
+    # ----- watchdog -----
+    def _watchdog(self, every: float) -> None:
+        while not self._stop.wait(every):
+            now = time.time()
+            for slot in self.slots:
+                since = slot.busy_since
+                if since is not None and not slot.hung and now - since > self.hang_sec and slot.driver is not None:
+                    slot.hung = True
+                    self.stats["hung"] += 1
+                    print(f"[WATCHDOG] slot {slot.idx} stuck in get() {now - since:.0f}s → kill")
+                    self._kill(slot.driver)
+
+    def report_line(self) -> str:
+        s = self.stats
+        return (f"[DRIVER] pages={s['pages']} started={s['started']} recycled(pages={s['recycled_pages']}, "
+                f"rss={s['recycled_rss']}) hung={s['hung']} crashed={s['crashed']}")
+
+    def close(self) -> None:
+        self._stop.set()
+        for slot in self.slots:
+            self._stop_driver(slot)
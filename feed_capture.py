@@ -0,0 +1,248 @@
+import re
+import json
+import uuid
+import argparse
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 스냅 피드가 스크롤하면서 부르는 JSON(XHR/fetch) 응답을 CDP 네트워크 이벤트로 받아서
+# page_source + BeautifulSoup 재파싱 없이 snap 레코드를 만든다.
+#   - Chrome 을 goog:loggingPrefs performance 로 띄우면 Network.* 이벤트가 performance 로그로 쌓인다
+#   - poll() 은 지난 호출 이후 새로 끝난 응답만 Network.getResponseBody 로 가져온다 (스크롤 한 번 = 새 데이터만)
+#   - record_path 를 주면 받은 응답을 JSONL 로 남긴다 → ReplayCapture 로 그대로 재생 (fixture)
+# 응답 JSON 의 필드 이름은 몇 가지 후보를 순서대로 찾는다 (_SNAP_ID_KEYS 등).
+# 후보 이름은 아직 실제 응답으로 확인하지 않았다 (fixtures/snap_feed_sample.jsonl 은 손으로 만든 예시).
+# 그래서 피드 목록 엔드포인트만 보고, snap 에만 있는 필드(snap id, 작성자, 타입, 이미지)가 다 있는 항목만
+# 레코드로 만든다. 하나라도 없으면 자리표시 값으로 채우지 않고 건너뛴다 → 호출하는 쪽이 DOM 파싱으로 돌아간다.
+
+FEED_URL_PATTERN = r"content\.musinsa\.com/api2/content/snap/v\d+/snaps(\?|$)"
+NAMESPACE = uuid.UUID("12345678-1234-5678-1234-567812345678")  # snap 스크립트들과 같은 namespace
+
+_SNAP_ID_KEYS = ("snapId", "snapNo")
+_SNAP_TYPE_KEYS = ("snapType",)
+_PROFILE_KEYS = ("profile", "member", "author")
+_NICKNAME_KEYS = ("nickname", "nickName", "brandName")
+_IMAGE_LIST_KEYS = ("images", "imageList", "medias", "snapImages", "contentImages")
+_IMAGE_URL_KEYS = ("imageUrl", "url", "path", "imagePath", "src")
+_GOODS_LIST_KEYS = ("goods", "goodsList", "products", "tagGoods", "items")
+
+
+def enable_capture(opts) -> None:
+    """webdriver Options 에 performance 로그(CDP Network 이벤트) 수집을 켠다."""
+    opts.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+class NetworkCapture:
+    def __init__(self, driver, url_pattern: str = FEED_URL_PATTERN, record_path: Optional[str] = None):
+        self.driver = driver
+        self.url_re = re.compile(url_pattern)
+        self._want: Dict[str, str] = {}
+        self._rec = open(record_path, "a") if record_path else None
+        self.stats = {"events": 0, "responses": 0, "bytes": 0}
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+        except Exception as e:
+            print(f"[WARN] Network.enable failed: {e}")
+
+    def poll(self) -> List[Tuple[str, Any]]:
+        """지난 poll 이후 끝난 JSON 응답들 [(url, obj)]."""
+        out = []
+        for entry in self.driver.get_log("performance"):
+            self.stats["events"] += 1
+            try:
+                msg = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method, params = msg.get("method"), msg.get("params", {})
+            if method == "Network.responseReceived":
+                resp = params.get("response", {})
+                if params.get("type") in ("XHR", "Fetch") and self.url_re.search(resp.get("url", "")) \
+                        and "json" in (resp.get("mimeType") or ""):
+                    self._want[params["requestId"]] = resp["url"]
+            elif method == "Network.loadingFinished" and params.get("requestId") in self._want:
+                url = self._want.pop(params["requestId"])
+                try:
+                    body = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": params["requestId"]})
+                    text = body.get("body", "")
+                    obj = json.loads(text)
+                except Exception as e:
+                    print(f"[CAPTURE-ERR] {url} : {e}")
+                    continue
+                self.stats["responses"] += 1
+                self.stats["bytes"] += len(text)
+                if self._rec:
+                    self._rec.write(json.dumps({"url": url, "body": obj}, ensure_ascii=False) + "\n")
+                    self._rec.flush()
+                out.append((url, obj))
+        return out
+
+    def close(self) -> None:
+        if self._rec:
+            self._rec.close()
+            self._rec = None
+
+
+class ReplayCapture:
+    """NetworkCapture 로 기록한 JSONL 을 poll 한 번에 per_poll 개씩 돌려준다 (스크롤 단계 재현)."""
+
+    def __init__(self, path: str, per_poll: int = 1):
+        with open(path, "r") as f:
+            self._rows = [json.loads(line) for line in f if line.strip()]
+        self.per_poll = per_poll
+        self.stats = {"events": 0, "responses": 0, "bytes": 0}
+
+    def poll(self) -> List[Tuple[str, Any]]:
+        rows, self._rows = self._rows[:self.per_poll], self._rows[self.per_poll:]
+        self.stats["responses"] += len(rows)
+        return [(r["url"], r["body"]) for r in rows]
+
+    def close(self) -> None:
+        pass
+
+
+# ---------- JSON → snap 레코드 ----------
+def _first(d: Dict, keys: Iterable[str], default=None):
+    for k in keys:
+        v = d.get(k)
+        if v not in (None, "", []):
+            return v
+    return default
+
+
+def _walk(obj) -> Iterator[Dict]:
+    if isinstance(obj, dict):
+        yield obj
+        for v in obj.values():
+            yield from _walk(v)
+    elif isinstance(obj, list):
+        for v in obj:
+            yield from _walk(v)
+
+
+def _image_urls(d: Dict) -> List[str]:
+    imgs = _first(d, _IMAGE_LIST_KEYS, [])
+    out = []
+    for im in imgs if isinstance(imgs, list) else []:
+        u = im if isinstance(im, str) else _first(im, _IMAGE_URL_KEYS) if isinstance(im, dict) else None
+        if u:
+            u = re.sub(r'\?w=\d+', '', u)
+            out.append("https:" + u if u.startswith("//") else u)
+    return out
+
+
+def _nickname(d: Dict) -> str:
+    profile = _first(d, _PROFILE_KEYS, {})
+    return str(_first(profile, _NICKNAME_KEYS, "")) if isinstance(profile, dict) else ""
+
+
+def is_snap_entry(d: Dict) -> bool:
+    """snap id, 타입, 작성자 이름, 이미지가 모두 있는 dict 만 snap 으로 본다."""
+    return (_first(d, _SNAP_ID_KEYS) is not None and _first(d, _SNAP_TYPE_KEYS) is not None
+            and bool(_nickname(d)) and bool(_image_urls(d)))
+
+
+def snap_entries(obj) -> List[Dict]:
+    """응답 JSON 안에서 snap 으로 보이는 dict 들 (is_snap_entry). 중첩된 것은 바깥 것만."""
+    out, seen = [], set()
+
+    def visit(o):
+        if isinstance(o, dict):
+            if is_snap_entry(o):
+                sid = str(_first(o, _SNAP_ID_KEYS))
+                if sid not in seen:
+                    seen.add(sid)
+                    out.append(o)
+                return   # 안쪽(상품 등)은 snap 으로 보지 않는다
+            for v in o.values():
+                visit(v)
+        elif isinstance(o, list):
+            for v in o:
+                visit(v)
+    visit(obj)
+    return out
+
+
+def snap_ids_from_json(obj) -> List[str]:
+    return [str(_first(d, _SNAP_ID_KEYS)) for d in snap_entries(obj)]
+
+
+def snap_ids_from_responses(responses: Iterable[Tuple[str, Any]]) -> List[str]:
+    """poll() 결과 전체의 snap id. 비어 있으면 (응답 모양이 예상과 다르거나 아직 안 옴) DOM 으로 대신한다."""
+    return [sid for _, obj in responses for sid in snap_ids_from_json(obj)]
+
+
+def total_count_from_json(obj) -> Optional[int]:
+    for d in _walk(obj):
+        for k in ("totalCount", "total", "totalElements"):
+            if isinstance(d.get(k), int):
+                return d[k]
+    return None
+
+
+def snap_record(d: Dict) -> Dict[str, Any]:
+    """snap_three.parse_item_div 와 같은 모양의 레코드. d 는 is_snap_entry 를 통과한 것."""
+    snap_id = str(_first(d, _SNAP_ID_KEYS))
+    user_name = _nickname(d)
+    kind = str(_first(d, _SNAP_TYPE_KEYS)).upper()
+    snap_type = "brand" if "BRAND" in kind else "member"
+    if user_name == "무신사 코디":
+        snap_type = "mss"
+
+    model = _first(d, ("model", "modelInfo", "bodyInfo"), {}) or {}
+    height = str(_first(model, ("height",), "")) if isinstance(model, dict) else ""
+    weight = str(_first(model, ("weight",), "")) if isinstance(model, dict) else ""
+    tone = str(_first(model, ("skinTone", "tone"), "")) if isinstance(model, dict) else ""
+
+    products = []
+    for g in _first(d, _GOODS_LIST_KEYS, []) or []:
+        if not isinstance(g, dict):
+            continue
+        gno = _first(g, ("goodsNo", "goodsId"))
+        if gno is None:
+            continue   # 상품 번호가 없으면 URL 을 만들 수 없다
+        products.append({
+            "product_url": f"https://www.musinsa.com/products/{gno}",
+            "brand_name": _first(g, ("brandName", "brand"), ""),
+            "product_name": _first(g, ("goodsName", "goodsNm", "name"), ""),
+            "desc": _first(g, ("optionName", "desc"), ""),
+        })
+
+    account_uuid = str(uuid.uuid5(NAMESPACE, user_name))
+    return {
+        "snap_url": f"https://www.musinsa.com/snap/{snap_id}",
+        "snap_id": snap_id,
+        "account_name": user_name,
+        "account_uuid": account_uuid,
+        "model_info": f"{height}/{weight}" + (f", {tone}" if tone else ""),
+        "snap_like": int(_first(d, ("likeCount", "likes", "like"), 0) or 0),
+        "snap_desc": _first(d, ("content", "description", "text"), "") or "",
+        "img_urls": _image_urls(d),
+        "products": products,
+        "folder1": snap_type,
+        "folder2": account_uuid,
+    }
+
+
+def records_from_responses(responses: Iterable[Tuple[str, Any]]) -> List[Dict[str, Any]]:
+    out = []
+    for _, obj in responses:
+        out.extend(snap_record(d) for d in snap_entries(obj))
+    return out
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="기록된 피드 응답(JSONL)에서 snap 레코드 재생성")
+    p.add_argument("--replay", type=str, required=True, help="NetworkCapture record_path 로 남긴 JSONL")
+    p.add_argument("--per_poll", type=int, default=1)
+    args = p.parse_args()
+
+    cap = ReplayCapture(args.replay, args.per_poll)
+    step, total = 0, 0
+    while True:
+        got = cap.poll()
+        if not got:
+            break
+        recs = records_from_responses(got)
+        step += 1
+        total += len(recs)
+        print(f"[STEP {step}] 응답 {len(got)}개 → snap {len(recs)}개 {[r['snap_id'] for r in recs]}")
+    print(f"total snaps: {total}")
@@ -0,0 +1,286 @@
+import os
+import time
+import struct
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterator, Optional, Tuple
+
+# 상품 id 공간의 live / dead / retry 상태를 roaring 방식으로 압축 저장한다.
+# 상위 16비트마다 chunk 하나: 원소가 적으면 정렬된 uint16 배열, 많아지면 8KB 비트맵.
+# dead / 희박 판정은 영원하지 않다: block 마다 마지막으로 다 훑은 시각을 남기고 recheck_sec 이 지나면 다시 훑는다.
+# 가장 큰 live id 이상은 새로 등록될 상품 자리라 dead 로 믿지 않는다.
+
+ARRAY_MAX = 4096
+_MAGIC = b"RBM2"
+_MAGIC_V1 = b"RBM1"   # block 시각이 없는 예전 포맷 (읽기만)
+RECHECK_SEC = 30 * 24 * 3600
+
+LIVE = "live"
+DEAD = "dead"
+RETRY = "retry"
+STATUSES = (LIVE, DEAD, RETRY)
+
+
+class RoaringSet:
+    def __init__(self):
+        self._chunks = {}
+
+    @staticmethod
+    def _to_bitmap(arr) -> bytearray:
+        bm = bytearray(8192)
+        for lo in arr:
+            bm[lo >> 3] |= 1 << (lo & 7)
+        return bm
+
+    def add(self, x: int) -> None:
+        hi, lo = x >> 16, x & 0xFFFF
+        c = self._chunks.get(hi)
+        if c is None:
+            self._chunks[hi] = array("H", [lo])
+        elif isinstance(c, bytearray):
+            c[lo >> 3] |= 1 << (lo & 7)
+        else:
+            i = bisect_left(c, lo)
+            if i < len(c) and c[i] == lo:
+                return
+            c.insert(i, lo)
+            if len(c) > ARRAY_MAX:
+                self._chunks[hi] = self._to_bitmap(c)
+
+    def discard(self, x: int) -> None:
+        hi, lo = x >> 16, x & 0xFFFF
+        c = self._chunks.get(hi)
+        if c is None:
+            return
+        if isinstance(c, bytearray):
+            c[lo >> 3] &= ~(1 << (lo & 7)) & 0xFF
+        else:
+            i = bisect_left(c, lo)
+            if i < len(c) and c[i] == lo:
+                del c[i]
+                if not c:
+                    del self._chunks[hi]
+
+    def __contains__(self, x: int) -> bool:
+        c = self._chunks.get(x >> 16)
+        if c is None:
+            return False
+        lo = x & 0xFFFF
+        if isinstance(c, bytearray):
+            return bool(c[lo >> 3] & (1 << (lo & 7)))
+        i = bisect_left(c, lo)
+        return i < len(c) and c[i] == lo
+
+    def __len__(self) -> int:
+        n = 0
+        for c in self._chunks.values():
+            n += int.from_bytes(c, "little").bit_count() if isinstance(c, bytearray) else len(c)
+        return n
+
+    def __iter__(self) -> Iterator[int]:
+        for hi in sorted(self._chunks):
+            c = self._chunks[hi]
+            base = hi << 16
+            if isinstance(c, bytearray):
+                for byte_idx, byte in enumerate(c):
+                    while byte:
+                        low_bit = byte & -byte
+                        yield base + (byte_idx << 3) + low_bit.bit_length() - 1
+                        byte ^= low_bit
+            else:
+                for lo in c:
+                    yield base + lo
+
+    def max(self) -> Optional[int]:
+        if not self._chunks:
+            return None
+        hi = max(self._chunks)
+        c = self._chunks[hi]
+        if isinstance(c, bytearray):
+            i = max(i for i, byte in enumerate(c) if byte)
+            return (hi << 16) + (i << 3) + c[i].bit_length() - 1
+        return (hi << 16) + c[-1]
+
+    def count_range(self, start: int, end: int) -> int:
+        return sum(1 for x in range(start, end) if x in self)
+
+    def update(self, other: "RoaringSet") -> None:
+        for x in other:
+            self.add(x)
+
+    def to_bytes(self) -> bytes:
+        out = [struct.pack("<I", len(self._chunks))]
+        for hi in sorted(self._chunks):
+            c = self._chunks[hi]
+            if isinstance(c, bytearray):
+                out.append(struct.pack("<IBI", hi, 1, len(c)))
+                out.append(bytes(c))
+            else:
+                payload = c.tobytes()
+                out.append(struct.pack("<IBI", hi, 0, len(payload)))
+                out.append(payload)
+        return b"".join(out)
+
+    @classmethod
+    def from_bytes(cls, buf: bytes, offset: int = 0):
+        rs = cls()
+        (n,) = struct.unpack_from("<I", buf, offset)
+        offset += 4
+        for _ in range(n):
+            hi, kind, size = struct.unpack_from("<IBI", buf, offset)
+            offset += 9
+            payload = buf[offset:offset + size]
+            offset += size
+            if kind == 1:
+                rs._chunks[hi] = bytearray(payload)
+            else:
+                arr = array("H")
+                arr.frombytes(payload)
+                rs._chunks[hi] = arr
+        return rs, offset
+
+
+class IdStatusMap:
+    """
+    id 별 상태(live/dead/retry)와 block_size 단위 밀도 추정.
+    density(block) = live / (live + dead), 관측이 min_known 개 미만이면 None(모름).
+    checked[block] = 그 block 을 처음 관측했거나 마지막으로 다 훑은 시각 (epoch 초).
+    """
+
+    def __init__(self, path: Optional[str] = None, block_size: int = 1000, min_known: int = 20):
+        self.path = path
+        self.block_size = block_size
+        self.min_known = min_known
+        self.sets = {s: RoaringSet() for s in STATUSES}
+        self.checked: Dict[int, float] = {}
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def mark(self, pid: int, status: str) -> None:
+        self.checked.setdefault(self.block_start(pid), time.time())
+        for s, rs in self.sets.items():
+            if s == status:
+                rs.add(pid)
+            else:
+                rs.discard(pid)
+
+    def status(self, pid: int) -> Optional[str]:
+        for s in STATUSES:
+            if pid in self.sets[s]:
+                return s
+        return None
+
+    def max_live(self) -> Optional[int]:
+        return self.sets[LIVE].max()
+
+    def is_stale(self, block_start: int, recheck_sec: Optional[float], now: Optional[float] = None) -> bool:
+        if recheck_sec is None:
+            return False
+        t = self.checked.get(block_start)
+        return t is None or (now or time.time()) - t >= recheck_sec
+
+    def block_start(self, pid: int) -> int:
+        return pid - pid % self.block_size
+
+    def block_stats(self, block_start: int):
+        end = block_start + self.block_size
+        return {s: self.sets[s].count_range(block_start, end) for s in STATUSES}
+
+    def density(self, block_start: int) -> Optional[float]:
+        st = self.block_stats(block_start)
+        known = st[LIVE] + st[DEAD]
+        if known < self.min_known:
+            return None
+        return st[LIVE] / known
+
+    def merge(self, other: "IdStatusMap") -> None:
+        # 다른 샤드의 관측 합치기: live 가 dead/retry 보다, dead 가 retry 보다 우선
+        for s in (RETRY, DEAD, LIVE):
+            for pid in other.sets[s]:
+                cur = self.status(pid)
+                if cur is None or STATUSES.index(s) <= STATUSES.index(cur):
+                    self.mark(pid, s)
+        for b, t in other.checked.items():
+            self.checked[b] = max(self.checked.get(b, 0.0), t)
+
+    def save(self, path: Optional[str] = None) -> str:
+        path = path or self.path
+        stamps = struct.pack("<I", len(self.checked)) + b"".join(
+            struct.pack("<qd", b, t) for b, t in sorted(self.checked.items()))
+        buf = _MAGIC + b"".join(self.sets[s].to_bytes() for s in STATUSES) + stamps
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(buf)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        return path
+
+    def load(self, path: str) -> None:
+        with open(path, "rb") as f:
+            buf = f.read()
+        if buf[:4] not in (_MAGIC, _MAGIC_V1):
+            raise ValueError(f"{path} is not an id status bitmap")
+        offset = 4
+        for s in STATUSES:
+            self.sets[s], offset = RoaringSet.from_bytes(buf, offset)
+        self.checked = {}
+        if buf[:4] == _MAGIC:
+            (n,) = struct.unpack_from("<I", buf, offset)
+            offset += 4
+            for _ in range(n):
+                b, t = struct.unpack_from("<qd", buf, offset)
+                offset += 16
+                self.checked[b] = t
+        else:
+            # 예전 포맷: 시각을 모르니 불러온 지금을 처음 관측한 시각으로
+            now = time.time()
+            for s in STATUSES:
+                for pid in self.sets[s]:
+                    self.checked.setdefault(self.block_start(pid), now)
+
+    def summary(self) -> str:
+        return ", ".join(f"{s}={len(self.sets[s])}" for s in STATUSES)
+
+
+def probe_ids(idmap: IdStatusMap, ids, sample_every: int = 20) -> Iterator[int]:
+    """밀도를 모르는 block 은 sample_every 간격으로만 먼저 찔러본다 (dead 는 제외)."""
+    unknown = {}
+    for pid in ids:
+        b = idmap.block_start(pid)
+        if b not in unknown:
+            unknown[b] = idmap.density(b) is None
+        if unknown[b] and (pid - b) % sample_every == 0 and idmap.status(pid) != DEAD:
+            yield pid
+
+
+def plan_sweep(idmap: IdStatusMap, ids, sparse_threshold: float = 0.01,
+               recheck_sec: Optional[float] = RECHECK_SEC) -> Iterator[Tuple[int, bool]]:
+    """
+    전체 스윕 단계에서 (pid, 가져올지) 를 흘려준다.
+    dead 는 건너뛰고, 밀도가 sparse_threshold 미만인 block 은 live/retry 만 다시 가져온다.
+    단, 가장 큰 live id 이상과 recheck_sec 동안 다 훑지 않은 block 은 dead 도 포함해 전부 가져온다
+    (그런 block 은 여기서 다 훑은 것으로 시각을 갱신한다).
+    """
+    top = idmap.max_live()
+    now = time.time()
+    dense = {}
+    for pid in ids:
+        st = idmap.status(pid)
+        if st in (LIVE, RETRY) or top is None or pid >= top:
+            yield pid, True
+            continue
+        b = idmap.block_start(pid)
+        if b not in dense:
+            if idmap.is_stale(b, recheck_sec, now):
+                idmap.checked[b] = now
+                dense[b] = None   # 다시 훑는 block
+            else:
+                d = idmap.density(b)
+                dense[b] = d is None or d >= sparse_threshold
+        if dense[b] is None:
+            yield pid, True
+        elif st == DEAD:
+            yield pid, False
+        else:
+            yield pid, dense[b]
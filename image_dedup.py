@@ -0,0 +1,181 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+from image_transfer import BUDGET, CHUNK_SIZE, _FullReader
+
+# 내용 해시 기반 이미지 저장소.
+#   - 같은 URL 은 한 번만 내려받는다 (url → 저장 경로 인덱스)
+#   - 바이트가 같은 이미지는 blobs/{sha256[:2]}/{sha256}{ext} 에 한 번만 저장한다
+#   - 상품/스냅마다 {base}/manifest.json 에 논리 경로({idx}) → 실제 오브젝트 경로를 남긴다
+# 인덱스는 한 줄에 하나씩 append 하는 JSONL 파일 (다른 머신이 올린 것은 bucket.exists 로 확인).
+
+BLOB_PREFIX = "blobs"
+MANIFEST_NAME = "manifest.json"
+
+_EXT_BY_TYPE = {"image/jpeg": ".jpg", "image/png": ".png", "image/webp": ".webp", "image/gif": ".gif"}
+
+
+def url_key(url: str) -> str:
+    # 스킴만 다른 같은 주소(//image..., https://image...)는 같은 키
+    return url.split("://", 1)[-1].lstrip("/")
+
+
+def _ext(url: str, content_type: Optional[str]) -> str:
+    ext = os.path.splitext(url.split("?")[0])[1].lower()
+    if ext in {".jpg", ".jpeg", ".png", ".webp", ".gif"}:
+        return ext
+    return _EXT_BY_TYPE.get((content_type or "").split(";")[0].strip(), ".jpg")
+
+
+class ImageStore:
+    def __init__(self, bucket, index_path: str = "./image_hashes.jsonl", prefix: str = BLOB_PREFIX):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.by_url: Dict[str, str] = {}
+        self.objects = set()
+        self.stats = {"url_hits": 0, "hash_hits": 0, "stored": 0, "bytes_downloaded": 0, "bytes_stored": 0}
+        self._lock = threading.Lock()
+        self._pending: Dict[str, threading.Event] = {}
+        if index_path and os.path.exists(index_path):
+            with open(index_path, "r") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue   # 마지막 줄이 잘린 경우
+                    self.by_url[rec["url"]] = rec["path"]
+                    self.objects.add(rec["path"])
+        self._fh = open(index_path, "a") if index_path else None
+
+    def _bump(self, **kw) -> None:
+        with self._lock:
+            for k, v in kw.items():
+                self.stats[k] += v
+
+    def _record(self, key: str, path: str, sha: str, size: int) -> None:
+        with self._lock:
+            self.by_url[key] = path
+            self.objects.add(path)
+            if self._fh:
+                self._fh.write(json.dumps({"url": key, "path": path, "sha256": sha, "size": size}) + "\n")
+                self._fh.flush()
+
+    def _claim(self, key: str) -> Optional[threading.Event]:
+        """같은 키를 동시에 처리하지 않도록: 처음 온 스레드만 Event 를 받고, 나머지는 None(끝날 때까지 대기)."""
+        with self._lock:
+            ev = self._pending.get(key)
+            if ev is None:
+                ev = self._pending[key] = threading.Event()
+                return ev
+        ev.wait()
+        return None
+
+    def _release(self, key: str) -> None:
+        with self._lock:
+            self._pending.pop(key).set()
+
+    def put_from_url(self, url: str, session=None, headers=None, timeout: int = 20,
+                     ext_from: Optional[Callable[[str, Optional[str]], str]] = None,
+                     cache_control: Optional[str] = "public, max-age=31536000") -> str:
+        """url 이미지를 내용 주소 경로에 저장하고 그 경로를 돌려준다. 이미 있으면 전송을 건너뛴다."""
+        key = url_key(url)
+        while True:
+            path = self.by_url.get(key)
+            if path:
+                self._bump(url_hits=1)
+                return path
+            if self._claim("url:" + key):
+                break   # 먼저 받던 스레드가 실패했으면 다시 시도
+        try:
+            path, sha, size = self._fetch(url, session, headers, timeout, ext_from, cache_control)
+            self._record(key, path, sha, size)
+            return path
+        finally:
+            self._release("url:" + key)
+
+    def _fetch(self, url, session, headers, timeout, ext_from, cache_control):
+        getter = session.get if session is not None else requests.get
+        with getter(url, headers=headers, timeout=timeout, stream=True) as r:
+            r.raise_for_status()
+            ctype = r.headers.get("Content-Type")
+            ext = (ext_from or _ext)(url, ctype)
+            r.raw.decode_content = True
+            reader = _FullReader(r.raw)
+
+            # 해시를 알아야 경로가 정해지므로 chunk 하나 크기까지만 메모리, 넘치면 임시 파일로
+            BUDGET.acquire(CHUNK_SIZE)
+            try:
+                with tempfile.SpooledTemporaryFile(max_size=CHUNK_SIZE) as spool:
+                    h = hashlib.sha256()
+                    while True:
+                        b = reader.read(CHUNK_SIZE)
+                        if not b:
+                            break
+                        h.update(b)
+                        spool.write(b)
+                    sha, size = h.hexdigest(), reader.nbytes
+                    self._bump(bytes_downloaded=size)
+                    path = f"{self.prefix}/{sha[:2]}/{sha}{ext}"
+                    while path not in self.objects and not self._claim("obj:" + path):
+                        pass
+                    if path in self.objects:
+                        self._bump(hash_hits=1)
+                        return path, sha, size
+                    try:
+                        if self.bucket.exists(path):
+                            self._bump(hash_hits=1)
+                        else:
+                            spool.seek(0)
+                            self.bucket.put_file(path, spool, content_type=ctype or "image/jpeg",
+                                                 cache_control=cache_control, size=size, chunk_size=CHUNK_SIZE)
+                            self._bump(stored=1, bytes_stored=size)
+                        with self._lock:
+                            self.objects.add(path)
+                    finally:
+                        self._release("obj:" + path)
+            finally:
+                BUDGET.release(CHUNK_SIZE)
+        return path, sha, size
+
+    def upload_images(self, base: str, urls: List[str], start: int = 0, name: Callable[[int], str] = str,
+                      on_error: Optional[Callable[[int, str, Exception], None]] = None, **kw) -> Dict[str, str]:
+        """
+        urls 를 저장하고 {base}/manifest.json 에 {논리 이름: 오브젝트 경로} 를 쓴다.
+        실패한 이미지는 manifest 에서 빠지고 on_error(idx, url, err) 로 알린다.
+        """
+        manifest = {}
+        for idx, url in enumerate(urls, start):
+            try:
+                manifest[name(idx)] = self.put_from_url(url, **kw)
+            except Exception as e:
+                if on_error:
+                    on_error(idx, url, e)
+                else:
+                    print(f"[IMG-FAIL] {url} -> gs://{self.bucket.name}/{base}/{name(idx)}  ({e})")
+        self.bucket.put_bytes(f"{base}/{MANIFEST_NAME}", json.dumps(manifest, ensure_ascii=False, indent=2),
+                              content_type="application/json")
+        return manifest
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"url 재사용 {s['url_hits']}, 내용 중복 {s['hash_hits']}, 신규 저장 {s['stored']} | "
+                f"다운로드 {s['bytes_downloaded'] / 1e6:.1f}MB, 저장 {s['bytes_stored'] / 1e6:.1f}MB")
+
+    def close(self) -> None:
+        if self._fh:
+            self._fh.close()
+            self._fh = None
+
+
+def resolve_manifest(bucket, base: str) -> Optional[Dict[str, str]]:
+    """{base}/manifest.json 이 있으면 논리 이름 → 오브젝트 경로 dict, 없으면 None."""
+    try:
+        return json.loads(bucket.get_bytes(f"{base}/{MANIFEST_NAME}"))
+    except Exception:
+        return None
@@ -0,0 +1,101 @@
+import os
+import base64
+import hashlib
+import threading
+from typing import Callable, Optional
+
+import requests
+
+# 이미지 URL → 버킷 스트리밍 전송.
+# r.content 로 본문 전체를 메모리에 올리지 않고 chunk 단위로 업로더에 흘려보낸다.
+# 동시에 메모리에 잡혀 있을 수 있는 바이트 총량은 전역 ByteBudget 으로 제한한다.
+
+CHUNK_SIZE = int(os.environ.get("IMAGE_CHUNK_KB", "1024")) * 1024       # GCS resumable chunk (256KB 배수)
+INFLIGHT_BYTES = int(os.environ.get("IMAGE_INFLIGHT_MB", "64")) * 1024 * 1024
+
+
+class ByteBudget:
+    """전 워커 공용 바이트 세마포어. 혼자서 한도를 넘는 요청도 다른 전송이 없으면 통과시킨다."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.inflight = 0
+        self.peak = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, n: int) -> None:
+        with self._cond:
+            while self.inflight and self.inflight + n > self.limit:
+                self._cond.wait()
+            self.inflight += n
+            self.peak = max(self.peak, self.inflight)
+
+    def release(self, n: int) -> None:
+        with self._cond:
+            self.inflight -= n
+            self._cond.notify_all()
+
+
+BUDGET = ByteBudget(INFLIGHT_BYTES)
+
+
+class _FullReader:
+    """read(n) 가 EOF 전에는 항상 n 바이트를 돌려주도록 감싼다 (resumable 업로드가 짧은 read 를 마지막 chunk 로 보기 때문)."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.nbytes = 0
+        self._md5 = hashlib.md5()
+
+    @property
+    def md5(self) -> str:
+        # GCS blob.md5_hash 와 같은 base64 형식
+        return base64.b64encode(self._md5.digest()).decode()
+
+    def read(self, n: int = -1) -> bytes:
+        if n is None or n < 0:
+            data = self.raw.read()
+        else:
+            parts, got = [], 0
+            while got < n:
+                b = self.raw.read(n - got)
+                if not b:
+                    break
+                parts.append(b)
+                got += len(b)
+            data = b"".join(parts)
+        self.nbytes += len(data)
+        self._md5.update(data)
+        return data
+
+
+def stream_to_bucket(bucket, url: str, dst_path: str, session=None, headers=None, timeout: int = 20,
+                     default_type: str = "image/jpeg", cache_control: Optional[str] = None,
+                     ext_from: Optional[Callable[[str, Optional[str]], str]] = None,
+                     budget: ByteBudget = BUDGET, chunk_size: int = CHUNK_SIZE):
+    """
+    url 본문을 dst_path 로 스트리밍 업로드하고 (최종 경로, 바이트 수, md5) 를 돌려준다.
+    ext_from 이 있으면 응답 헤더를 본 뒤 dst_path + ext_from(url, content_type) 에 저장한다.
+    Content-Length 가 chunk_size 이하이면 한 번에(multipart), 아니면 chunk_size 단위 resumable 로 올린다.
+    """
+    getter = session.get if session is not None else requests.get
+    with getter(url, headers=headers, timeout=timeout, stream=True) as r:
+        r.raise_for_status()
+        ctype = r.headers.get("Content-Type")
+        path = dst_path + ext_from(url, ctype) if ext_from else dst_path
+
+        size = r.headers.get("Content-Length")
+        size = int(size) if size and size.isdigit() and not r.headers.get("Content-Encoding") else None
+        if size is not None and size > chunk_size:
+            size = None
+        reserve = size if size is not None else chunk_size
+
+        r.raw.decode_content = True
+        reader = _FullReader(r.raw)
+        budget.acquire(reserve)
+        try:
+            bucket.put_file(path, reader, content_type=ctype or default_type,
+                            cache_control=cache_control, size=size, chunk_size=chunk_size)
+        finally:
+            budget.release(reserve)
+    return path, reader.nbytes, reader.md5
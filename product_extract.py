@@ -0,0 +1,130 @@
+import re
+import json
+import html as htmllib
+from urllib.parse import urljoin
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# BeautifulSoup 트리를 만들지 않고 상품 페이지에서 필요한 부분만 잘라서 파싱한다.
+# html 은 requests 의 response.content(bytes) 나 driver.page_source(str) 둘 다 받는다.
+
+Html = Union[str, bytes]
+
+_DECODER = json.JSONDecoder()
+_META_CONTENT = re.compile(r"""content\s*=\s*(["'])(.*?)\1""", re.S)
+_OG_IMAGE = r"""property\s*=\s*(["'])og:image\1"""
+_OG_IMAGE_RE = {str: re.compile(_OG_IMAGE), bytes: re.compile(_OG_IMAGE.encode())}
+
+
+def _tok(html: Html, s: str):
+    return s.encode() if isinstance(html, bytes) else s
+
+
+def _text(chunk: Html) -> str:
+    return chunk.decode("utf-8", "replace") if isinstance(chunk, bytes) else chunk
+
+
+def normalize(url: str) -> str:
+    if not url:
+        return url
+    # 무신사 이미지는 종종 //image... 형태 → https: 붙이기
+    if url.startswith("//"):
+        return "https:" + url
+    return urljoin("https://image.msscdn.net/", url)
+
+
+def load_next_data(html: Html) -> Optional[Dict[str, Any]]:
+    """<script id="__NEXT_DATA__"> 의 props.pageProps.meta.data"""
+    idx = html.find(_tok(html, 'id="__NEXT_DATA__"'))
+    if idx < 0:
+        return None
+    start = html.find(_tok(html, ">"), idx) + 1
+    end = html.find(_tok(html, "</script>"), start)
+    if start <= 0 or end < 0:
+        return None
+    try:
+        return json.loads(html[start:end])["props"]["pageProps"]["meta"]["data"]
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def load_window_state(html: Html) -> Optional[Dict[str, Any]]:
+    """window.__MSS__.product.state = {...}; 의 객체를 괄호 짝을 맞춰 통째로 디코딩"""
+    idx = html.find(_tok(html, "window.__MSS__.product.state"))
+    if idx < 0:
+        return None
+    brace = html.find(_tok(html, "{"), idx)
+    end = html.find(_tok(html, "</script>"), brace)
+    if brace < 0:
+        return None
+    chunk = _text(html[brace:end if end >= 0 else len(html)])
+    try:
+        state, _ = _DECODER.raw_decode(chunk)
+    except ValueError:
+        return None
+    return state if isinstance(state, dict) else None
+
+
+def load_embedded_state(html: Html) -> Optional[Dict[str, Any]]:
+    # 1순위: __NEXT_DATA__, 2순위: window.__MSS__.product.state
+    d = load_next_data(html)
+    if d is None:
+        d = load_window_state(html)
+    return d
+
+
+def product_fields(d: Dict[str, Any]) -> Dict[str, Any]:
+    mats = d.get("goodsMaterial", {}).get("materials", {})
+    extra_infos = []
+    if mats != {}:
+        for m in mats:
+            ifo = [m["name"]]
+            for item in m.get("items", []):
+                if item.get("isSelected", False):
+                    ifo.append(item["name"])
+            extra_infos.append(ifo)
+
+    return {
+        "style_no": d.get("styleNo", ""),
+        "product_id": d.get("goodsNo", ""),
+        "product_name": d.get("goodsNmEng", ""),
+        "product_name_korean": d.get("goodsNm", ""),
+        "genders": d.get("sex", []),
+        "brand_name": d.get("brandInfo", {}).get("brand", ""),
+        "brand_name_korean": d.get("brandInfo", {}).get("brandName", ""),
+        "category_depth1": d.get("category", {}).get("categoryDepth1Name", ""),
+        "category_depth2": d.get("category", {}).get("categoryDepth2Name", ""),
+        "price_krw": d.get("goodsPrice", {}).get("salePrice", 0),
+        "extra_infos": extra_infos,
+        "review_count": d.get("goodsReview", {}).get("totalCount", -1),
+        "review_score": d.get("goodsReview", {}).get("satisfactionScore", -1),
+    }
+
+
+def gallery_images(d: Dict[str, Any]) -> List[str]:
+    return [normalize(x["imageUrl"]) for x in d.get("goodsImages", []) if x.get("imageUrl")]
+
+
+def og_image(html: Html) -> Optional[str]:
+    # <meta property="og:image" content="..."> 태그 하나만 잘라서 본다 (따옴표는 " ' 둘 다)
+    found = _OG_IMAGE_RE[type(html)].search(html)
+    if not found:
+        return None
+    idx = found.start()
+    start = html.rfind(_tok(html, "<"), 0, idx)
+    end = html.find(_tok(html, ">"), idx)
+    if start < 0 or end < 0:
+        return None
+    m = _META_CONTENT.search(_text(html[start:end]))
+    if not m or not m.group(2):
+        return None
+    return normalize(htmllib.unescape(m.group(2)))
+
+
+def extract_product(html: Html) -> Tuple[Dict[str, Any], List[str]]:
+    """상품 필드와 [og:image 썸네일] + 갤러리 이미지 url. 임베디드 JSON 은 한 번만 디코딩한다."""
+    d = load_embedded_state(html)
+    if d is None:
+        raise RuntimeError("상품 정보를 찾지 못했습니다.")
+    thumbnail = og_image(html)
+    image_urls = ([thumbnail] if thumbnail else []) + gallery_images(d)
+    return product_fields(d), image_urls
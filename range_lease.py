@@ -0,0 +1,342 @@
+import os
+import json
+import time
+import random
+import signal
+import socket
+import hashlib
+import argparse
+import tempfile
+import threading
+from typing import Callable, Dict, List, Optional, Set
+
+from storage_backend import PreconditionFailed, get_bucket
+
+# 중앙 DB 없이 버킷 오브젝트만으로 여러 노드가 id 구간을 나눠 갖는다.
+#   {prefix}/{job}/lease/{start:012d}.json  : 지금 누가 잡고 있는지 + 만료 시각 (create-if-absent 로 claim)
+#   {prefix}/{job}/done/{start:012d}.json   : 끝난 chunk
+# 갱신/반납/만료 회수는 모두 generation precondition 조건부 쓰기라서, 둘이 동시에 같은 chunk 를 잡을 수 없다.
+# 만료 판단은 노드 시계(time.time)를 쓰므로 노드 간 시계는 NTP 정도로 맞아 있다고 가정한다.
+# 멈춘(죽은) 노드의 lease 는 lease_sec 뒤에 다른 노드가 회수해서 이어 간다 (각 스크립트의 cursor 로 재개).
+# 잡을 chunk 가 없어도 다른 노드가 잡고 있는 chunk 가 남아 있으면 그 lease 가 끝날 때까지 기다렸다가 다시 시도한다.
+# 작업 중 lease 를 빼앗기면(renew 실패) 그 chunk 작업을 멈추고 done 표시도 하지 않는다 (새 주인이 마저 끝낸다).
+
+
+class LeaseLost(BaseException):
+    """작업 중인 chunk 의 lease 를 다른 노드가 가져갔다 (크롤 루프의 except Exception 에 먹히지 않게 BaseException)."""
+
+
+def default_node_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class RangeLeases:
+    def __init__(self, bucket, job: str, start: int, end: int, chunk_size: int,
+                 node_id: Optional[str] = None, lease_sec: float = 900, prefix: str = "leases"):
+        self.bucket = bucket
+        self.base = f"{prefix}/{job}"
+        self.start = start
+        self.end = end
+        self.chunk_size = chunk_size
+        self.node_id = node_id or default_node_id()
+        self.lease_sec = lease_sec
+        self.held: Dict[int, int] = {}    # chunk start → 내가 마지막으로 쓴 lease generation
+        self.lost: Set[int] = set()
+        self.stats = {"claimed": 0, "reclaimed": 0, "completed": 0, "renewed": 0, "lost": 0, "conflicts": 0}
+        self._lock = threading.Lock()
+        self._hb_stop = threading.Event()
+        self._hb = None
+        self.current: Optional[int] = None
+        self._interrupt = False
+
+    # ----- 경로 -----
+    def _lease(self, s: int) -> str:
+        return f"{self.base}/lease/{s:012d}.json"
+
+    def _done(self, s: int) -> str:
+        return f"{self.base}/done/{s:012d}.json"
+
+    def _listed(self, kind: str) -> Set[int]:
+        return {int(n.rsplit("/", 1)[-1].split(".")[0]) for n in self.bucket.list(f"{self.base}/{kind}/")}
+
+    def _body(self, s: int) -> str:
+        return json.dumps({"owner": self.node_id, "start": s, "size": self.size(s),
+                           "expires": time.time() + self.lease_sec})
+
+    def size(self, s: int) -> int:
+        return min(self.chunk_size, self.end - s)
+
+    def chunks(self) -> List[int]:
+        return list(range(self.start, self.end, self.chunk_size))
+
+    # ----- claim -----
+    def _take(self, s: int, gen: int) -> bool:
+        try:
+            new_gen = self.bucket.put_bytes_if(self._lease(s), self._body(s), gen, content_type="application/json")
+        except PreconditionFailed:
+            self.stats["conflicts"] += 1
+            return False
+        # lease 를 잡는 사이에 다른 노드가 끝냈을 수 있다 (목록은 조금 전 것)
+        if self.bucket.exists(self._done(s)):
+            try:
+                self.bucket.delete_if(self._lease(s), new_gen)
+            except PreconditionFailed:
+                pass
+            return False
+        with self._lock:
+            self.held[s] = new_gen
+        return True
+
+    def claim(self) -> Optional[int]:
+        """아직 안 끝났고 아무도 안 잡은(또는 lease 가 만료된) chunk 하나를 잡는다. 없으면 None."""
+        done = self._listed("done")
+        leased = self._listed("lease")
+        free = [s for s in self.chunks() if s not in done and s not in leased]
+        if free:
+            # 노드마다 시작 위치를 흩어서 같은 chunk 로 몰리는 충돌을 줄인다
+            k = int(hashlib.md5(self.node_id.encode()).hexdigest(), 16) % len(free)
+            for s in free[k:] + free[:k]:
+                if self._take(s, 0):
+                    self.stats["claimed"] += 1
+                    return s
+        for s in sorted(leased - done):
+            got = self.bucket.get_bytes_gen(self._lease(s))
+            if got is None:
+                if self._take(s, 0):   # 그 사이 반납됨
+                    self.stats["claimed"] += 1
+                    return s
+                continue
+            data, gen = got
+            d = json.loads(data)
+            if d.get("expires", 0) < time.time() and self._take(s, gen):
+                self.stats["reclaimed"] += 1
+                print(f"[LEASE] {self.node_id} reclaimed chunk {s} from {d.get('owner')} (expired)")
+                return s
+        return None
+
+    # ----- 보유 중 -----
+    def renew(self, s: int) -> bool:
+        with self._lock:
+            gen = self.held.get(s)
+        if gen is None:
+            return False
+        try:
+            new_gen = self.bucket.put_bytes_if(self._lease(s), self._body(s), gen, content_type="application/json")
+        except PreconditionFailed:
+            with self._lock:
+                self.held.pop(s, None)
+                self.lost.add(s)
+            self.stats["lost"] += 1
+            print(f"[LEASE] {self.node_id} lost chunk {s} (lease taken over)")
+            if self._interrupt and s == self.current:
+                # run() 이 메인 스레드에 걸어 둔 handler 가 LeaseLost 를 일으켜 작업을 멈춘다
+                os.kill(os.getpid(), signal.SIGUSR1)
+            return False
+        with self._lock:
+            if s in self.held:
+                self.held[s] = new_gen
+        self.stats["renewed"] += 1
+        return True
+
+    def check(self, s: int) -> None:
+        """작업 도중 불러서 lease 를 빼앗겼으면 LeaseLost."""
+        if s in self.lost:
+            raise LeaseLost(s)
+
+    def complete(self, s: int) -> bool:
+        """
+        마지막으로 lease 를 한 번 더 갱신해서 아직 내 것인지 확인한 뒤
+        done 표시를 먼저 쓰고 lease 를 지운다 (중간에 죽어도 done 이 남으면 다시 안 잡힌다).
+        lease 를 빼앗겼으면 done 을 쓰지 않고 False.
+        """
+        if s in self.lost or not self.renew(s):
+            print(f"[WARN] chunk {s} lease was lost; leaving it to the new owner")
+            return False
+        self.bucket.put_bytes(self._done(s), json.dumps({"owner": self.node_id, "finished_at": time.time()}),
+                              content_type="application/json")
+        self.release(s)
+        self.stats["completed"] += 1
+        return True
+
+    def release(self, s: int) -> None:
+        """끝내지 못한 chunk 를 만료를 기다리지 않고 바로 돌려놓는다."""
+        with self._lock:
+            gen = self.held.pop(s, None)
+        if gen is None:
+            return
+        try:
+            self.bucket.delete_if(self._lease(s), gen)
+        except PreconditionFailed:
+            pass
+
+    def start_heartbeat(self, every: Optional[float] = None) -> None:
+        every = every or max(self.lease_sec / 3, 0.2)
+
+        def loop():
+            while not self._hb_stop.wait(every):
+                with self._lock:
+                    held = list(self.held)
+                for s in held:
+                    try:
+                        self.renew(s)
+                    except Exception as e:
+                        print(f"[WARN] lease renew failed for {s}: {e}")
+        self._hb = threading.Thread(target=loop, daemon=True)
+        self._hb.start()
+
+    def next_expiry(self) -> Optional[float]:
+        """다른 노드가 잡고 있는(아직 안 끝난) chunk 중 가장 먼저 끝나는 lease 의 만료 시각. 없으면 None."""
+        done = self._listed("done")
+        times = []
+        for s in sorted(self._listed("lease") - done):
+            got = self.bucket.get_bytes_gen(self._lease(s))
+            if got is not None:
+                times.append(json.loads(got[0]).get("expires", 0))
+        return min(times) if times else None
+
+    def _on_signal(self, signum, frame):
+        if self.current is not None and self.current in self.lost:
+            raise LeaseLost(self.current)
+
+    def run(self, work: Callable[[int, int], None]) -> int:
+        """
+        chunk 를 하나씩 잡아서 work(start, size) 를 돌린다. 처리한 chunk 수를 돌려준다.
+        잡을 게 없어도 남의 lease 가 남아 있으면 가장 이른 만료까지 기다렸다가 다시 잡는다 (죽은 노드 몫 회수).
+        메인 스레드에서 부르면 lease 를 빼앗기는 즉시 work 안에서 LeaseLost 가 나서 작업을 멈춘다.
+        """
+        self._hb_stop.clear()
+        self.start_heartbeat()
+        prev = None
+        if threading.current_thread() is threading.main_thread():
+            prev = signal.signal(signal.SIGUSR1, self._on_signal)
+            self._interrupt = True
+        n = 0
+        try:
+            while True:
+                s = self.claim()
+                if s is None:
+                    t = self.next_expiry()
+                    if t is None:
+                        break
+                    # 갱신 중인(살아 있는) lease 면 만료가 계속 밀리므로 lease_sec 보다 오래 자지는 않는다
+                    wait = min(max(t - time.time(), 0) + random.uniform(0.05, 0.5), self.lease_sec)
+                    print(f"[LEASE] {self.node_id} waiting {wait:.1f}s for leased chunks to finish or expire")
+                    time.sleep(wait)
+                    continue
+                print(f"[LEASE] {self.node_id} → chunk {s} (+{self.size(s)})")
+                self.current = s
+                try:
+                    self.check(s)
+                    work(s, self.size(s))
+                except LeaseLost:
+                    print(f"[LEASE] {self.node_id} stopped chunk {s} (lease lost)")
+                    continue
+                except BaseException:
+                    self.release(s)
+                    raise
+                finally:
+                    self.current = None
+                if self.complete(s):
+                    n += 1
+        finally:
+            self._hb_stop.set()
+            if prev is not None:
+                signal.signal(signal.SIGUSR1, prev)
+                self._interrupt = False
+        print(f"[LEASE] {self.node_id} done: {self.stats}")
+        return n
+
+    def status(self) -> Dict[str, int]:
+        done = self._listed("done")
+        leased = self._listed("lease") - done
+        total = len(self.chunks())
+        return {"chunks": total, "done": len(done), "leased": len(leased), "free": total - len(done) - len(leased)}
+
+
+# ---------- 파일시스템 stand-in 시뮬레이션 ----------
+def _sim_node(root: str, node: str, args, log_path: str, die_after: Optional[int]) -> None:
+    os.environ["STORAGE_BACKEND"] = "local"
+    os.environ["LOCAL_STORAGE_ROOT"] = root
+    leases = RangeLeases(get_bucket("sim"), "sim", 0, args.chunks * 10, 10, node_id=node, lease_sec=args.lease_sec)
+    count = [0]
+
+    def work(s, n):
+        with open(log_path, "a") as f:
+            f.write(f"start {s} {node} {time.time()}\n")
+        if die_after is not None and count[0] >= die_after:
+            os._exit(1)   # 작업 도중 노드가 죽음 (lease 는 만료될 때까지 남는다)
+        time.sleep(random.uniform(0.02, args.work_sec))
+        with open(log_path, "a") as f:
+            f.write(f"end {s} {node} {time.time()}\n")
+        count[0] += 1
+    leases.run(work)
+
+
+def simulate(args) -> Dict:
+    """노드들이 아무 때나 들어오고 죽어도 모든 chunk 가 정확히 한 번 끝나는지 확인."""
+    import multiprocessing as mp
+    root = tempfile.mkdtemp(prefix="lease_sim_")
+    log_path = os.path.join(root, "work.log")
+    procs = []
+    for i in range(args.nodes):
+        # 일부는 늦게 합류, 일부는 몇 chunk 뒤 작업 도중 죽는다
+        die_after = random.randint(0, 3) if i < args.kill else None
+        p = mp.Process(target=_sim_node, args=(root, f"node{i}", args, log_path, die_after))
+        procs.append(p)
+    for i, p in enumerate(procs):
+        if i >= args.nodes // 2:
+            time.sleep(args.work_sec)
+        p.start()
+    # 죽은 노드의 lease 는 살아 있는 노드가 만료를 기다렸다가 회수한다
+    for p in procs:
+        p.join()
+
+    starts: Dict[int, List] = {}
+    ends: Dict[int, List] = {}
+    with open(log_path, "r") as f:
+        for line in f:
+            kind, s, node, t = line.split()
+            (starts if kind == "start" else ends).setdefault(int(s), []).append((node, float(t)))
+    os.environ["STORAGE_BACKEND"] = "local"
+    os.environ["LOCAL_STORAGE_ROOT"] = root
+    status = RangeLeases(get_bucket("sim"), "sim", 0, args.chunks * 10, 10).status()
+    # 같은 chunk 를 두 노드가 동시에 작업한 구간이 있는지 (끝난 작업끼리)
+    overlaps = 0
+    for s, es in ends.items():
+        spans = []
+        for node, t1 in es:
+            t0 = max(t for n, t in starts[s] if n == node and t <= t1)
+            spans.append((t0, t1))
+        spans.sort()
+        overlaps += sum(1 for a, b in zip(spans, spans[1:]) if b[0] < a[1])
+    return {
+        **status,
+        "finished_once": sum(1 for es in ends.values() if len(es) == 1),
+        "finished_twice_or_more": sum(1 for es in ends.values() if len(es) > 1),
+        "restarted_after_kill": sum(1 for s in starts if len(starts[s]) > len(ends.get(s, []))),
+        "concurrent_overlaps": overlaps,
+        "root": root,
+    }
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="버킷 lease 로 id 구간 나눠 갖기 (상태 조회 / 파일시스템 시뮬레이션)")
+    p.add_argument("--simulate", action="store_true", help="로컬 파일시스템 stand-in 으로 노드 합류/이탈 시뮬레이션")
+    p.add_argument("--nodes", type=int, default=6)
+    p.add_argument("--kill", type=int, default=2, help="작업 도중 죽는 노드 수")
+    p.add_argument("--chunks", type=int, default=60)
+    p.add_argument("--lease_sec", type=float, default=1.5)
+    p.add_argument("--work_sec", type=float, default=0.3)
+    p.add_argument("--status", type=str, default=None, help="JOB 의 chunk 상태 출력 (--bucket --range --chunk_size)")
+    p.add_argument("--bucket", type=str, default="vton-mss")
+    p.add_argument("--range", type=str, default=None, help="START:END")
+    p.add_argument("--chunk_size", type=int, default=5000)
+    args = p.parse_args()
+
+    if args.simulate:
+        print(json.dumps(simulate(args), ensure_ascii=False))
+    elif args.status:
+        start, end = (int(x) for x in args.range.split(":"))
+        print(json.dumps(RangeLeases(get_bucket(args.bucket), args.status, start, end, args.chunk_size).status()))
+    else:
+        p.error("--simulate 또는 --status 가 필요합니다")
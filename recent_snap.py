@@ -11,7 +11,14 @@ import requests
 from bs4 import BeautifulSoup
 from tqdm import tqdm
 
-from google.cloud import storage
+from storage_backend import get_bucket, download_to_file
+from upload_manifest import put_json_once, stream_once
+from image_dedup import ImageStore
+from seen_ids import SeenIdStore
+from snap_frontier import SnapFrontier
+from feed_capture import enable_capture, NetworkCapture, snap_ids_from_responses
+from dom_harvest import DomHarvester
+import dom_wait
 from supabase import create_client, Client
 
 # Selenium
@@ -21,7 +28,7 @@ from selenium.common.exceptions import TimeoutException, WebDriverException, NoS
 
 os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", "./first-project-438808-dc1804307b11.json")
 
-def build_driver(headless=True, user_agent=None):
+def build_driver(headless=True, user_agent=None, capture=False):
     opts = Options()
     if headless:
         opts.add_argument("--headless=new")
@@ -42,6 +49,8 @@ def build_driver(headless=True, user_agent=None):
     opts.add_experimental_option("prefs", prefs)
     if user_agent:
         opts.add_argument(f"--user-agent={user_agent}")
+    if capture:
+        enable_capture(opts)   # 피드 JSON 응답을 CDP Network 이벤트로 받는다
     driver = webdriver.Chrome(options=opts)
     try:
         driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
@@ -216,8 +225,8 @@ def parse_item_div(div) -> Optional[Dict[str, Any]]:
         print(f"[PARSE-FAIL] data-key={div.get('data-key')} : {e}")
         return None
 
-client = storage.Client()
-bucket = storage.Client().bucket("vton-mss-snap")
+bucket = get_bucket("vton-mss-snap")
+IMAGE_STORE = None   # --dedup 이면 ImageStore
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -240,145 +249,164 @@ def upload_json_item(bucket, data, folder1: str, folder2: str, filename: str):
         path = f"{folder1}/{filename}"
     else:
         path = f"json/{folder1}/{folder2}/{filename}"
-    blob = bucket.blob(path)
-    blob.upload_from_string(json.dumps(data, ensure_ascii=False, indent=2),
-                            content_type="application/json")
+    put_json_once(bucket, path, data)
 
 def upload_image_from_url(bucket, url: str, gcs_path: str, timeout: int = 20):
-    r = requests.get(url, headers=HEADERS, timeout=timeout, stream=True)
-    r.raise_for_status()
-    ext = _guess_ext(url, r.headers.get("Content-Type"))
-    blob = bucket.blob(gcs_path + ext)
-    bio = io.BytesIO(r.content)
-    blob.cache_control = "public, max-age=31536000"
-    blob.upload_from_file(bio, content_type=r.headers.get("Content-Type") or "image/jpeg")
-
-def upload_images_for_snap(bucket, folder1: str, folder2: str, snap_id: str, img_urls: List[str]):
+    # 본문을 메모리에 다 올리지 않고 chunk 단위로 버킷에 흘려보낸다 (전역 in-flight 바이트 제한)
+    # manifest 에 같은 원본으로 이미 올라간 기록이 있으면 건너뛰고 그 경로(실제 확장자)를 돌려준다
+    return stream_once(bucket, url, gcs_path, headers=HEADERS, timeout=timeout,
+                       cache_control="public, max-age=31536000", ext_from=_guess_ext)
+
+def upload_images_for_snap(bucket, folder1: str, folder2: str, snap_id: str, img_urls: List[str], store=None):
     base = f"images/{folder1}/{folder2}/{snap_id}"
+    if store is not None:
+        # 내용 해시로 blobs/ 에 한 번만 저장하고 {base}/manifest.json 에 {idx} → blob 경로
+        return list(store.upload_images(base, img_urls, start=1, headers=HEADERS, ext_from=_guess_ext).values())
+    paths = []
     for idx, url in enumerate(img_urls, 1):
         gcs_path = f"{base}/{idx}"   # 확장자는 upload_image_from_url 내부에서 결정
         try:
-            upload_image_from_url(bucket, url, gcs_path)
+            paths.append(upload_image_from_url(bucket, url, gcs_path))
         except Exception as e:
             print(f"[IMG-FAIL] {url} -> gs://{bucket.name}/{gcs_path}*  ({e})")
+    return paths   # 실제 저장된 경로 (확장자 포함, 실패한 이미지는 빠짐)
 
 def download_from_gcs(bucket_name: str, source_blob_name: str, destination_file: str):
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(source_blob_name)
-    blob.download_to_filename(destination_file)
-    print(f"✅ Downloaded gs://{bucket_name}/{source_blob_name} → {destination_file}")
+    download_to_file(bucket_name, source_blob_name, destination_file)
 
-local_snapid_path = "./done_snap_ids.json"
+# 이미 수집한 snap id: 정렬된 int64 base + delta 세그먼트 (files/done_snap_ids/ 아래)
+# 원격에 아직 없으면 예전 files/done_snap_ids.json 을 한 번 가져와 base 로 만든다.
+SEEN_IDS = SeenIdStore("./done_snap_ids", bucket)
 try:
-    download_from_gcs(
-        bucket_name=bucket.name,
-        source_blob_name=f"files/done_snap_ids.json",
-        destination_file=local_snapid_path
-    )
+    SEEN_IDS.sync(legacy_json="files/done_snap_ids.json")
 except Exception as e:
-    print(f"[WARN] cannot download done_ids from GCS: {e}")
+    print(f"[WARN] cannot sync done_ids from GCS: {e}")
 
 
 def crawl_snaps(crawl_snaps_list):
-    page_urls = []
-    for snap_id in crawl_snaps_list:
-        page_urls.append(f"https://www.musinsa.com/snap/{snap_id}")
-
+    """(저장한 레코드 목록, 저장까지 끝난 요청 snap id 목록) 을 돌려준다."""
     all_items = []
     total_datas = []
+    done_ids = []
 
-    i = 0
-    for page_url in tqdm(page_urls):
-        driver2.get(page_url)
-        time.sleep(2.0)
+    for snap_id in tqdm(crawl_snaps_list):
+        page_url = f"https://www.musinsa.com/snap/{snap_id}"
+        try:
+            driver2.get(page_url)
+            dom_wait.wait_for(driver2, "div[class*='sc-7659943b-0']", fixed_sec=2.0)
 
-        html = driver2.page_source
-        soup = BeautifulSoup(html, "html.parser")
+            html = driver2.page_source
+            soup = BeautifulSoup(html, "html.parser")
 
-        card_divs = soup.select("div[class*='sc-7659943b-0']")
-        item = parse_item_div(card_divs[0])
+            card_divs = soup.select("div[class*='sc-7659943b-0']")
+            item = parse_item_div(card_divs[0]) if card_divs else None
+        except Exception as e:
+            print(f"[CRAWL-ERR] {page_url} : {e}")
+            continue
         if not item:
             continue
-        # print(f"\n[{i}th] - Item == ", item, "\n\n")
-        all_items.append(item)
-        i += 1
-    
-    for item in all_items:
+        all_items.append((snap_id, item))
+
+    for req_id, item in all_items:
         snap_id = item["snap_id"]
         folder1 = item["folder1"]
         folder2 = item["folder2"]
 
         try:
             upload_json_item(bucket, item, folder1, folder2, f"{snap_id}.json")
-            upload_images_for_snap(bucket, folder1, folder2, snap_id, item["img_urls"])
+            img_paths = upload_images_for_snap(bucket, folder1, folder2, snap_id, item["img_urls"], store=IMAGE_STORE)
 
             total_datas.append({
                 **item,
                 "json_path": f"json/{folder1}/{folder2}/{snap_id}.json",
-                "img_paths": [
-                    f"images/{folder1}/{folder2}/{snap_id}/{idx}.jpg"
-                    for idx in range(1, len(item["img_urls"]) + 1)
-                ],
+                "img_paths": img_paths,
             })
+            done_ids.append(req_id)
         except Exception as e:
             print(f"[SAVE-ERR] snap_id={snap_id} : {e}")
             continue
 
-    return total_datas
+    return total_datas, done_ids
 
 
-def main():
+def main(batch_size: int = 50, capture: bool = False, record_path: Optional[str] = None, harvest: bool = False):
+    # capture 모드: 스크롤마다 새로 받은 피드 JSON 에서만 id 를 뽑는다 (page_source 재파싱 X)
+    cap = NetworkCapture(driver, record_path=record_path) if capture else None
     driver.get("https://www.musinsa.com/snap/main/recommend?sort=NEWEST&gf=A")
+    # harvest 모드: 아직 안 넘긴 카드 링크만 브라우저에서 받는다
+    harvester = DomHarvester(driver, "a[class*='SnapFeedCard__Link']", "href") if harvest else None
     from datetime import date
     today = date.today().strftime("%m_%d")
 
-    with open(local_snapid_path, "r") as f:
-        done_snap_ids = json.load(f)
-
-    new_ids_set = set(done_snap_ids)
-    last_set_length = len(new_ids_set)
+    # 피드에 나온 순서대로 id 를 쌓고 (과거 id 는 SEEN_IDS 로 거름), 아직 안 나간 것만 정확히 넘긴다
+    frontier = SnapFrontier(SEEN_IDS, path=f"./recent_frontier_{today}.log")
     end_count = 0
+    first_round = True
     total_snap_datas = []
 
-    while True:
-        for __ in range(5):
-            driver.execute_script("window.scrollBy(0, 500);")  # 조금씩 내려감
-            time.sleep(0.3)
+    def crawl_batch(batch):
+        products, done_ids = crawl_snaps(batch)
+        frontier.mark_crawled(done_ids)
+        frontier.mark_failed(set(batch) - set(done_ids))
 
-        time.sleep(1.0)
-        html = driver.page_source
-        soup = BeautifulSoup(html, "html.parser")
+        # 그리고 ids 저장, 업로드 — 새 id 만 delta 세그먼트로
+        SEEN_IDS.add_many(done_ids)
+        SEEN_IDS.flush()
 
-        snap_divs = soup.select("a[class*='SnapFeedCard__Link']")
+        # 그리고 additional_json 저장, 업로드 - 현재 월일
+        total_snap_datas.extend(products)
+        with open(f"additional_json_{today}.json", "w") as f:
+            json.dump(total_snap_datas, f, ensure_ascii=False, indent=2)
+        upload_json_item(bucket, total_snap_datas, "files", "", f"additional_json_{today}.json")
+        print(f"[FRONTIER] {frontier.counts()}")
 
-        new_snap_ids = set([c.get("href").split("/")[-1] for c in snap_divs])
-        new_ids_set.update(new_snap_ids)
-        # print("Set : ", len(new_ids_set))
+    while True:
+        base = dom_wait.count(driver, "a[class*='SnapFeedCard__Link']")
+        height = driver.execute_script("return document.body.scrollHeight")
+        for __ in range(5):
+            driver.execute_script("window.scrollBy(0, 500);")  # 조금씩 내려감
 
-        if len(new_ids_set) - 50 > last_set_length:
-            # print("**", len(new_ids_set), last_set_length)
+        # 새 카드가 붙거나 페이지가 길어지면 바로 (예전 0.3s x5 + 1.0s 고정 대기)
+        dom_wait.wait_for_more(driver, "a[class*='SnapFeedCard__Link']", base, fixed_sec=2.5, min_height=height)
+        sids = snap_ids_from_responses(cap.poll()) if cap else []
+        # 첫 화면은 서버가 그려서 보낸 카드라 응답에 없다 → 첫 라운드는 DOM 으로
+        if sids and not first_round:
+            found = frontier.discover(sids)
+        elif harvester:
+            found = frontier.discover(h.split("/")[-1] for h in harvester.harvest())
+        else:
+            # capture 가 없거나 이번 라운드 응답에서 snap id 가 안 나왔으면 기존 DOM 파싱
+            html = driver.page_source
+            soup = BeautifulSoup(html, "html.parser")
+
+            snap_divs = soup.select("a[class*='SnapFeedCard__Link']")
+
+            # set 이 아니라 페이지 순서 그대로
+            found = frontier.discover(c.get("href").split("/")[-1] for c in snap_divs if c.get("href"))
+        first_round = False
+
+        if frontier.pending() >= batch_size:
             # 여기서 크롤링 한번
-            crawl_snaps_list = list(new_ids_set)[last_set_length:]
-            products = crawl_snaps(crawl_snaps_list)
-            # print(f"\n\nDone! : {len(products)}\n\n")
-            
-            # 그리고 ids 저장, 업로드
-            with open(local_snapid_path, "w") as f:
-                json.dump(list(new_ids_set), f, ensure_ascii=False, indent=2)
-            upload_json_item(bucket, list(new_ids_set), "files", "", f"done_snap_ids.json")
-
-            # 그리고 additional_json 저장, 업로드 - 현재 월일
-            total_snap_datas.extend(products)
-            with open(f"additional_json_{today}.json", "w") as f:
-                json.dump(total_snap_datas, f, ensure_ascii=False, indent=2)
-            upload_json_item(bucket, total_snap_datas, "files", "", f"additional_json_{today}.json")
-
-        if len(new_ids_set) == last_set_length:
+            crawl_batch(frontier.take(batch_size))
+
+        if found == 0:
             end_count += 1
             if end_count>3:
                 break
-
-        last_set_length = len(new_ids_set)
+        else:
+            end_count = 0
+
+    # 피드 끝에서 batch_size 를 못 채운 나머지(재시도 포함)도 마저
+    while frontier.pending():
+        crawl_batch(frontier.take(batch_size))
+    frontier.close()
+    if cap:
+        print(f"[CAPTURE] {cap.stats}")
+        cap.close()
+    if harvester:
+        print(harvester.report_line())
+
+    print(dom_wait.report_line())
     print("\n\nDone!\n\n")
     print(f"total_snap_datas: {len(total_snap_datas)}")
     with open(f"additional_json_{today}_done.json", "w") as f:
@@ -386,4 +414,21 @@ def main():
     upload_json_item(bucket, total_snap_datas, "files", "", f"additional_json_{today}_done.json")
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    p = argparse.ArgumentParser(description="최신 스냅 피드 수집")
+    p.add_argument("--dedup", action="store_true", help="이미지를 내용 해시로 한 번만 저장하고 스냅별 manifest.json 으로 연결")
+    p.add_argument("--batch_size", type=int, default=50, help="상세 크롤 한 묶음 크기")
+    p.add_argument("--capture", action="store_true", help="피드 목록을 DOM 대신 CDP 로 잡은 JSON 응답에서 수집")
+    p.add_argument("--record", type=str, default=None, help="capture 한 응답을 JSONL 로 기록 (feed_capture.py --replay 로 재생)")
+    p.add_argument("--harvest", action="store_true", help="page_source 대신 새로 나타난 카드 링크만 브라우저에서 받음")
+    args = p.parse_args()
+    if args.dedup:
+        IMAGE_STORE = ImageStore(bucket)
+    if args.capture:
+        driver.quit()
+        driver = build_driver(headless=True, user_agent=ua, capture=True)
+    main(args.batch_size, args.capture, args.record, args.harvest)
+    SEEN_IDS.close()
+    if IMAGE_STORE:
+        print(IMAGE_STORE.summary())
+        IMAGE_STORE.close()
@@ -0,0 +1,128 @@
+import os
+import re
+import json
+import glob
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+def _truncate_partial_line(path: str) -> None:
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+class JsonlSink:
+    """
+    크롤 결과를 compact JSONL 로 이어 쓰는 체크포인트 writer.
+
+    - {prefix}.part0000.jsonl.open 에 append, flush_every 개마다 fsync
+    - segment_bytes 를 넘으면 .open 을 떼어 sealed 세그먼트로 확정하고 upload(path) 호출
+    - finalize() 는 세그먼트들을 이어 붙여 기존 포맷의 {prefix}_done.json (JSON list) 을 만든다
+    같은 prefix 로 다시 열면 로컬에 남은 세그먼트를 이어서 쓴다.
+    """
+
+    def __init__(self, prefix: str, upload: Optional[Callable[[str], None]] = None,
+                 segment_bytes: int = 8 * 1024 * 1024, flush_every: int = 100):
+        self.prefix = prefix
+        self.upload = upload
+        self.segment_bytes = segment_bytes
+        self.flush_every = flush_every
+
+        self.count = 0
+        self._pending = 0
+        self._fh = None
+        self._seq = 0
+
+        d = os.path.dirname(prefix)
+        if d:
+            os.makedirs(d, exist_ok=True)
+
+        # 재시작: 이전 실행이 남긴 세그먼트 이어받기 (쓰다 죽은 마지막 줄은 잘라낸다)
+        for path in glob.glob(glob.escape(prefix) + ".part*.jsonl.open"):
+            _truncate_partial_line(path)
+        for path in self.segments(include_open=True):
+            with open(path, "rb") as f:
+                self.count += sum(1 for line in f if line.strip())
+        seqs = [int(m.group(1)) for p in self.segments(include_open=True)
+                if (m := re.search(r"\.part(\d+)\.jsonl", p))]
+        if seqs:
+            self._seq = max(seqs)
+            if not os.path.exists(self._seg_path(self._seq) + ".open"):
+                self._seq += 1
+
+    def _seg_path(self, seq: int) -> str:
+        return f"{self.prefix}.part{seq:04d}.jsonl"
+
+    def segments(self, include_open: bool = False):
+        paths = sorted(glob.glob(glob.escape(self.prefix) + ".part*.jsonl"))
+        if include_open:
+            paths = sorted(paths + glob.glob(glob.escape(self.prefix) + ".part*.jsonl.open"))
+        return paths
+
+    def _open(self):
+        if self._fh is None:
+            self._fh = open(self._seg_path(self._seq) + ".open", "ab")
+
+    def append(self, record: Dict[str, Any]) -> None:
+        self._open()
+        self._fh.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+        self.count += 1
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+        if self._fh.tell() >= self.segment_bytes:
+            self.roll()
+
+    def flush(self) -> None:
+        if self._fh is None:
+            return
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        self._pending = 0
+
+    def roll(self) -> Optional[str]:
+        """현재 세그먼트를 확정(sealed)하고 업로드. 비어 있으면 아무것도 안 함."""
+        if self._fh is None:
+            return None
+        self.flush()
+        empty = self._fh.tell() == 0
+        self._fh.close()
+        self._fh = None
+        open_path = self._seg_path(self._seq) + ".open"
+        if empty:
+            os.remove(open_path)
+            return None
+        sealed = self._seg_path(self._seq)
+        os.replace(open_path, sealed)
+        self._seq += 1
+        if self.upload:
+            try:
+                self.upload(sealed)
+            except Exception as e:
+                print(f"[WARN] segment upload failed {sealed}: {e}")
+        return sealed
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        self.flush()
+        for path in self.segments(include_open=True):
+            with open(path, "rb") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+    def finalize(self, done_path: Optional[str] = None, sort_key=None) -> str:
+        """
+        남은 세그먼트를 확정하고 {prefix}_done.json 을 JSON list 로 스트리밍 작성.
+        sort_key 를 주면 정렬을 위해 이 시점에만 전체를 메모리에 올린다.
+        """
+        self.roll()
+        done_path = done_path or f"{self.prefix}_done.json"
+        records = sorted(self, key=sort_key) if sort_key else iter(self)
+        with open(done_path, "w", encoding="utf-8") as out:
+            out.write("[")
+            for n, rec in enumerate(records):
+                out.write(",\n" if n else "\n")
+                out.write(json.dumps(rec, ensure_ascii=False))
+            out.write("\n]\n")
+        return done_path
@@ -0,0 +1,235 @@
+import os
+import re
+import mmap
+import heapq
+import hashlib
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Iterator, List, Optional
+
+# 이미 본 snap id 집합을 압축 저장한다 (done_snap_ids.json 대체).
+#   base_{upto:08d}.i64  : 정렬된 int64 배열 (mmap 으로 열어서 이분 탐색, delta upto 번까지 합쳐진 상태)
+#   delta_{seq:08d}.i64  : flush 때마다 새로 생기는 작은 정렬 배열 — 업로드도 이것만
+# delta 가 max_deltas 개를 넘으면 백그라운드 스레드가 base 와 합쳐 새 base 를 만든다.
+# 숫자가 아닌 id 는 blake2b 8바이트 해시를 음수 int64 로 저장한다 (실제 숫자 id 와 겹치지 않음).
+# 쓰는 프로세스는 하나라고 가정한다 (recent_snap).
+
+_BASE = re.compile(r"base_(\d{8})\.i64$")
+_DELTA = re.compile(r"delta_(\d{8})\.i64$")
+
+
+def id_to_int(sid) -> int:
+    s = str(sid)
+    if s.isdigit() and len(s) < 19:
+        return int(s)
+    h = int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+    return -((h >> 1) + 1)
+
+
+class _Segment:
+    """정렬된 int64 파일. 비어 있지 않으면 mmap, 비어 있으면 빈 배열."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = open(path, "rb")
+        size = os.fstat(self._fh.fileno()).st_size
+        if size:
+            self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+            self.arr = memoryview(self._mm).cast("q")
+        else:
+            self._mm = None
+            self.arr = array("q")
+
+    def __contains__(self, x: int) -> bool:
+        i = bisect_left(self.arr, x)
+        return i < len(self.arr) and self.arr[i] == x
+
+    def __len__(self) -> int:
+        return len(self.arr)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.arr)
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self.arr.release()
+            self._mm.close()
+        self._fh.close()
+
+
+def _write_sorted(path: str, values: Iterable[int]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        buf = array("q")
+        for v in values:
+            buf.append(v)
+            if len(buf) >= 1 << 16:
+                buf.tofile(f)
+                buf = array("q")
+        buf.tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _dedup(it: Iterable[int]) -> Iterator[int]:
+    last = None
+    for v in it:
+        if v != last:
+            yield v
+            last = v
+
+
+class SeenIdStore:
+    def __init__(self, local_dir: str, bucket=None, remote_prefix: str = "files/done_snap_ids",
+                 max_deltas: int = 16):
+        self.local_dir = local_dir
+        self.bucket = bucket
+        self.remote_prefix = remote_prefix.rstrip("/")
+        self.max_deltas = max_deltas
+        os.makedirs(local_dir, exist_ok=True)
+        self.pending = set()
+        self.base: Optional[_Segment] = None
+        self.base_upto = 0
+        self.deltas: List[_Segment] = []
+        self.next_seq = 1
+        self._lock = threading.RLock()
+        self._merging: Optional[threading.Thread] = None
+        self._open_local()
+
+    # ----- 로컬 -----
+    def _open_local(self) -> None:
+        names = os.listdir(self.local_dir)
+        bases = sorted(int(m.group(1)) for m in map(_BASE.match, names) if m)
+        self.base_upto = bases[-1] if bases else 0
+        if bases:
+            self.base = _Segment(os.path.join(self.local_dir, f"base_{self.base_upto:08d}.i64"))
+        seqs = sorted(int(m.group(1)) for m in map(_DELTA.match, names) if m)
+        self.deltas = [_Segment(os.path.join(self.local_dir, f"delta_{s:08d}.i64"))
+                       for s in seqs if s > self.base_upto]
+        self.next_seq = max([self.base_upto] + seqs) + 1
+
+    def _segments(self):
+        return ([self.base] if self.base else []) + list(self.deltas)
+
+    def __contains__(self, sid) -> bool:
+        x = id_to_int(sid)
+        if x in self.pending:
+            return True
+        with self._lock:
+            return any(x in seg for seg in self._segments())
+
+    def __len__(self) -> int:
+        # delta 끼리는 겹치지 않게 add 단계에서 걸러 두므로 단순 합
+        with self._lock:
+            return len(self.pending) + sum(len(s) for s in self._segments())
+
+    def add(self, sid) -> bool:
+        if sid in self:
+            return False
+        self.pending.add(id_to_int(sid))
+        return True
+
+    def add_many(self, sids: Iterable) -> int:
+        return sum(1 for sid in sids if self.add(sid))
+
+    # ----- 원격 동기화 -----
+    def _remote(self, name: str) -> str:
+        return f"{self.remote_prefix}/{name}"
+
+    def sync(self, legacy_json: Optional[str] = None) -> None:
+        """원격의 최신 base 와 그 이후 delta 중 로컬에 없는 것만 내려받는다. 원격이 비어 있으면 legacy JSON 을 가져온다."""
+        if self.bucket is None:
+            return
+        names = [n.rsplit("/", 1)[-1] for n in self.bucket.list(self.remote_prefix + "/")]
+        bases = sorted(int(m.group(1)) for m in map(_BASE.match, names) if m)
+        seqs = sorted(int(m.group(1)) for m in map(_DELTA.match, names) if m)
+        if not bases and not seqs:
+            if legacy_json:
+                self._import_legacy(legacy_json)
+            return
+        upto = bases[-1] if bases else 0
+        want = ([f"base_{upto:08d}.i64"] if bases else []) + [f"delta_{s:08d}.i64" for s in seqs if s > upto]
+        have = set(os.listdir(self.local_dir))
+        for name in want:
+            if name not in have:
+                self.bucket.download(self._remote(name), os.path.join(self.local_dir, name))
+        with self._lock:
+            for seg in self._segments():
+                seg.close()
+            self._open_local()
+        print(f"[SEEN] {self.local_dir}: base upto {self.base_upto}, delta {len(self.deltas)}개, {len(self)} ids")
+
+    def _import_legacy(self, legacy_json: str) -> None:
+        import json
+        try:
+            local = os.path.join(self.local_dir, "legacy.json")
+            self.bucket.download(legacy_json, local)
+            with open(local, "r") as f:
+                n = self.add_many(json.load(f))
+            self.flush()
+            self.merge()
+            print(f"[SEEN] imported {n} ids from gs://{self.bucket.name}/{legacy_json}")
+        except Exception as e:
+            print(f"[WARN] legacy seen ids not imported: {e}")
+
+    # ----- 쓰기 -----
+    def flush(self) -> Optional[str]:
+        """pending 을 새 delta 로 저장하고 그 파일만 업로드한다."""
+        with self._lock:
+            if not self.pending:
+                return None
+            seq = self.next_seq
+            self.next_seq += 1
+            path = os.path.join(self.local_dir, f"delta_{seq:08d}.i64")
+            _write_sorted(path, sorted(self.pending))
+            self.deltas.append(_Segment(path))
+            self.pending = set()
+        if self.bucket is not None:
+            self.bucket.put_filename(self._remote(os.path.basename(path)), path)
+        if len(self.deltas) > self.max_deltas:
+            self.merge_async()
+        return path
+
+    def merge(self) -> Optional[str]:
+        """base + delta 전부를 새 base 로 합치고, 원격/로컬의 합쳐진 delta 는 지운다."""
+        with self._lock:
+            segs = self._segments()
+            if len(self.deltas) == 0:
+                return None
+            upto = self.next_seq - 1
+            old_deltas = list(self.deltas)
+        path = os.path.join(self.local_dir, f"base_{upto:08d}.i64")
+        _write_sorted(path, _dedup(heapq.merge(*segs)))
+        if self.bucket is not None:
+            self.bucket.put_filename(self._remote(os.path.basename(path)), path)
+        with self._lock:
+            old_base = self.base
+            self.base = _Segment(path)
+            self.base_upto = upto
+            self.deltas = [d for d in self.deltas if d not in old_deltas]
+        for seg in ([old_base] if old_base else []) + old_deltas:
+            seg.close()
+            os.remove(seg.path)
+            if self.bucket is not None:
+                try:
+                    self.bucket.delete(self._remote(os.path.basename(seg.path)))
+                except Exception as e:
+                    print(f"[WARN] cannot delete {seg.path} remotely: {e}")
+        print(f"[SEEN] merged → {os.path.basename(path)} ({len(self.base)} ids)")
+        return path
+
+    def merge_async(self) -> None:
+        if self._merging and self._merging.is_alive():
+            return
+        self._merging = threading.Thread(target=self.merge, daemon=True)
+        self._merging.start()
+
+    def close(self) -> None:
+        self.flush()
+        if self._merging:
+            self._merging.join()
+        with self._lock:
+            for seg in self._segments():
+                seg.close()
@@ -1,16 +1,21 @@
 # scrape_musinsa_selenium.py
 import os
-import re
-import json
 import time
 import argparse
-from urllib.parse import urljoin
+import asyncio
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from tqdm import tqdm
-from bs4 import BeautifulSoup
 
-# GCS
-from google.cloud import storage
+from product_extract import extract_product
+from crawl_cursor import open_resumable_run
+from driver_pool import session_gone
+
+# GCS (storage_backend 가 공유 클라이언트를 지연 생성)
+from storage_backend import get_bucket
+from range_lease import RangeLeases
 
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
@@ -27,154 +32,11 @@ def upload_to_gcs(local_file_path: str, bucket_name: str = "vton-mss", folder: s
     if destination_name is None:
         destination_name = os.path.basename(local_file_path)
 
-    storage_client = storage.Client()
     blob_name = f"{folder.rstrip('/')}/{destination_name}" if folder else destination_name
-    bucket = storage_client.bucket(bucket_name)
-    blob = bucket.blob(blob_name)
-    blob.upload_from_filename(local_file_path)
+    get_bucket(bucket_name).put_filename(blob_name, local_file_path)
     print(f"✅ Uploaded {local_file_path} to gs://{bucket_name}/{blob_name}")
 
 
-# ====== 파싱 유틸 ======
-def parse_from_next_data(soup: BeautifulSoup):
-    node = soup.find("script", id="__NEXT_DATA__", type="application/json")
-    if not node:
-        return None
-    data = json.loads(node.text)
-
-    d = data["props"]["pageProps"]["meta"]["data"]
-    style_no = d.get("styleNo", "")
-    product_id = d.get("goodsNo", "")
-    product_name_korean = d.get("goodsNm", "")
-    product_name = d.get("goodsNmEng", "")
-    genders = d.get("sex", [])
-    brand_name_korean = d.get("brandInfo", {}).get("brandName", "")
-    brand_name = d.get("brandInfo", {}).get("brand", "")
-    cat1 = d.get("category", {}).get("categoryDepth1Name", "")
-    cat2 = d.get("category", {}).get("categoryDepth2Name", "")
-    price = d.get("goodsPrice", {}).get("salePrice", 0)
-    review_count = d.get("goodsReview", {}).get("totalCount", -1)
-    review_score = d.get("goodsReview", {}).get("satisfactionScore", -1)
-
-    mats = d.get("goodsMaterial", {}).get("materials", {})
-    extra_infos = []
-    if mats != {}:
-        for m in mats:
-            ifo = [m["name"]]
-            for item in m.get("items", []):
-                if item.get("isSelected", False):
-                    ifo.append(item["name"])
-            extra_infos.append(ifo)
-
-    return {
-        "style_no": style_no,
-        "product_id": product_id,
-        "product_name": product_name,
-        "product_name_korean": product_name_korean,
-        "genders": genders,
-        "brand_name": brand_name,
-        "brand_name_korean": brand_name_korean,
-        "category_depth1": cat1,
-        "category_depth2": cat2,
-        "price_krw": price,
-        "extra_infos": extra_infos,
-        "review_count": review_count,
-        "review_score": review_score,
-    }
-
-
-def parse_from_window_state(html: str):
-    m = re.search(r"window\.__MSS__\.product\.state\s*=\s*({.*?});\s*window\.__MSS__", html, re.S)
-    if not m:
-        m = re.search(r"window\.__MSS__\.product\.state\s*=\s*({.*?});", html, re.S)
-        if not m:
-            return None
-    state = json.loads(m.group(1))
-
-    style_no = state.get("styleNo", "")
-    product_id = state.get("goodsNo", "")
-    product_name_korean = state.get("goodsNm", "")
-    product_name = state.get("goodsNmEng", "")
-    genders = state.get("sex", [])
-    brand_name_korean = state.get("brandInfo", {}).get("brandName", "")
-    brand_name = state.get("brandInfo", {}).get("brand", "")
-    cat1 = state.get("category", {}).get("categoryDepth1Name", "")
-    cat2 = state.get("category", {}).get("categoryDepth2Name", "")
-    price = state.get("goodsPrice", {}).get("salePrice", 0)
-    review_count = state.get("goodsReview", {}).get("totalCount", -1)
-    review_score = state.get("goodsReview", {}).get("satisfactionScore", -1)
-
-    mats = state.get("goodsMaterial", {}).get("materials", {})
-    extra_infos = []
-    if mats != {}:
-        for m in mats:
-            ifo = [m["name"]]
-            for item in m.get("items", []):
-                if item.get("isSelected", False):
-                    ifo.append(item["name"])
-            extra_infos.append(ifo)
-
-    return {
-        "style_no": style_no,
-        "product_id": product_id,
-        "product_name": product_name,
-        "product_name_korean": product_name_korean,
-        "genders": genders,
-        "brand_name": brand_name,
-        "brand_name_korean": brand_name_korean,
-        "category_depth1": cat1,
-        "category_depth2": cat2,
-        "price_krw": price,
-        "extra_infos": extra_infos,
-        "review_count": review_count,
-        "review_score": review_score,
-    }
-
-
-def scrape_product_fields(soup: BeautifulSoup, html: str):
-    try:
-        info = parse_from_next_data(soup)
-        if info:
-            return info
-        info = parse_from_window_state(html)
-        if info:
-            return info
-    except Exception as e:
-        print(e)
-        return None
-
-def normalize(url: str) -> str:
-    if not url:
-        return url
-    if url.startswith("//"):
-        return "https:" + url
-    return urljoin("https://image.msscdn.net/", url)
-
-
-def extract_from_next_data_images(soup: BeautifulSoup):
-    node = soup.find("script", id="__NEXT_DATA__", type="application/json")
-    if not node:
-        return []
-    data = json.loads(node.text)
-    d = data["props"]["pageProps"]["meta"]["data"]
-    gallery = [normalize(x.get("imageUrl")) for x in d.get("goodsImages", []) if x.get("imageUrl")]
-    return gallery
-
-
-def extract_from_window_state_images(html: str):
-    m = re.search(r"window\.__MSS__\.product\.state\s*=\s*({.*?});", html, re.S)
-    if not m:
-        return []
-    state = json.loads(m.group(1))
-    gallery = [normalize(x.get("imageUrl")) for x in state.get("goodsImages", []) if x.get("imageUrl")]
-    return gallery
-
-
-def extract_meta_thumbnail(soup: BeautifulSoup):
-    meta = soup.find("meta", attrs={"property": "og:image"})
-    og_img = normalize(meta["content"]) if meta and meta.get("content") else None
-    return [og_img] if og_img else []
-
 def build_driver2(headless=True, user_agent=None):
     opts = Options()
     if headless:
@@ -253,23 +115,46 @@ def get_html(driver, url: str, wait_sec: int = 6):
 
 
 def get_from_url_selenium(driver, url: str):
+    """(info, image_urls), 상품 정보가 없는 페이지면 None."""
     html = get_html(driver, url)
-    soup = BeautifulSoup(html, "html.parser")
+    try:
+        return extract_product(html)
+    except RuntimeError:
+        return None
 
-    info = scrape_product_fields(soup, html)
-    gal_images = extract_from_next_data_images(soup)
-    if not gal_images:
-        gal_images = extract_from_window_state_images(html)
 
-    thumbnail = extract_meta_thumbnail(soup)
-    image_urls = ([thumbnail[0]] if thumbnail else []) + gal_images
+# ====== 메인 루프 ======
+def record_product_id(d) -> int:
+    return int(d["product_url"].rsplit("/", 1)[-1])
 
-    return info, image_urls
+
+def restore_from_gcs(ori: int, bucket_name: str = "vton-mss"):
+    # 로컬 상태가 없으면(다른 박스에서 재시작) 업로드된 세그먼트와 cursor 를 받아온다
+    bucket = get_bucket(bucket_name)
+    for name in bucket.list(f"temporarysaves/musinsa_datas_{ori}/"):
+        bucket.download(name, os.path.basename(name))
+        print(f"✅ Restored gs://{bucket_name}/{name}")
+
+
+def open_run(ori: int, nums: int):
+    # 확정된 세그먼트와 cursor 만 업로드 (전체 리스트 재덤프/재업로드 X)
+    return open_resumable_run(
+        f"musinsa_datas_{ori}", ori, ori + nums, record_product_id,
+        upload=lambda p: upload_to_gcs(p, folder=f"temporarysaves/musinsa_datas_{ori}"),
+        restore=lambda: restore_from_gcs(ori),
+    )
+
+
+def finalize_run(sink, cursor, ori: int, sort_key=None):
+    cursor.save()
+    if cursor.resumed:
+        sort_key = record_product_id
+    done_path = sink.finalize(f"musinsa_datas_{ori}_done.json", sort_key=sort_key)
+    upload_to_gcs(done_path, folder="temporarysaves")
 
 
-# ====== 메인 루프 ======
 def main(fromn: int, nums: int):
-    total_datas = []
+    sink, cursor = open_run(fromn, nums)
     st = time.time()
     ori = fromn
 
@@ -282,29 +167,14 @@ def main(fromn: int, nums: int):
     driver = build_driver(headless=True, user_agent=ua)
 
     try:
-        for i in tqdm(range(0, nums)):
-            url = f"https://www.musinsa.com/products/{ori + i}"
+        for i, pid in enumerate(tqdm(cursor.claim_iter(), total=cursor.remaining())):
+            url = f"https://www.musinsa.com/products/{pid}"
             # print(url)
 
-            # 주기 저장 및 업로드
-            try:
-                if i % 1000 == 999:
-                    json.dump(total_datas, open(f"musinsa_datas_{ori}.json", "w"), ensure_ascii=False, indent=2)
-                    print(f"데이터 저장: {ori} ~ {ori + i}")
-                    print(f"총 {len(total_datas)}개의 상품 정보를 추출했습니다.")
-                    print(f"총 {time.time() - st:.1f}초 소요.\n")
-                    upload_to_gcs(f"musinsa_datas_{ori}.json", folder="temporarysaves")
-
-                if i % 10000 == 9999:
-                    json.dump(
-                        total_datas, open(f"musinsa_datas_{ori}_{i}.json", "w"), ensure_ascii=False, indent=2
-                    )
-                    print(f"데이터 저장: {ori} ~ {ori + i}")
-                    print(f"총 {len(total_datas)}개의 상품 정보를 추출했습니다.")
-                    print(f"총 {time.time() - st:.1f}초 소요.\n")
-                    upload_to_gcs(f"musinsa_datas_{ori}_{i}.json", folder="temporarysaves")
-            except Exception as e:
-                print("[WARN: save/upload]", e)
+            if i % 1000 == 999:
+                print(f"진행: {ori} ~ {pid}")
+                print(f"총 {sink.count}개의 상품 정보를 추출했습니다.")
+                print(f"총 {time.time() - st:.1f}초 소요.\n")
 
             # 개별 페이지 수집 (간단한 재시도 포함)
             try:
@@ -312,8 +182,10 @@ def main(fromn: int, nums: int):
                 backoff = 1.2
                 for attempt in range(retries):
                     try:
-                        info, image_urls = get_from_url_selenium(driver, url)
-                        total_datas.append({**info, "product_url": url, "image_urls": image_urls})
+                        got = get_from_url_selenium(driver, url)
+                        if got is not None:   # 상품 정보가 없는 페이지는 건너뜀
+                            info, image_urls = got
+                            sink.append({**info, "product_url": url, "image_urls": image_urls})
                         break
                     except Exception as e:
                         if attempt == retries - 1:
@@ -326,23 +198,229 @@ def main(fromn: int, nums: int):
                 time.sleep(0.1)
             except Exception as e:
                 print(e)
-                continue
+            cursor.mark_done(pid)
 
-        json.dump(
-            total_datas, open(f"musinsa_datas_{ori}_done.json", "w"), ensure_ascii=False, indent=2
-        )
-        upload_to_gcs(f"musinsa_datas_{ori}_done.json", folder="temporarysaves")
+        finalize_run(sink, cursor, ori)
         print("Finished!")
     finally:
         driver.quit()
 
 
+# ====== 드라이버 풀 ======
+def _pool_worker(build, drivers, k, ids, out_q, max_restarts: int = 2):
+    """
+    drivers[k] 로 ids 를 차례로 처리하고 (pid, record 또는 None, err) 를 넣는다.
+    err 가 있으면 완료가 아니다 (호출하는 쪽이 done 처리하지 않아서 다음 실행에서 다시 가져온다).
+    브라우저가 죽으면(세션 소실) 새로 띄워서 같은 id 부터 계속, 그것도 안 되면 남은 id 를 모두 err 로.
+    """
+    restarts = 0
+    i = 0
+    while i < len(ids):
+        pid = ids[i]
+        url = f"https://www.musinsa.com/products/{pid}"
+        try:
+            got = get_from_url_selenium(drivers[k], url)
+        except Exception as e:
+            if not session_gone(e):
+                out_q.put((pid, None, e))   # 이 페이지만 실패 (타임아웃 등)
+                i += 1
+                continue
+            try:
+                drivers[k].quit()
+            except Exception:
+                pass
+            drivers[k] = None
+            try:
+                if restarts >= max_restarts:
+                    raise e
+                restarts += 1
+                print(f"[DRIVER] worker {k} 브라우저 재시작 ({restarts}/{max_restarts}): {e}")
+                drivers[k] = build()
+            except Exception as e2:
+                for rest in ids[i:]:
+                    out_q.put((rest, None, e2))
+                return
+            continue
+        if got is None:
+            out_q.put((pid, None, None))   # 상품 정보가 없는 페이지
+        else:
+            info, image_urls = got
+            out_q.put((pid, {**info, "product_url": url, "image_urls": image_urls}, None))
+        i += 1
+        time.sleep(0.1)
+
+
+def iter_driver_pool(ids, n_drivers: int, user_agent: str = None):
+    """
+    ids 를 n_drivers 개의 연속 구간으로 나눠 브라우저마다 하나씩 맡기고,
+    끝나는 순서대로 (pid, record 또는 None, err) 를 yield. err 가 있는 id 는 다시 시도해야 한다.
+    """
+    ids = list(ids)
+    n_drivers = max(1, min(n_drivers, len(ids)))
+    chunk = -(-len(ids) // n_drivers)
+    shards = [ids[k * chunk:(k + 1) * chunk] for k in range(n_drivers)]
+
+    def build():
+        return build_driver(headless=True, user_agent=user_agent)
+
+    drivers = [None] * n_drivers
+    threads = []
+    try:
+        # 크롬 기동이 느리므로 병렬로 띄운다 (하나라도 실패하면 이미 뜬 것까지 finally 에서 정리)
+        with ThreadPoolExecutor(max_workers=n_drivers) as ex:
+            futures = [ex.submit(build) for _ in range(n_drivers)]
+        for k, fut in enumerate(futures):
+            if fut.exception() is None:
+                drivers[k] = fut.result()
+        for fut in futures:
+            if fut.exception() is not None:
+                raise fut.exception()
+
+        out_q = queue.Queue()
+        threads = [
+            threading.Thread(target=_pool_worker, args=(build, drivers, k, shard, out_q), daemon=True)
+            for k, shard in enumerate(shards)
+        ]
+        for t in threads:
+            t.start()
+        for _ in range(len(ids)):
+            yield out_q.get()
+    finally:
+        for t in threads:
+            t.join(timeout=30)
+        for drv in drivers:
+            if drv is None:
+                continue
+            try:
+                drv.quit()
+            except Exception:
+                pass
+
+
+def main_pool(fromn: int, nums: int, drivers: int):
+    sink, cursor = open_run(fromn, nums)
+    st = time.time()
+    ori = fromn
+    ua = (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36"
+    )
+
+    ids = list(cursor.pending())
+    retry = 0
+    for i, (pid, record, err) in enumerate(tqdm(iter_driver_pool(ids, drivers, ua), total=len(ids))):
+        if err is not None:
+            retry += 1   # done 처리하지 않음 → 다음 실행에서 다시
+            continue
+        if record is not None:
+            sink.append(record)
+        cursor.mark_done(pid)
+
+        if i % 1000 == 999:
+            print(f"진행: {i + 1}/{len(ids)} (drivers={drivers})")
+            print(f"총 {sink.count}개의 상품 정보를 추출했습니다.")
+            print(f"총 {time.time() - st:.1f}초 소요.\n")
+
+    # 구간별로 끝나는 순서가 섞이므로 최종 결과는 id 순으로 정렬
+    finalize_run(sink, cursor, ori, sort_key=record_product_id)
+    print(f"Finished! 브라우저 오류로 남은 id {retry}개 (다시 실행하면 이어서)")
+
+
+# ====== HTTP 우선 + 셀레니움 fallback ======
+def is_complete_record(info, image_urls) -> bool:
+    # 상품번호/이름/이미지가 모두 있어야 정상 수집으로 본다
+    return bool(info and info.get("product_id") and info.get("product_name_korean") and image_urls)
+
+
+def main_hybrid(fromn: int, nums: int, concurrency: int, drivers: int):
+    from zcx import iter_products, classify_error
+    from id_bitmap import DEAD
+
+    sink, cursor = open_run(fromn, nums)
+    fallback_ids = []
+    dead = 0
+    st = time.time()
+    ori = fromn
+
+    async def http_phase():
+        nonlocal dead
+        pbar = tqdm(total=cursor.remaining(), desc="http")
+        async for pid, url, info, image_urls, err in iter_products(cursor.claim_iter(), concurrency):
+            if err is None and is_complete_record(info, image_urls):
+                sink.append({**info, "product_url": url, "image_urls": image_urls})
+                cursor.mark_done(pid)
+            elif err is not None and classify_error(err) == DEAD:
+                # 404/410 은 브라우저로 열어도 같다 → 바로 완료
+                dead += 1
+                cursor.mark_done(pid)
+            else:
+                # 차단(403, 429) / 5xx / 타임아웃 / 상품 정보 없는 200 / 필드 누락은 브라우저로 다시 시도
+                fallback_ids.append(pid)
+            pbar.update(1)
+        pbar.close()
+
+    asyncio.run(http_phase())
+    http_sec = time.time() - st
+    print(f"[HTTP] {sink.count}/{nums} 성공, 없는 id {dead}개, fallback {len(fallback_ids)}개 ({http_sec:.1f}초)")
+    sink.roll()  # HTTP 단계 결과는 브라우저 단계 전에 확정/업로드
+
+    if fallback_ids:
+        ua = (
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) "
+            "Chrome/120.0.0.0 Safari/537.36"
+        )
+        recovered = retry = 0
+        for pid, record, err in tqdm(iter_driver_pool(fallback_ids, drivers, ua), total=len(fallback_ids),
+                                     desc="selenium"):
+            if err is not None:
+                retry += 1   # inflight 로 남겨서 다음 실행에서 다시
+                continue
+            if record is not None:
+                sink.append(record)
+                recovered += 1
+            cursor.mark_done(pid)
+        print(f"[SELENIUM] {recovered}/{len(fallback_ids)} 복구, 브라우저 오류로 남은 id {retry}개 "
+              f"({time.time() - st - http_sec:.1f}초)")
+
+    finalize_run(sink, cursor, ori, sort_key=record_product_id)
+    print(f"Finished! 총 {sink.count}개, {time.time() - st:.1f}초")
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Scrape Musinsa with Selenium")
-    parser.add_argument("--fromn", type=int, required=True, help="시작 인덱스(배수 스킴은 기존 코드와 동일)")
-    parser.add_argument("--nums", type=int, required=True, help="수집 개수")
+    parser.add_argument("--fromn", type=int, default=None, help="시작 인덱스(배수 스킴은 기존 코드와 동일)")
+    parser.add_argument("--nums", type=int, default=None, help="수집 개수")
+    parser.add_argument("--start", type=int, default=None, help="시작 상품 id 를 직접 지정 (--fromn 배수 스킴 대신, supervisor 용)")
+    parser.add_argument("--lease_job", type=str, default=None, help="버킷 lease 로 여러 노드가 구간을 나눠 갖는 작업 이름")
+    parser.add_argument("--lease_range", type=str, default=None, help="--lease_job 의 전체 상품 id 구간 START:END")
+    parser.add_argument("--lease_chunk", type=int, default=5000, help="--lease_job 에서 한 번에 잡는 id 수")
+    parser.add_argument("--lease_sec", type=float, default=900, help="lease 만료 시간(초), 작업 중에는 자동 갱신")
+    parser.add_argument("--lease_bucket", type=str, default="vton-mss", help="lease 오브젝트를 둘 버킷")
+    parser.add_argument("--drivers", type=int, default=1, help="동시에 띄울 headless 크롬 수")
+    parser.add_argument("--hybrid", action="store_true", help="HTTP로 먼저 받고 실패한 id만 셀레니움으로 재시도")
+    parser.add_argument("--concurrency", type=int, default=16, help="--hybrid 의 HTTP 동시 요청 수")
 
     args = parser.parse_args()
-    # 기존 코드의 시작 오프셋 계산을 그대로 유지
-    start_num = args.fromn * args.nums + 1000000
-    main(start_num, args.nums)
+    def run_range(start_num, nums):
+        if args.hybrid:
+            main_hybrid(start_num, nums, args.concurrency, args.drivers)
+        elif args.drivers > 1:
+            main_pool(start_num, nums, args.drivers)
+        else:
+            main(start_num, nums)
+
+    if args.lease_job:
+        # 노드마다 --fromn 을 나눠 정하지 않고, 버킷 lease 로 남은 chunk 를 하나씩 잡아 처리
+        if not args.lease_range:
+            parser.error("--lease_job 에는 --lease_range START:END 가 필요합니다")
+        lo, hi = (int(x) for x in args.lease_range.split(":"))
+        RangeLeases(get_bucket(args.lease_bucket), args.lease_job, lo, hi, args.lease_chunk,
+                    lease_sec=args.lease_sec).run(run_range)
+    else:
+        if (args.fromn is None and args.start is None) or args.nums is None:
+            parser.error("--fromn(또는 --start) 과 --nums 가 필요합니다")
+        # 기존 코드의 시작 오프셋 계산을 그대로 유지
+        start_num = args.start if args.start is not None else args.fromn * args.nums + 1000000
+        run_range(start_num, args.nums)
@@ -12,7 +12,10 @@ import requests
 from bs4 import BeautifulSoup
 from tqdm import tqdm
 
-from google.cloud import storage
+from storage_backend import get_bucket, download_to_file
+from upload_manifest import put_json_once, stream_once
+from copy_engine import SourceIndex, CopyEngine
+from snap_shards import shard
 from supabase import create_client, Client
 
 from selenium import webdriver
@@ -32,23 +35,16 @@ HEADERS = {
 
 NAMESPACE = uuid.UUID("12345678-1234-5678-1234-567812345678")  # stable uuid namespace
 
-client = storage.Client()
-
 # ---------- GCS ----------
 def gcs_bucket(name: str = "vton-mss-snap"):
-    return storage.Client().bucket(name)
+    return get_bucket(name)
 
 def download_from_gcs(bucket_name: str, source_blob_name: str, destination_file: str):
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(source_blob_name)
-    blob.download_to_filename(destination_file)
-    print(f"✅ Downloaded gs://{bucket_name}/{source_blob_name} → {destination_file}")
+    download_to_file(bucket_name, source_blob_name, destination_file)
 
 def upload_json_item(bucket, data, folder1: str, folder2: str, filename: str):
     path = f"json/{folder1}/{folder2}/{filename}"
-    blob = bucket.blob(path)
-    blob.upload_from_string(json.dumps(data, ensure_ascii=False, indent=2),
-                            content_type="application/json")
+    put_json_once(bucket, path, data)
 
 def _guess_ext(url: str, content_type: Optional[str]) -> str:
     ext = os.path.splitext(url.split("?")[0])[1].lower()
@@ -61,22 +57,24 @@ def _guess_ext(url: str, content_type: Optional[str]) -> str:
     return ".jpg"
 
 def upload_image_from_url(bucket, url: str, gcs_path: str, timeout: int = 20):
-    r = requests.get(url, headers=HEADERS, timeout=timeout, stream=True)
-    r.raise_for_status()
-    ext = _guess_ext(url, r.headers.get("Content-Type"))
-    blob = bucket.blob(gcs_path + ext)
-    bio = io.BytesIO(r.content)
-    blob.cache_control = "public, max-age=31536000"
-    blob.upload_from_file(bio, content_type=r.headers.get("Content-Type") or "image/jpeg")
-
-def upload_images_for_snap(bucket, folder1: str, folder2: str, snap_id: str, img_urls: List[str]):
+    # 본문을 메모리에 다 올리지 않고 chunk 단위로 버킷에 흘려보낸다 (전역 in-flight 바이트 제한)
+    # manifest 에 같은 원본으로 이미 올라간 기록이 있으면 건너뛰고 그 경로(실제 확장자)를 돌려준다
+    return stream_once(bucket, url, gcs_path, headers=HEADERS, timeout=timeout,
+                       cache_control="public, max-age=31536000", ext_from=_guess_ext)
+
+def upload_images_for_snap(bucket, folder1: str, folder2: str, snap_id: str, img_urls: List[str], store=None):
     base = f"images/{folder1}/{folder2}/{snap_id}"
+    if store is not None:
+        # 내용 해시로 blobs/ 에 한 번만 저장하고 {base}/manifest.json 에 {idx} → blob 경로
+        return list(store.upload_images(base, img_urls, start=1, headers=HEADERS, ext_from=_guess_ext).values())
+    paths = []
     for idx, url in enumerate(img_urls, 1):
         gcs_path = f"{base}/{idx}"   # 확장자는 upload_image_from_url 내부에서 결정
         try:
-            upload_image_from_url(bucket, url, gcs_path)
+            paths.append(upload_image_from_url(bucket, url, gcs_path))
         except Exception as e:
             print(f"[IMG-FAIL] {url} -> gs://{bucket.name}/{gcs_path}*  ({e})")
+    return paths   # 실제 저장된 경로 (확장자 포함, 실패한 이미지는 빠짐)
 
 # ---------- Utils ----------
 def stable_uuid(text: str) -> uuid.UUID:
@@ -341,7 +339,7 @@ def scrape_page(driver, page_url: str) -> List[Dict[str, Any]]:
     return list(all_items.values())
 
 # ---------- Main ----------
-def main(index: int, supabase_url: str, supabase_key: str):
+def main(index: int, supabase_url: str, supabase_key: str, shard_mode: str = "sorted"):
     supabase = create_client(supabase_url, supabase_key)
     bucket = gcs_bucket()
 
@@ -360,14 +358,27 @@ def main(index: int, supabase_url: str, supabase_key: str):
     for p in no_products_list:
         total_products_json[p["snap_id"]] = p
 
-    target_snaps = no_products_list[index*5000:(index+1)*5000]
+    target_snaps = shard(no_products_list, index, 5000, shard_mode)
     print(f"target_snaps : {len(target_snaps)}")
 
+    # 원본 이미지 실제 이름은 snap 마다 자기 폴더만 목록 조회해서 찾는다 (.jpg/.png 시도-실패 없음)
+    # 공통 prefix 로 잡으면 images/ 까지 올라가서 이미지 트리 전체를 훑게 된다
+    src_prefixes = {p.rsplit("/", 1)[0] + "/" for snap in target_snaps for p in snap.get("img_paths", [])}
+    engine = CopyEngine(bucket, SourceIndex(bucket, src_prefixes, cache_path=f"./src_listing_{index}.jsonl"))
+
     check_done_ids = set()
 
     total_datas: List[Dict[str, Any]] = []
+    unsettled: List[Any] = []  # (total_datas 항목, add() 가 돌려준 대상 경로들) — 아직 복사 결과 모름
     roll_count = 0
 
+    def settle():
+        # 예약된 복사를 다 돌린 뒤 성공한 것만 img_paths 에 남긴다
+        engine.flush()
+        for row, dst_paths in unsettled:
+            row["img_paths"] = engine.succeeded(dst_paths)
+        unsettled.clear()
+
     # Selenium 드라이버
     ua = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
           "AppleWebKit/537.36 (KHTML, like Gecko) "
@@ -389,29 +400,21 @@ def main(index: int, supabase_url: str, supabase_key: str):
                 try:
                     upload_json_item(bucket, item, folder1, folder2, f"{snap_id}.json")
                     if snap_id in total_products_json:
-                        for idx, source_path in enumerate(total_products_json[snap_id]['img_paths']):
-                            dst_path = f"images/{folder1}/{folder2}/{snap_id}/{idx}.jpg"
-                            try:
-                                blob = bucket.blob(source_path)
-                                new_blob = bucket.copy_blob(blob, bucket, dst_path)
-                            except Exception as e:
-                                blob = bucket.blob(source_path[:-4] + ".png")
-                                new_blob = bucket.copy_blob(blob, bucket, dst_path)
-                            # blob.delete()
-
-                        total_datas.append({
-                            **item,
-                            "json_path": f"json/{folder1}/{folder2}/{snap_id}.json",
-                            "img_paths": [
-                                f"images/{folder1}/{folder2}/{snap_id}/{idx}.jpg"
-                                for idx in range(1, len(item["img_urls"]) + 1)
-                            ],
-                        })
+                        # 복사는 engine 이 batch 로 모아서 동시에 처리, 대상 경로는 원본 실제 확장자를 따른다
+                        dst_paths = engine.add_many(
+                            (source_path, f"images/{folder1}/{folder2}/{snap_id}/{idx}.jpg")
+                            for idx, source_path in enumerate(total_products_json[snap_id]['img_paths'], 1)
+                        )
+
+                        row = {**item, "json_path": f"json/{folder1}/{folder2}/{snap_id}.json", "img_paths": []}
+                        total_datas.append(row)
+                        unsettled.append((row, dst_paths))
 
                         check_done_ids.add(snap_id)
                         roll_count += 1
 
                     if len(total_datas) % 500 == 0:
+                        settle()
                         with open(f"data_added_{index}.json", "w") as f:
                             json.dump(total_datas, f, ensure_ascii=False, indent=2)
                         upload_json_item(bucket, total_datas, "snaps", "additional_tuned", f"data_added_{index}.json")
@@ -425,6 +428,8 @@ def main(index: int, supabase_url: str, supabase_key: str):
             driver.quit()
         except Exception:
             pass
+        settle()
+        engine.close(f"./copy_report_{index}.json")
 
     print(f"[DONE] total_datas : {len(total_datas)}")
     with open(f"data_added_{index}_done.json", "w") as f:
@@ -436,7 +441,9 @@ if __name__ == "__main__":
     p.add_argument("--index", type=int, default=100, help="롤링 저장 인덱스")
     p.add_argument("--supabase_url", type=str, required=True, help="Supabase URL")
     p.add_argument("--supabase_key", type=str, required=True, help="Supabase Key")
+    p.add_argument("--shard_mode", type=str, default="sorted", choices=("sorted", "list"),
+                   help="sorted: snap_id 정렬 후 구간, list: 파일 순서 그대로 (예전 방식)")
     args = p.parse_args()
 
     print("Supabase ", args.supabase_url)
-    main(args.index, args.supabase_url, args.supabase_key)
+    main(args.index, args.supabase_url, args.supabase_key, args.shard_mode)
@@ -0,0 +1,87 @@
+import os
+from typing import Dict, Iterable, List, Optional
+
+# 피드에서 발견한 snap id → 상세 크롤로 넘기는 순서 보존 frontier.
+#   discovered → queued → crawled / failed
+# 처음 발견한 순서(dict 삽입 순서)대로 내보내고, 이미 본 id(seen)와 이번 실행에서 한 번 나간 id 는 다시 내보내지 않는다.
+# path 를 주면 상태 변화를 한 줄씩 append 해서 재시작 때 이어받는다 (queued 였던 것은 다시 discovered 로).
+
+DISCOVERED = "discovered"
+QUEUED = "queued"
+CRAWLED = "crawled"
+FAILED = "failed"
+
+
+class SnapFrontier:
+    def __init__(self, seen=None, path: Optional[str] = None, max_attempts: int = 2):
+        self.seen = seen
+        self.max_attempts = max_attempts
+        self.state: Dict[str, str] = {}
+        self.attempts: Dict[str, int] = {}
+        self._fh = None
+        if path:
+            if os.path.exists(path):
+                with open(path, "r") as f:
+                    for line in f:
+                        parts = line.rstrip("\n").split("\t")
+                        if len(parts) == 2:
+                            self._apply(parts[1], parts[0])
+                for sid, st in self.state.items():
+                    if st == QUEUED:   # 크롤 도중 죽은 것
+                        self.state[sid] = DISCOVERED
+            self._fh = open(path, "a")
+
+    def _apply(self, sid: str, st: str) -> None:
+        if st == QUEUED:
+            self.attempts[sid] = self.attempts.get(sid, 0) + 1
+        self.state[sid] = st
+
+    def _set(self, sids: Iterable[str], st: str) -> None:
+        lines = []
+        for sid in sids:
+            self._apply(sid, st)
+            lines.append(f"{st}\t{sid}\n")
+        if self._fh and lines:
+            self._fh.write("".join(lines))
+            self._fh.flush()
+
+    def discover(self, sids: Iterable[str]) -> int:
+        """페이지에 나온 순서대로 넣는다. 처음 보는 id 개수를 돌려준다."""
+        new = [sid for sid in dict.fromkeys(sids)
+               if sid and sid not in self.state and not (self.seen is not None and sid in self.seen)]
+        self._set(new, DISCOVERED)
+        return len(new)
+
+    def pending(self) -> int:
+        return sum(1 for st in self.state.values() if st == DISCOVERED)
+
+    def take(self, n: Optional[int] = None) -> List[str]:
+        """discovered 인 id 를 발견 순서대로 최대 n 개 꺼내 queued 로 바꾼다."""
+        out = []
+        for sid, st in self.state.items():
+            if st == DISCOVERED:
+                out.append(sid)
+                if n is not None and len(out) >= n:
+                    break
+        self._set(out, QUEUED)
+        return out
+
+    def mark_crawled(self, sids: Iterable[str]) -> None:
+        self._set(sids, CRAWLED)
+
+    def mark_failed(self, sids: Iterable[str]) -> None:
+        """실패한 id 는 max_attempts 전까지 discovered 로 되돌려 다음 묶음에 다시 넣는다."""
+        sids = list(sids)
+        self._set([s for s in sids if self.attempts.get(s, 0) < self.max_attempts], DISCOVERED)
+        self._set([s for s in sids if self.attempts.get(s, 0) >= self.max_attempts], FAILED)
+
+    def counts(self) -> Dict[str, int]:
+        out = {DISCOVERED: 0, QUEUED: 0, CRAWLED: 0, FAILED: 0}
+        for st in self.state.values():
+            out[st] += 1
+        return out
+
+    def close(self) -> None:
+        if self._fh:
+            self._fh.close()
+            self._fh = None
@@ -0,0 +1,157 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+import subprocess
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# snap 목록을 --index 별 shard 로 나누는 공통 규칙 (snap_two / snap_three / snap_four).
+#   sorted : snap id 로 중복 제거 + 정렬한 뒤 [index*shard_size, (index+1)*shard_size)
+#            snap id 는 늘어나는 숫자라 새 id 가 뒤에 붙어도 앞 shard 는 그대로
+#   hash   : blake2b(snap id) % num_shards == index (num_shards 를 고정해야 함)
+#   list   : 예전 방식 — 입력 순서 그대로 잘라낸다 (이미 돌던 shard 를 같은 방식으로 마저 끝낼 때만)
+# set 순회 순서(PYTHONHASHSEED 에 따라 프로세스마다 다름)에 의존하지 않는다.
+
+MODES = ("sorted", "hash", "list")
+
+
+def snap_key(x: Any) -> str:
+    """snap id 문자열 / snap URL / snap_id·snap_url·url 을 가진 dict 에서 snap id."""
+    if isinstance(x, dict):
+        x = x.get("snap_id") or x.get("snap_url") or x.get("url") or ""
+    s = str(x).rstrip("/")
+    return s.rsplit("/snap/", 1)[-1].split("?")[0] if "/snap/" in s else s
+
+
+def _order(sid: str):
+    return (0, int(sid), "") if sid.isdigit() else (1, 0, sid)
+
+
+def stable_hash(sid: str) -> int:
+    return int.from_bytes(hashlib.blake2b(sid.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def count_shards(n: int, shard_size: int) -> int:
+    return -(-n // shard_size)
+
+
+def shard_tag(index: int, shard_size: int = 5000, mode: str = "sorted", num_shards: Optional[int] = None) -> str:
+    """
+    결과 파일 이름용 shard 이름. 기본 크기(5000)의 list 만 예전 이름({index}) 그대로.
+    sorted 는 같은 index 라도 담는 snap 이 list 와 다르므로 s 를 붙여 예전 결과 파일과 섞이지 않게 한다.
+    """
+    if mode == "hash":
+        return f"h{num_shards}_{index}"
+    if mode == "sorted":
+        return f"s_{index}" if shard_size == 5000 else f"s{shard_size}_{index}"
+    return f"{index}" if shard_size == 5000 else f"{shard_size}_{index}"
+
+
+def _unique(items: Iterable, key: Callable[[Any], str]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for it in items:
+        k = key(it)
+        if k and k not in out:
+            out[k] = it
+    return out
+
+
+def shard(items: Iterable, index: int, shard_size: int = 5000, mode: str = "sorted",
+          num_shards: Optional[int] = None, key: Callable[[Any], str] = snap_key) -> List:
+    """index 번째 shard 의 원소들 (정렬 순서)."""
+    if mode == "list":
+        return list(items)[index * shard_size:(index + 1) * shard_size]
+    uniq = _unique(items, key)
+    if mode == "sorted":
+        keys = sorted(uniq, key=_order)[index * shard_size:(index + 1) * shard_size]
+    elif mode == "hash":
+        if not num_shards:
+            raise ValueError("hash 모드는 num_shards 가 필요합니다 (목록이 늘어도 shard 가 바뀌지 않게 고정)")
+        keys = sorted((k for k in uniq if stable_hash(k) % num_shards == index), key=_order)
+    else:
+        raise ValueError(f"unknown shard mode: {mode}")
+    return [uniq[k] for k in keys]
+
+
+def assignment(items: List, shard_size: int = 5000, mode: str = "sorted",
+               num_shards: Optional[int] = None, key: Callable[[Any], str] = snap_key) -> Dict[int, List[str]]:
+    """모든 shard → snap id 목록."""
+    items = list(items)
+    n = num_shards if mode == "hash" else count_shards(len(items) if mode == "list" else len(_unique(items, key)),
+                                                      shard_size)
+    return {i: [key(x) for x in shard(items, i, shard_size, mode, num_shards, key)] for i in range(n)}
+
+
+def fingerprint(assign: Dict[int, List[str]]) -> str:
+    h = hashlib.md5()
+    for i in sorted(assign):
+        h.update(f"{i}:{','.join(assign[i])};".encode())
+    return h.hexdigest()
+
+
+def verify(items: List, shard_size: int = 5000, mode: str = "sorted", num_shards: Optional[int] = None,
+           key: Callable[[Any], str] = snap_key) -> Dict[str, Any]:
+    """shard 끼리 겹치지 않는지(disjoint), 합치면 전체인지(complete)."""
+    items = list(items)
+    all_keys = [key(x) for x in items]
+    uniq = set(k for k in all_keys if k)
+    assign = assignment(items, shard_size, mode, num_shards, key)
+    owner: Dict[str, int] = {}
+    overlaps = 0
+    for i, keys in assign.items():
+        for k in keys:
+            if k in owner:
+                overlaps += 1
+            owner[k] = i
+    sizes = [len(v) for v in assign.values()] or [0]
+    return {
+        "mode": mode, "items": len(items), "unique_ids": len(uniq), "input_duplicates": len(all_keys) - len(uniq),
+        "shards": len(assign), "min_size": min(sizes), "max_size": max(sizes),
+        "overlapping_ids": overlaps, "missing_ids": len(uniq - set(owner)),
+        "disjoint": overlaps == 0, "complete": uniq == set(owner), "fingerprint": fingerprint(assign),
+    }
+
+
+def _load(args) -> List:
+    if args.bucket:
+        from storage_backend import get_bucket
+        return json.loads(get_bucket(args.bucket).get_bytes(args.file))
+    with open(args.file, "r") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="snap 목록 shard 배정 확인")
+    p.add_argument("--file", type=str, required=True, help="snap id / URL / dict 의 JSON 목록 (--bucket 이면 오브젝트 경로)")
+    p.add_argument("--bucket", type=str, default=None, help="주면 버킷에서 읽는다")
+    p.add_argument("--shard_size", type=int, default=5000)
+    p.add_argument("--mode", type=str, default="sorted", choices=MODES)
+    p.add_argument("--num_shards", type=int, default=None, help="hash 모드의 shard 수")
+    p.add_argument("--verify", action="store_true", help="disjoint/complete 확인 + 다른 PYTHONHASHSEED 프로세스와 배정 비교")
+    p.add_argument("--show", type=int, default=None, help="이 index 의 shard 요약 출력")
+    p.add_argument("--fingerprint_only", action="store_true", help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    items = _load(args)
+    if args.fingerprint_only:
+        print(fingerprint(assignment(items, args.shard_size, args.mode, args.num_shards)))
+        sys.exit(0)
+    if args.show is not None:
+        ids = [snap_key(x) for x in shard(items, args.show, args.shard_size, args.mode, args.num_shards)]
+        print(json.dumps({"index": args.show, "size": len(ids), "first": ids[:3], "last": ids[-3:]}))
+    if args.verify:
+        report = verify(items, args.shard_size, args.mode, args.num_shards)
+        # 다른 hash seed 로 띄운 프로세스가 같은 배정을 내는지 (set 순서 의존이 없는지)
+        cmd = [sys.executable, os.path.abspath(__file__), "--file", args.file, "--shard_size", str(args.shard_size),
+               "--mode", args.mode, "--fingerprint_only"]
+        if args.bucket:
+            cmd += ["--bucket", args.bucket]
+        if args.num_shards:
+            cmd += ["--num_shards", str(args.num_shards)]
+        prints = {subprocess.run(cmd, env={**os.environ, "PYTHONHASHSEED": str(seed)}, capture_output=True,
+                                 text=True, check=True).stdout.strip() for seed in (1, 2, 3)}
+        report["same_across_processes"] = prints == {report["fingerprint"]}
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        ok = report["disjoint"] and report["complete"] and report["same_across_processes"]
+        sys.exit(0 if ok else 1)
@@ -12,9 +12,17 @@ import requests
 from bs4 import BeautifulSoup
 from tqdm import tqdm
 
-from google.cloud import storage
+from storage_backend import get_bucket, download_to_file
+from upload_manifest import put_json_once, stream_once
+from image_dedup import ImageStore
 from supabase import create_client, Client
 
+from record_sink import JsonlSink
+from feed_capture import enable_capture, NetworkCapture, records_from_responses
+from dom_harvest import DomHarvester
+from snap_shards import MODES as SHARD_MODES, shard, shard_tag
+import dom_wait
+
 # Selenium
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
@@ -35,20 +43,18 @@ NAMESPACE = uuid.UUID("12345678-1234-5678-1234-567812345678")  # stable uuid nam
 
 # ---------- GCS ----------
 def gcs_bucket(name: str = "vton-mss-snap"):
-    return storage.Client().bucket(name)
+    return get_bucket(name)
 
 def download_from_gcs(bucket_name: str, source_blob_name: str, destination_file: str):
-    client = storage.Client()
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(source_blob_name)
-    blob.download_to_filename(destination_file)
-    print(f"✅ Downloaded gs://{bucket_name}/{source_blob_name} → {destination_file}")
+    download_to_file(bucket_name, source_blob_name, destination_file)
 
 def upload_json_item(bucket, data, folder1: str, folder2: str, filename: str):
     path = f"jsons/{folder1}/{folder2}/{filename}"
-    blob = bucket.blob(path)
-    blob.upload_from_string(json.dumps(data, ensure_ascii=False, indent=2),
-                            content_type="application/json")
+    put_json_once(bucket, path, data)
+
+def upload_file_item(bucket, local_path: str, folder1: str, folder2: str):
+    path = f"jsons/{folder1}/{folder2}/{os.path.basename(local_path)}"
+    bucket.put_filename(path, local_path, content_type="application/json")
 
 def _guess_ext(url: str, content_type: Optional[str]) -> str:
     ext = os.path.splitext(url.split("?")[0])[1].lower()
@@ -61,23 +67,25 @@ def _guess_ext(url: str, content_type: Optional[str]) -> str:
     return ".jpg"
 
 def upload_image_from_url(bucket, url: str, gcs_path: str, timeout: int = 20):
-    r = requests.get(url, headers=HEADERS, timeout=timeout, stream=True)
-    r.raise_for_status()
-    ext = _guess_ext(url, r.headers.get("Content-Type"))
-    blob = bucket.blob(gcs_path + ext)
-    bio = io.BytesIO(r.content)
-    blob.cache_control = "public, max-age=31536000"
-    blob.upload_from_file(bio, content_type=r.headers.get("Content-Type") or "image/jpeg")
-
-def upload_images_for_snap(bucket, folder1: str, folder2: str, snap_id: str, img_urls: List[str]):
+    # 본문을 메모리에 다 올리지 않고 chunk 단위로 버킷에 흘려보낸다 (전역 in-flight 바이트 제한)
+    # manifest 에 같은 원본으로 이미 올라간 기록이 있으면 건너뛰고 그 경로(실제 확장자)를 돌려준다
+    return stream_once(bucket, url, gcs_path, headers=HEADERS, timeout=timeout,
+                       cache_control="public, max-age=31536000", ext_from=_guess_ext)
+
+def upload_images_for_snap(bucket, folder1: str, folder2: str, snap_id: str, img_urls: List[str], store=None):
     # images/{folder1}/{folder2}/{snap_id}/{idx}.ext
     base = f"images/{folder1}/{folder2}/{snap_id}"
+    if store is not None:
+        # 내용 해시로 blobs/ 에 한 번만 저장하고 {base}/manifest.json 에 {idx} → blob 경로
+        return list(store.upload_images(base, img_urls, start=1, headers=HEADERS, ext_from=_guess_ext).values())
+    paths = []
     for idx, url in enumerate(img_urls, 1):
         gcs_path = f"{base}/{idx}"   # 확장자는 upload_image_from_url 내부에서 결정
         try:
-            upload_image_from_url(bucket, url, gcs_path)
+            paths.append(upload_image_from_url(bucket, url, gcs_path))
         except Exception as e:
             print(f"[IMG-FAIL] {url} -> gs://{bucket.name}/{gcs_path}*  ({e})")
+    return paths   # 실제 저장된 경로 (확장자 포함, 실패한 이미지는 빠짐)
 
 # ---------- Utils ----------
 def stable_uuid(text: str) -> uuid.UUID:
@@ -98,7 +106,7 @@ def select_one_or(soup, selector, default=None):
     return el if el else default
 
 # ---------- Selenium ----------
-def build_driver(headless=True, user_agent=None):
+def build_driver(headless=True, user_agent=None, capture=False):
     opts = Options()
     if headless:
         opts.add_argument("--headless=new")
@@ -119,6 +127,8 @@ def build_driver(headless=True, user_agent=None):
     opts.add_experimental_option("prefs", prefs)
     if user_agent:
         opts.add_argument(f"--user-agent={user_agent}")
+    if capture:
+        enable_capture(opts)   # 피드 JSON 응답을 CDP Network 이벤트로 받는다
     driver = webdriver.Chrome(options=opts)
     try:
         driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
@@ -133,6 +143,7 @@ def infinite_scroll_collect(driver, max_scrolls: int = 80, sleep_sec: float = 1.
     """
     화면 끝까지 스크롤하며 컨텐츠 로딩을 유도.
     새로운 높이가 안 생기는 경우가 연속 3번 나오면 종료.
+    스크롤 후에는 페이지가 길어지는 즉시 다음으로 (최대 sleep_sec).
     """
     same_count = 0
     last_height = 0
@@ -155,7 +166,7 @@ def infinite_scroll_collect(driver, max_scrolls: int = 80, sleep_sec: float = 1.
         except JavascriptException:
             break
 
-        time.sleep(sleep_sec)
+        dom_wait.wait_for(driver, [], fixed_sec=sleep_sec, min_height=new_height)
         last_height = new_height
 
 # ---------- Parsing per item ----------
@@ -284,29 +295,88 @@ def parse_item_div(div) -> Optional[Dict[str, Any]]:
         return None
 
 # ---------- Supabase ----------
-def supa_has_url(supabase: Client, url: str) -> bool:
+def supa_existing_urls(supabase: Client, urls: List[str], chunk: int = 200) -> Set[str]:
+    """urls 중 logs 에 이미 있는 것. chunk 개씩 in_ 한 번으로 조회."""
+    found: Set[str] = set()
+    for i in range(0, len(urls), chunk):
+        part = urls[i:i + chunk]
+        try:
+            resp = supabase.table("logs").select("url").in_("url", part).execute()
+            found.update(r["url"] for r in (getattr(resp, "data", None) or []))
+        except Exception as e:
+            print(f"[SUPA-ERR] search {len(part)} urls : {e}")
+            # 조회 실패 시 중복 false로 간주(보수적으로 저장 시도)
+    return found
+
+def supa_upsert_logs(supabase: Client, rows: List[Dict[str, Any]]) -> bool:
     try:
-        resp = supabase.table("logs").select("id").eq("url", url).limit(1).execute()
-        data = getattr(resp, "data", None) or []
-        return len(data) > 0
+        supabase.table("logs").upsert(rows, on_conflict="url").execute()
+        return True
     except Exception as e:
-        print(f"[SUPA-ERR] search url={url} : {e}")
-        # 조회 실패 시 중복 false로 간주(보수적으로 저장 시도)
+        print(f"[SUPA-ERR] upsert logs ({len(rows)}): {e}")
         return False
 
-def supa_upsert_log(supabase: Client, row: Dict[str, Any]) -> None:
-    try:
-        supabase.table("logs").upsert(row, on_conflict="url").execute()
-    except Exception as e:
-        print(f"[SUPA-ERR] upsert logs: {e}")
+class LogsCache:
+    """
+    logs.url 존재 여부를 로컬에 캐시하고 upsert 는 모아서 보낸다.
+    이미 있다고 확인된 url 은 cache_path 에 한 줄씩 쌓아서 다음 실행에서도 조회하지 않는다.
+    """
+
+    def __init__(self, supabase: Client, cache_path: str = "./logs_urls.txt", flush_every: int = 100):
+        self.supabase = supabase
+        self.flush_every = flush_every
+        self.known: Set[str] = set()
+        self.pending: List[Dict[str, Any]] = []
+        if os.path.exists(cache_path):
+            with open(cache_path, "r") as f:
+                self.known.update(line.strip() for line in f if line.strip())
+        self._fh = open(cache_path, "a")
+
+    def _remember(self, urls) -> None:
+        new = [u for u in urls if u not in self.known]
+        self.known.update(new)
+        if new:
+            self._fh.write("".join(u + "\n" for u in new))
+            self._fh.flush()
+
+    def existing(self, urls: List[str]) -> Set[str]:
+        """페이지 하나의 url 들을 캐시 + 모르는 것만 in_ 묶음 조회로 확인."""
+        unknown = list(dict.fromkeys(u for u in urls if u not in self.known))
+        if unknown:
+            self._remember(supa_existing_urls(self.supabase, unknown))
+        return {u for u in urls if u in self.known}
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        self.pending.append(row)
+        if len(self.pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.pending:
+            return
+        rows = list({r["url"]: r for r in self.pending}.values())
+        if supa_upsert_logs(self.supabase, rows):
+            self._remember(r["url"] for r in rows)
+            self.pending = []
+        # 실패하면 남겨 두었다가 다음 flush 때 다시 보낸다
+
+    def close(self) -> None:
+        self.flush()
+        self._fh.close()
 
 # ---------- High level: scrape one page with infinite scroll ----------
-def scrape_page(driver, page_url: str) -> List[Dict[str, Any]]:
+def scrape_page(driver, page_url: str, capture: Optional[NetworkCapture] = None,
+                harvest: bool = False) -> List[Dict[str, Any]]:
     """
     페이지 내 무한 스크롤을 수행하며 data-key 보유 카드들을 모두 파싱해 반환.
+    capture 가 있으면 라운드마다 새로 받은 피드 JSON 응답에서 바로 레코드를 만든다.
+    harvest 면 브라우저에서 아직 안 넘긴 카드의 outerHTML 만 받아 그 조각만 파싱한다.
     """
+    if capture:
+        capture.poll()   # 이전 페이지에서 남은 응답은 버린다
     driver.get(page_url)
-    time.sleep(3.0)
+    dom_wait.wait_for(driver, "div[class*='sc-7659943b-0']", fixed_sec=3.0)
+    harvester = DomHarvester(driver, "div[class*='sc-7659943b-0']", "data-key", html=True) if harvest else None
 
     all_items: Dict[str, Dict[str, Any]] = {}
     no_new_rounds = 0
@@ -316,16 +386,24 @@ def scrape_page(driver, page_url: str) -> List[Dict[str, Any]]:
         # 스크롤해서 더 불러오기
         infinite_scroll_collect(driver, max_scrolls=3, sleep_sec=3)
 
-        html = driver.page_source
-        soup = BeautifulSoup(html, "html.parser")
-
-        # data-key를 가진 최상위 카드 컨테이너 수집
-        # 사이트 구조에 맞춰 'data-key'를 가진 div를 폭넓게 선택
-        card_divs = soup.select("div[class*='sc-7659943b-0']")
+        items = records_from_responses(capture.poll()) if capture else []
+        # 응답에서 snap 레코드가 나왔을 때만 믿는다. 첫 라운드는 서버가 그려서 보낸 카드(XHR 로 안 옴)도
+        # 있으니 응답과 상관없이 DOM 도 파싱한다 (같은 snap 은 아래에서 id 로 합쳐진다)
+        if round_idx == 0 or not items:
+            if harvester:
+                # 새 카드 조각만 파싱 (이미 파싱한 카드는 브라우저 쪽에서 걸러짐)
+                items += [parse_item_div(BeautifulSoup(frag, "html.parser").find()) for frag in harvester.harvest()]
+            else:
+                html = driver.page_source
+                soup = BeautifulSoup(html, "html.parser")
+
+                # data-key를 가진 최상위 카드 컨테이너 수집
+                # 사이트 구조에 맞춰 'data-key'를 가진 div를 폭넓게 선택
+                card_divs = soup.select("div[class*='sc-7659943b-0']")
+                items += [parse_item_div(div) for div in card_divs]
 
         new_cnt = 0
-        for div in card_divs:
-            item = parse_item_div(div)
+        for item in items:
             if not item:
                 continue
             sid = item["snap_id"]
@@ -342,12 +420,18 @@ def scrape_page(driver, page_url: str) -> List[Dict[str, Any]]:
         if no_new_rounds >= 2:
             break
 
+    if harvester:
+        print(harvester.report_line())
     return list(all_items.values())
 
 # ---------- Main ----------
-def main(index: int, supabase_url: str, supabase_key: str):
+def main(index: int, supabase_url: str, supabase_key: str, dedup: bool = False,
+         capture: bool = False, record_path: Optional[str] = None, harvest: bool = False,
+         shard_size: int = 5000, shard_mode: str = "sorted", num_shards: Optional[int] = None):
     supabase = create_client(supabase_url, supabase_key)
+    logs = LogsCache(supabase)
     bucket = gcs_bucket()
+    store = ImageStore(bucket) if dedup else None
 
     local_done_path = "./done_ids.json"
     try:
@@ -363,26 +447,37 @@ def main(index: int, supabase_url: str, supabase_key: str):
     done_ids: Set[str] = set(map(str, done_ids_list))
     print(f"done_ids : {len(done_ids)}")
 
+    # set 순회 순서는 프로세스마다 달라서 id 정렬 기준으로 자른다 (snap_shards, list 모드는 파일 순서)
     target_feed_urls = [
-        f"https://www.musinsa.com/snap/{u}" for u in list(done_ids)[index*5000:(index+1)*5000]
+        f"https://www.musinsa.com/snap/{u}"
+        for u in shard(list(map(str, done_ids_list)), index, shard_size, shard_mode, num_shards)
     ]
     print(f"target_feed_urls : {len(target_feed_urls)}")
 
     check_done_ids = set()
-
-    total_datas: List[Dict[str, Any]] = []
+    tag = shard_tag(index, shard_size, shard_mode, num_shards)
+
+    # 세그먼트 단위로만 확정/업로드 (전체 리스트 재덤프 X)
+    sink = JsonlSink(
+        f"data_{tag}",
+        upload=lambda p: upload_file_item(bucket, p, "snaps", f"additional_refined/data_{tag}"),
+        segment_bytes=256 * 1024,
+    )
     roll_count = 0
 
     # Selenium 드라이버
     ua = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
           "AppleWebKit/537.36 (KHTML, like Gecko) "
           "Chrome/120.0.0.0 Safari/537.36")
-    driver = build_driver(headless=True, user_agent=ua)
+    driver = build_driver(headless=True, user_agent=ua, capture=capture)
+    cap = NetworkCapture(driver, record_path=record_path) if capture else None
 
     try:
         for page_url in target_feed_urls:
             print(f"[SCRAPE] {page_url}")
-            items = scrape_page(driver, page_url)
+            items = scrape_page(driver, page_url, cap, harvest)
+            # 페이지 단위로 한 번에 중복 확인 (카드마다 왕복하지 않음)
+            existing = logs.existing([it["snap_url"] for it in items])
 
             for item in tqdm(items, desc="items"):
                 snap_id = item["snap_id"]
@@ -393,7 +488,7 @@ def main(index: int, supabase_url: str, supabase_key: str):
                 if snap_id in check_done_ids:
                     continue
 
-                if supa_has_url(supabase, snap_url):
+                if snap_url in existing:
                     check_done_ids.add(snap_id)
                     continue
                     
@@ -401,32 +496,24 @@ def main(index: int, supabase_url: str, supabase_key: str):
 
                 try:
                     upload_json_item(bucket, item, folder1, folder2, f"{snap_id}.json")
-                    upload_images_for_snap(bucket, folder1, folder2, snap_id, item["img_urls"])
+                    img_paths = upload_images_for_snap(bucket, folder1, folder2, snap_id, item["img_urls"], store=store)
 
-                    supa_upsert_log(supabase, {
+                    logs.upsert({
                         "url": snap_url,
                         "status": "done"
                     })
 
-                    total_datas.append({
+                    sink.append({
                         **item,
                         "json_path": f"jsons/{folder1}/{folder2}/{snap_id}.json",
-                        "img_paths": [
-                            f"images/{folder1}/{folder2}/{snap_id}/{idx}.jpg"
-                            for idx in range(1, len(item["img_urls"]) + 1)
-                        ],
+                        "img_paths": img_paths,
                     })
 
                     check_done_ids.add(snap_id)
                     roll_count += 1
 
-                    # 200개마다 롤링 저장
-                    if len(total_datas) % 200 == 0:
-                        with open(f"data_{index}.json", "w") as f:
-                            json.dump(total_datas, f, ensure_ascii=False, indent=2)
-                        upload_json_item(bucket, total_datas, "snaps", "additional_refined", f"data_{index}.json")
-
-                        # done_ids도 같이 저장(로컬만)
+                    # 200개마다 done_ids 저장(로컬만)
+                    if sink.count % 200 == 0:
                         with open("./check_done_ids.json", "w") as f:
                             json.dump(sorted(list(check_done_ids)), f, ensure_ascii=False, indent=2)
 
@@ -435,16 +522,23 @@ def main(index: int, supabase_url: str, supabase_key: str):
                     continue
 
     finally:
+        if cap:
+            print(f"[CAPTURE] {cap.stats}")
+            cap.close()
         try:
             driver.quit()
         except Exception:
             pass
+        logs.close()
 
-    print(f"[DONE] total_datas : {len(total_datas)}")
+    print(dom_wait.report_line())
+    print(f"[DONE] total_datas : {sink.count}")
     # 최종 저장
-    with open(f"data_{index}_done.json", "w") as f:
-        json.dump(total_datas, f, ensure_ascii=False, indent=2)
-    upload_json_item(bucket, total_datas, "snaps", "additional", f"data_{index}_done.json")
+    done_path = sink.finalize(f"data_{tag}_done.json")
+    upload_file_item(bucket, done_path, "snaps", "additional")
+    if store:
+        print(store.summary())
+        store.close()
 
     # done_ids 최종 저장(로컬만; 필요하면 GCS에도 업로드)
     with open(local_done_path, "w") as f:
@@ -455,7 +549,16 @@ if __name__ == "__main__":
     p.add_argument("--index", type=int, default=100, help="롤링 저장 인덱스")
     p.add_argument("--supabase_url", type=str, required=True, help="Supabase URL")
     p.add_argument("--supabase_key", type=str, required=True, help="Supabase Key")
+    p.add_argument("--dedup", action="store_true", help="이미지를 내용 해시로 한 번만 저장하고 스냅별 manifest.json 으로 연결")
+    p.add_argument("--capture", action="store_true", help="카드를 DOM 대신 CDP 로 잡은 피드 JSON 응답에서 파싱")
+    p.add_argument("--record", type=str, default=None, help="capture 한 응답을 JSONL 로 기록 (feed_capture.py --replay 로 재생)")
+    p.add_argument("--harvest", action="store_true", help="page_source 대신 새 카드 조각만 브라우저에서 받아 파싱")
+    p.add_argument("--shard_size", type=int, default=5000, help="index 하나가 맡는 snap 수")
+    p.add_argument("--shard_mode", type=str, default="sorted", choices=SHARD_MODES,
+                   help="sorted: id 정렬 후 구간, hash: id 해시 %% num_shards, list: 파일 순서 그대로 자르기")
+    p.add_argument("--num_shards", type=int, default=None, help="hash 모드의 전체 shard 수")
     args = p.parse_args()
 
     print("Supabase ", args.supabase_url)
-    main(args.index, args.supabase_url, args.supabase_key)
+    main(args.index, args.supabase_url, args.supabase_key, args.dedup, args.capture, args.record, args.harvest,
+         args.shard_size, args.shard_mode, args.num_shards)
@@ -1,10 +1,16 @@
 import os
+import glob
 import time
 from bs4 import BeautifulSoup
 import requests
 import argparse
 import re
-from google.cloud import storage
+from storage_backend import get_bucket, download_to_file
+from upload_manifest import put_json_once, stream_once
+from image_dedup import ImageStore
+import dom_wait
+from driver_pool import DriverPool
+from snap_shards import MODES as SHARD_MODES, shard, shard_tag, snap_key
 import uuid
 
 # Selenium
@@ -25,18 +31,14 @@ import json
 import io
 import mimetypes
 
-from google.cloud import storage
+
+from record_sink import JsonlSink
 
 os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", "./first-project-438808-dc1804307b11.json")
 
 
 def download_from_gcs(bucket_name: str, source_blob_name: str, destination_file: str):
-    client = storage.Client()
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(source_blob_name)
-    blob.download_to_filename(destination_file)
-
-    print(f"✅ Downloaded gs://{bucket_name}/{source_blob_name} → {destination_file}")
+    download_to_file(bucket_name, source_blob_name, destination_file)
 
 def _guess_ext(url: str, content_type: str | None) -> str:
     # URL에서 확장자 추정 → 없으면 content-type으로 → 최종 기본은 .jpg
@@ -50,23 +52,25 @@ def _guess_ext(url: str, content_type: str | None) -> str:
     return ".jpg"
 
 def upload_image_from_url(bucket, url: str, gcs_path: str, timeout: int = 20):
-    r = requests.get(url, headers=HEADERS, timeout=timeout, stream=True)
-    r.raise_for_status()
-    ext = _guess_ext(url, r.headers.get("Content-Type"))
-    blob = bucket.blob(gcs_path + ext)
-    bio = io.BytesIO(r.content)
-    blob.cache_control = "public, max-age=31536000"
-    blob.upload_from_file(bio, content_type=r.headers.get("Content-Type") or "image/jpeg")
-
-def upload_images_for_snap(bucket, folder1: str, folder2: str, snap_id: str, img_urls: list[str]):
+    # 본문을 메모리에 다 올리지 않고 chunk 단위로 버킷에 흘려보낸다 (전역 in-flight 바이트 제한)
+    # manifest 에 같은 원본으로 이미 올라간 기록이 있으면 건너뛰고 그 경로(실제 확장자)를 돌려준다
+    return stream_once(bucket, url, gcs_path, headers=HEADERS, timeout=timeout,
+                       cache_control="public, max-age=31536000", ext_from=_guess_ext)
+
+def upload_images_for_snap(bucket, folder1: str, folder2: str, snap_id: str, img_urls: list[str], store=None):
     # images/{folder1}/{folder2}/{snap_id}/{idx}.ext
     base = f"images/{folder1}/{folder2}/{snap_id}"
+    if store is not None:
+        # 내용 해시로 blobs/ 에 한 번만 저장하고 {base}/manifest.json 에 {idx} → blob 경로
+        return list(store.upload_images(base, img_urls, start=1, headers=HEADERS, ext_from=_guess_ext).values())
+    paths = []
     for idx, url in enumerate(img_urls, 1):
         gcs_path = f"{base}/{idx}"   # 확장자는 upload_image_from_url 내부에서 결정
         try:
-            upload_image_from_url(bucket, url, gcs_path)
+            paths.append(upload_image_from_url(bucket, url, gcs_path))
         except Exception as e:
             print(f"[IMG-FAIL] {url} -> gs://{bucket.name}/{gcs_path}*  ({e})")
+    return paths   # 실제 저장된 경로 (확장자 포함, 실패한 이미지는 빠짐)
 
 
 
@@ -108,33 +112,49 @@ def build_driver(headless=True, user_agent=None):
     driver.set_page_load_timeout(8)
     return driver
 
+UA = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+      "AppleWebKit/537.36 (KHTML, like Gecko) "
+      "Chrome/120.0.0.0 Safari/537.36")
+
 def get_html(driver, url: str, wait_sec: int = 6) -> str:
     driver.get(url)
     time.sleep(2)
     return driver.page_source
 
 def gcs_bucket(name: str = "vton-mss-snap"):
-    return storage.Client().bucket(name)
+    return get_bucket(name)
 
 def upload_json_item(bucket, data, folder1: str, folder2: str, filename: str):
     path = f"jsons/{folder1}/{folder2}/{filename}"
-    blob = bucket.blob(path)
-    blob.upload_from_string(json.dumps(data, ensure_ascii=False, indent=2),
-                            content_type="application/json")
+    put_json_once(bucket, path, data)
+
+def upload_file_item(bucket, local_path: str, folder1: str, folder2: str):
+    path = f"jsons/{folder1}/{folder2}/{os.path.basename(local_path)}"
+    bucket.put_filename(path, local_path, content_type="application/json")
+
+def restore_segments(bucket, prefix: str, folder1: str, folder2: str):
+    # 로컬에 세그먼트가 없으면(다른 박스에서 재시작) upload_file_item 으로 올린 세그먼트를 받아온다
+    if glob.glob(glob.escape(prefix) + ".part*.jsonl*"):
+        return
+    try:
+        for name in bucket.list(f"jsons/{folder1}/{folder2}/"):
+            if os.path.basename(name).startswith(os.path.basename(prefix) + ".part"):
+                bucket.download(name, f"{os.path.dirname(prefix) or '.'}/{os.path.basename(name)}")
+                print(f"✅ Restored gs://{bucket.name}/{name}")
+    except Exception as e:
+        print(f"[WARN] restore {prefix} failed: {e}")
 
 def musinsa_product_url_from_img(img_url: str) -> str | None:
     m = re.search(r'/goods_img/\d{8}/(\d{6,8})/', img_url)
     return f"https://www.musinsa.com/products/{m.group(1)}" if m else None
 
-def extract_from_url(url: str):
+def extract_from_url(url: str, pool: DriverPool):
     try:
-        ua = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/120.0.0.0 Safari/537.36")
-        driver = build_driver(headless=True, user_agent=ua)
-        driver.get(url)
-        time.sleep(2.5)
-        html  = driver.page_source
+        # 페이지마다 Chrome 을 새로 띄우지 않고 pool 에서 빌려 쓴다 (재활용/hang 감시는 풀이 담당)
+        with pool.page(url) as driver:
+            # 카드와 상품 목록이 그려지면 바로 (최대 2.5초)
+            dom_wait.wait_for(driver, ["div.sc-7659943b-0", "div.sc-7659943b-0 div.sc-d46d4af9-0"], fixed_sec=2.5)
+            html  = driver.page_source
         soup = BeautifulSoup(html, "html.parser")
         one_item = soup.find("div", attrs={"class": "sc-7659943b-0"})
 
@@ -217,56 +237,90 @@ NAMESPACE = uuid.UUID("12345678-1234-5678-1234-567812345678")  # 고정 namespac
 def stable_uuid(text: str) -> uuid.UUID:
     return uuid.uuid5(NAMESPACE, text)
 
-def main(index: int):
+def main(index: int, dedup: bool = False, shard_size: int = 5000, shard_mode: str = "sorted",
+         num_shards: int = None, recycle_pages: int = 300, max_rss_mb: float = 1500, hang_sec: float = 60):
     with open("urls.json", "r") as f:
         datas = json.load(f)
     bucket = gcs_bucket()
-
-    # 사용 예시
-    download_from_gcs(
-        bucket_name="vton-mss-snap",
-        source_blob_name=f"jsons/snaps/all/data_{index}.json",
-        destination_file="./prev_datas.json"
+    store = ImageStore(bucket) if dedup else None
+    # 기본 크기(5000)가 아닌 shard 는 결과 이름이 겹치지 않게 크기를 붙인다 (supervisor 의 작은 chunk)
+    tag = shard_tag(index, shard_size, shard_mode, num_shards)
+
+    # 200개 단위 세그먼트만 확정/업로드 (전체 리스트 재덤프 X)
+    restore_segments(bucket, f"data_{tag}", "snaps", f"all/data_{tag}")
+    sink = JsonlSink(
+        f"data_{tag}",
+        upload=lambda p: upload_file_item(bucket, p, "snaps", f"all/data_{tag}"),
+        segment_bytes=256 * 1024,
     )
-    prev_datas = json.load(open("./prev_datas.json", "r"))
-
-    targets = datas[index * 5000 + len(prev_datas) : (index + 1) * 5000]
-    total_datas = prev_datas
+    if sink.count == 0 and tag == f"{index}" and shard_mode == "list":
+        # 이전 포맷(JSON list) 체크포인트가 있으면 이어받기 (urls.json 순서로 만든 것이라 list 모드에서만)
+        try:
+            download_from_gcs(
+                bucket_name="vton-mss-snap",
+                source_blob_name=f"jsons/snaps/all/data_{index}.json",
+                destination_file="./prev_datas.json"
+            )
+            for rec in json.load(open("./prev_datas.json", "r")):
+                sink.append(rec)
+        except Exception as e:
+            print(f"[WARN] no previous data_{index}.json: {e}")
+
+    # snap id 기준 고정 배정 (urls.json 순서/중복과 무관)
+    # 이어받을 때는 개수가 아니라 sink 에 이미 있는 snap id 로 거른다 (실패한 snap 은 sink 에 없어서 다시 시도)
+    done_ids = {snap_key(rec) for rec in sink} if sink.count else set()
+    targets = [d for d in shard(datas, index, shard_size, shard_mode, num_shards) if snap_key(d['url']) not in done_ids]
+    if done_ids:
+        print(f"[RESUME] data_{tag}: {len(done_ids)}개 처리됨, 남은 snap {len(targets)}개")
+    # 첫 page() 때 Chrome 을 띄우고, 끝나면(또는 프로세스 종료 시) 정리된다
+    pool = DriverPool(lambda: build_driver(headless=True, user_agent=UA),
+                      max_pages=recycle_pages, max_rss_mb=max_rss_mb, hang_sec=hang_sec)
     for d in tqdm(targets):
-        data = extract_from_url(d['url'])
+        data = extract_from_url(d['url'], pool)
         if not data:
             continue
         snap_id = d['url'][len('https://www.musinsa.com/snap/'):]
         upload_json_item(bucket, data, dad[d['types']], data['account_uuid'], f"{snap_id}.json")
 
         # 그리고 img_urls에서 이미지 업로드
-        upload_images_for_snap(
+        img_paths = upload_images_for_snap(
             bucket=bucket,
             folder1=dad[d['types']],
             folder2=str(data['account_uuid']),
             snap_id=snap_id,
             img_urls=data['img_urls'],
+            store=store,
         )
 
         data = {
             **data,
             'json_path': f"jsons/{dad[d['types']]}/{data['account_uuid']}/{snap_id}.json",
-            'img_paths': [f"images/{dad[d['types']]}/{data['account_uuid']}/{snap_id}/{idx}.jpg" for idx in range(1, len(data['img_urls']) + 1)],
+            'img_paths': img_paths,   # _guess_ext 가 고른 실제 확장자 (.png 등) 그대로
         }
 
-        total_datas.append(data)
+        sink.append(data)
 
-        if len(total_datas) % 200 == 199:
-            with open(f"data_{index}.json", "w") as f:
-                json.dump(total_datas, f, ensure_ascii=False, indent=2)
-            upload_json_item(bucket, total_datas, "snaps", "all", f"data_{index}.json")
-    with open(f"data_{index}_done.json", "w") as f:
-        json.dump(total_datas, f, ensure_ascii=False, indent=2)
-    upload_json_item(bucket, total_datas, "snaps", "all", f"data_{index}_done.json")
+    print(dom_wait.report_line())
+    print(pool.report_line())
+    pool.close()
+    done_path = sink.finalize(f"data_{tag}_done.json")
+    upload_file_item(bucket, done_path, "snaps", "all")
+    if store:
+        print(store.summary())
+        store.close()
 
 if __name__ == "__main__":
     p = argparse.ArgumentParser(description="Selenium scrape + upload to GCS (pairs range).")
     p.add_argument("--index", type=int, default=100, help="유효 데이터 묶음 저장 단위")
+    p.add_argument("--dedup", action="store_true", help="이미지를 내용 해시로 한 번만 저장하고 스냅별 manifest.json 으로 연결")
+    p.add_argument("--shard_size", type=int, default=5000, help="index 하나가 맡는 snap 수")
+    p.add_argument("--shard_mode", type=str, default="sorted", choices=SHARD_MODES,
+                   help="sorted: id 정렬 후 구간, hash: id 해시 %% num_shards, list: urls.json 순서 그대로 (예전 방식)")
+    p.add_argument("--num_shards", type=int, default=None, help="hash 모드의 전체 shard 수")
+    p.add_argument("--recycle_pages", type=int, default=300, help="Chrome 한 개로 처리할 최대 페이지 수")
+    p.add_argument("--max_rss_mb", type=float, default=1500, help="Chrome 프로세스 트리 RSS 상한(MB), 넘으면 재시작")
+    p.add_argument("--hang_sec", type=float, default=60, help="get() 이 이보다 오래 걸리면 드라이버를 죽이고 교체")
     args = p.parse_args()
 
-    main(args.index)
+    main(args.index, args.dedup, args.shard_size, args.shard_mode, args.num_shards,
+         args.recycle_pages, args.max_rss_mb, args.hang_sec)
@@ -6,7 +6,12 @@ from supabase import create_client, Client
 import random
 import argparse
 import re
-from google.cloud import storage
+from storage_backend import get_bucket
+from work_queue import SupabaseQueue
+from feed_capture import enable_capture, NetworkCapture, snap_ids_from_responses, total_count_from_json
+from dom_harvest import DomHarvester
+import dom_wait
+from driver_pool import DriverPool
 
 # Selenium
 from selenium import webdriver
@@ -33,7 +38,7 @@ HEADERS = {
 }
 
 # ===== Selenium 드라이버 =====
-def build_driver(headless=True, user_agent=None):
+def build_driver(headless=True, user_agent=None, capture=False):
     opts = Options()
     if headless:
         opts.add_argument("--headless=new")
@@ -53,6 +58,8 @@ def build_driver(headless=True, user_agent=None):
     opts.add_experimental_option("prefs", prefs)
     if user_agent:
         opts.add_argument(f"--user-agent={user_agent}")
+    if capture:
+        enable_capture(opts)   # 피드 JSON 응답을 CDP Network 이벤트로 받는다
     driver = webdriver.Chrome(options=opts)
     try:
         driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
@@ -85,24 +92,38 @@ def get_html(driver, url: str, wait_sec: int = 6) -> str:
 
 
 def gcs_bucket(name: str = "vton-mss"):
-    return storage.Client().bucket(name)
+    return get_bucket(name)
 
 def upload_json_item(bucket, data, folder1: str, filename: str):
     path = f"{folder1}/{filename}"
-    blob = bucket.blob(path)
-    blob.upload_from_string(json.dumps(data, ensure_ascii=False, indent=2),
-                            content_type="application/json")
+    bucket.put_bytes(path, json.dumps(data, ensure_ascii=False, indent=2),
+                     content_type="application/json")
 
-def extract_from_url(url: str, gender: str, types: str, index: int, totals, bucket):
+def extract_from_url(url: str, gender: str, types: str, index: int, totals, bucket, pool: DriverPool,
+                     capture: bool = False, record_path=None, harvest: bool = False):
+    """pool 에서 드라이버를 빌려 url 로 이동한 뒤 collect_from_page. 끝나면 드라이버는 풀로 돌아간다."""
+    caps = []
+
+    def start_capture(driver):
+        # 같은 드라이버가 이전 URL 에서 받은 응답은 버리고 시작
+        cap = NetworkCapture(driver, record_path=record_path)
+        cap.poll()
+        caps[:] = [cap]
+
+    try:
+        with pool.page(url, before_get=start_capture if capture else None) as driver:
+            return collect_from_page(driver, caps[0] if caps else None, url, gender, types, index, totals,
+                                     bucket, harvest)
+    except Exception as e:
+        print(f"[URL : {url}]\nError while loading first driver - {e}")
+        return totals, 0
+    finally:
+        for cap in caps:
+            cap.close()
+
+def collect_from_page(driver, cap, url: str, gender: str, types: str, index: int, totals, bucket,
+                      harvest: bool = False):
     try:
-        # opts = Options()
-        # opts.add_argument("--headless=new")
-        # driver = webdriver.Chrome(options=opts)
-        ua = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/120.0.0.0 Safari/537.36")
-        driver = build_driver(headless=True, user_agent=ua)
-        driver.get(url)
         # 첫 로딩 기다리기
         WebDriverWait(driver, 10).until(
             EC.presence_of_element_located((By.CSS_SELECTOR, "a[href*='/snap/']"))
@@ -110,6 +131,8 @@ def extract_from_url(url: str, gender: str, types: str, index: int, totals, buck
     except Exception as e:
         print(f"[URL : {url}]\nError while loading first driver - {e}")
         return totals, 0
+    # harvest: 이미 넘긴 href 는 브라우저 쪽에서 걸러서 새 /snap/ 링크만 받는다
+    harvester = DomHarvester(driver, "a[href*='/snap/']", "href") if harvest else None
 
     # 스크롤을 여러 번 내려서 추가 로딩
     total_num = 0
@@ -117,22 +140,36 @@ def extract_from_url(url: str, gender: str, types: str, index: int, totals, buck
         count = 0
         last_height = driver.execute_script("return document.body.scrollHeight")
         while True:
-            html = driver.page_source
-            soup = BeautifulSoup(html, "html.parser")
-            text = soup.find("div", attrs={"class": "sc-77827aa3-0"}).find("span", attrs={"class": "text-body_13px_reg"}).text
-            total_num = int(re.sub("개|,", '', text))
-            asa = soup.find_all("a")
-            hrefs = [a.get("href") for a in asa if a.get("href")]
+            got = cap.poll() if cap else []
+            sids = snap_ids_from_responses(got)
+            # 첫 화면은 서버가 그려서 보낸 카드라 응답에 없다 → 첫 라운드는 DOM 으로
+            if sids and count:
+                # 이번 스크롤에서 새로 받은 피드 JSON 만 본다 (snap id 가 안 나오면 DOM 으로)
+                for _, obj in got:
+                    total_num = total_count_from_json(obj) or total_num
+                hrefs = [f"https://www.musinsa.com/snap/{sid}" for sid in sids]
+            elif harvester:
+                text = harvester.text("div.sc-77827aa3-0 span.text-body_13px_reg")
+                if text:
+                    total_num = int(re.sub("개|,", '', text))
+                hrefs = harvester.harvest()
+            else:
+                html = driver.page_source
+                soup = BeautifulSoup(html, "html.parser")
+                text = soup.find("div", attrs={"class": "sc-77827aa3-0"}).find("span", attrs={"class": "text-body_13px_reg"}).text
+                total_num = int(re.sub("개|,", '', text))
+                asa = soup.find_all("a")
+                hrefs = [a.get("href") for a in asa if a.get("href")]
             datas = [{
                 "url": h,
                 "gender": gender,
                 "types": types,
             } for h in hrefs if "/snap/" in h]
             totals.extend(datas)
-            print(f"{total_num}개, datas: {len(datas)}, {datas[0]}")
+            print(f"{total_num}개, datas: {len(datas)}, {datas[0] if datas else None}")
             
             driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)  # 로딩 대기
+            dom_wait.wait_for(driver, [], fixed_sec=2, min_height=last_height)  # 페이지가 길어지면 바로
             new_height = driver.execute_script("return document.body.scrollHeight")
             if new_height == last_height:
                 break
@@ -144,55 +181,84 @@ def extract_from_url(url: str, gender: str, types: str, index: int, totals, buck
                     json.dump(totals, f)
                 upload_json_item(bucket, totals, "snap_temporary", f"second_data_{index}.json")
         # driver.quit()
+        if harvester:
+            print(harvester.report_line())
         return totals, total_num
     except Exception as e:
         print(f"[URL : {url}]\nError while crawling - {e}")
         # driver.quit()
         return totals, total_num
 
-def main(index: int, supabase_url: str, supabase_key: str):
-    # 일단 DB에서 아직 처리되지 않은 URL 하나를 가져온다.
+def main(index: int, supabase_url: str, supabase_key: str, claim_batch: int = 1, lease_sec: int = 900,
+         capture: bool = False, record_path=None, harvest: bool = False,
+         recycle_pages: int = 300, max_rss_mb: float = 1500, hang_sec: float = 60):
+    # logs 에서 wait(또는 lease 만료된 doing) URL 을 claim_batch 개씩 원자적으로 가져온다.
     supabase = create_client(supabase_url, supabase_key)
+    queue = SupabaseQueue(supabase, lease_sec=lease_sec, complete_every=claim_batch)
+    queue.start_heartbeat()   # 처리 중에는 lease 연장, 죽으면 만료 후 다른 워커가 재claim
+
+    # URL 마다 Chrome 을 새로 띄우지 않고 재사용 (N 페이지/RSS 상한마다 재시작, get() 멈춤은 watchdog 이 교체)
+    ua = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+          "AppleWebKit/537.36 (KHTML, like Gecko) "
+          "Chrome/120.0.0.0 Safari/537.36")
+    pool = DriverPool(lambda: build_driver(headless=True, user_agent=ua, capture=capture),
+                      max_pages=recycle_pages, max_rss_mb=max_rss_mb, hang_sec=hang_sec)
 
-    is_finished = False
     totals = []
     bucket = gcs_bucket()
     total_count = 0
-    while not is_finished:
-        print(f"\n\nTotal_count: {total_count}, {len(totals)}\n\n")
-        total_count += 1
-        data = supabase.table("logs").select("*").eq("status", "wait").execute()
-        if len(data.data) == 0:
-            with open(f"second_data_{index}_done.json", "w") as f:
-                json.dump(totals, f)
-            upload_json_item(bucket, totals, "snap_temporary", f"second_data_{index}_done.json")
-            is_finished = True
-            break
-        current_url = random.choice([d['url'] for d in data.data])
-        supabase.table("logs").update({"status": "doing"}).eq("url", current_url).execute()
-        print(f"Current URL: {current_url}")
-
-        gender = current_url.split("gf=")[1].split("&")[0]
-        height = current_url.split("height-range=")[1].split("&")[0].split("..")[0]
-        weight = current_url.split("weight-range=")[1].split("&")[0].split("..")[0]
-        types = current_url.split("types=")[1].split("&")[0]
-
-        origin_num = len(totals)
-        totals, total_num = extract_from_url(current_url, gender, types, index, totals, bucket)
-        if total_num != 0:
-            with open(f"second_data_{index}.json", "w") as f:
-                json.dump(totals, f)
-            upload_json_item(bucket, totals, "snap_temporary", f"second_data_{index}.json")
-        supabase.table("logs").update({"status": "done", "total_num": total_num, "get_num": len(totals) - origin_num}).eq("url", current_url).execute()
-        time.sleep(1)
+    try:
+        while True:
+            rows = queue.claim(claim_batch)
+            if not rows:
+                with open(f"second_data_{index}_done.json", "w") as f:
+                    json.dump(totals, f)
+                upload_json_item(bucket, totals, "snap_temporary", f"second_data_{index}_done.json")
+                break
+
+            for row in rows:
+                print(f"\n\nTotal_count: {total_count}, {len(totals)}\n\n")
+                total_count += 1
+                current_url = row['url']
+                print(f"Current URL: {current_url}")
+
+                gender = current_url.split("gf=")[1].split("&")[0]
+                height = current_url.split("height-range=")[1].split("&")[0].split("..")[0]
+                weight = current_url.split("weight-range=")[1].split("&")[0].split("..")[0]
+                types = current_url.split("types=")[1].split("&")[0]
+
+                origin_num = len(totals)
+                totals, total_num = extract_from_url(current_url, gender, types, index, totals, bucket, pool,
+                                                     capture, record_path, harvest)
+                if total_num != 0:
+                    with open(f"second_data_{index}.json", "w") as f:
+                        json.dump(totals, f)
+                    upload_json_item(bucket, totals, "snap_temporary", f"second_data_{index}.json")
+                # 완료 기록은 모아서 한 번에 (다음 claim 직전에도 flush)
+                queue.complete(current_url, total_num=total_num, get_num=len(totals) - origin_num)
+                time.sleep(1)
+    finally:
+        queue.close()
+        print(dom_wait.report_line())
+        print(pool.report_line())
+        pool.close()
 
 if __name__ == "__main__":
     p = argparse.ArgumentParser(description="Selenium scrape + upload to GCS (pairs range).")
     p.add_argument("--index", type=int, default=100, help="유효 데이터 묶음 저장 단위")
     p.add_argument("--supabase_url", type=str, default='', help="Supabase URL")
     p.add_argument("--supabase_key", type=str, default='', help="Supabase Key")
+    p.add_argument("--claim_batch", type=int, default=1, help="한 번에 claim 할 URL 수")
+    p.add_argument("--lease_sec", type=int, default=900, help="claim lease 시간(초), heartbeat 로 연장")
+    p.add_argument("--capture", action="store_true", help="스냅 목록을 DOM 대신 CDP 로 잡은 피드 JSON 응답에서 수집")
+    p.add_argument("--record", type=str, default=None, help="capture 한 응답을 JSONL 로 기록 (feed_capture.py --replay 로 재생)")
+    p.add_argument("--harvest", action="store_true", help="page_source 대신 새로 나타난 /snap/ 링크만 브라우저에서 받음")
+    p.add_argument("--recycle_pages", type=int, default=300, help="Chrome 한 개로 처리할 최대 페이지 수")
+    p.add_argument("--max_rss_mb", type=float, default=1500, help="Chrome 프로세스 트리 RSS 상한(MB), 넘으면 재시작")
+    p.add_argument("--hang_sec", type=float, default=60, help="get() 이 이보다 오래 걸리면 드라이버를 죽이고 교체")
     args = p.parse_args()
 
     print("Supabase ", args.supabase_url, args.supabase_key)
 
-    main(args.index, args.supabase_url, args.supabase_key)
+    main(args.index, args.supabase_url, args.supabase_key, args.claim_batch, args.lease_sec,
+         args.capture, args.record, args.harvest, args.recycle_pages, args.max_rss_mb, args.hang_sec)
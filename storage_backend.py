@@ -0,0 +1,333 @@
+import os
+import fcntl
+import base64
+import hashlib
+import shutil
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 모든 스크립트가 쓰는 오브젝트 스토리지 계층.
+#   STORAGE_BACKEND=gcs   (기본) google-cloud-storage, 프로세스 당 Client 하나를 지연 생성해서 공유
+#   STORAGE_BACKEND=local LOCAL_STORAGE_ROOT/{bucket}/{path} 에 파일로 저장 (오프라인 실행/벤치마크용)
+# 조건부 쓰기(get_bytes_gen / put_bytes_if / delete_if)는 GCS generation precondition 과 같은 의미.
+# if_generation=0 은 "없을 때만 생성". local 은 파일 mtime_ns 를 generation 으로 쓰고 flock 으로 직렬화한다.
+
+_client = None
+_client_lock = threading.RLock()
+_buckets: Dict[str, "Bucket"] = {}
+_executor = None
+
+
+class PreconditionFailed(Exception):
+    """조건부 쓰기/삭제 때 오브젝트 generation 이 기대와 다름 (다른 쪽이 먼저 씀)."""
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from google.cloud import storage
+                _client = storage.Client()
+    return _client
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _client_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=int(os.environ.get("STORAGE_MAX_WORKERS", "32")))
+    return _executor
+
+
+class Bucket:
+    name: str
+
+    # ----- 단건 -----
+    def put_bytes(self, path: str, data, content_type: Optional[str] = None, cache_control: Optional[str] = None):
+        raise NotImplementedError
+
+    def put_file(self, path: str, fileobj, content_type: Optional[str] = None,
+                 cache_control: Optional[str] = None, size: Optional[int] = None,
+                 chunk_size: Optional[int] = None):
+        raise NotImplementedError
+
+    def put_filename(self, path: str, local_path: str, content_type: Optional[str] = None):
+        raise NotImplementedError
+
+    def get_bytes(self, path: str) -> bytes:
+        raise NotImplementedError
+
+    def download(self, path: str, local_path: str) -> None:
+        raise NotImplementedError
+
+    def exists(self, path: str) -> bool:
+        raise NotImplementedError
+
+    def copy(self, src: str, dst: str, dst_bucket: Optional["Bucket"] = None) -> None:
+        raise NotImplementedError
+
+    def list(self, prefix: str = "") -> List[str]:
+        raise NotImplementedError
+
+    def list_meta(self, prefix: str = "") -> Iterable[Tuple[str, int, Optional[str]]]:
+        """(path, size, md5 base64) 를 한 번의 목록 조회로 흘려준다."""
+        raise NotImplementedError
+
+    def delete(self, path: str) -> None:
+        raise NotImplementedError
+
+    # ----- 조건부 (lease 등) -----
+    def get_bytes_gen(self, path: str) -> Optional[Tuple[bytes, int]]:
+        """(내용, generation), 없으면 None."""
+        raise NotImplementedError
+
+    def put_bytes_if(self, path: str, data, if_generation: int, content_type: Optional[str] = None) -> int:
+        """현재 generation 이 if_generation 일 때만 쓰고 새 generation 을 돌려준다. 아니면 PreconditionFailed."""
+        raise NotImplementedError
+
+    def delete_if(self, path: str, if_generation: int) -> None:
+        raise NotImplementedError
+
+    # ----- 묶음 (공유 스레드 풀에서 동시에) -----
+    def _map(self, fn, args_list) -> List[Tuple[tuple, Optional[Exception]]]:
+        def run(args):
+            try:
+                return args, fn(*args), None
+            except Exception as e:
+                return args, None, e
+        return list(_pool().map(run, args_list))
+
+    def put_many(self, items: Iterable[Tuple[str, bytes, Optional[str]]]) -> List[Tuple[str, Optional[Exception]]]:
+        """items: (path, data, content_type). 실패한 것만 에러가 채워진 (path, err) 목록."""
+        return [(args[0], err) for args, _, err in self._map(self.put_bytes, list(items))]
+
+    def get_many(self, paths: Iterable[str]) -> Dict[str, Optional[bytes]]:
+        return {args[0]: res for args, res, _ in self._map(self.get_bytes, [(p,) for p in paths])}
+
+    def exists_many(self, paths: Iterable[str]) -> Dict[str, bool]:
+        return {args[0]: bool(res) for args, res, _ in self._map(self.exists, [(p,) for p in paths])}
+
+    def list_meta_many(self, prefixes: Iterable[str]) -> List[Tuple[str, int, Optional[str]]]:
+        """여러 prefix 를 동시에 목록 조회해서 합친다. 하나라도 실패하면 에러 (목록이 빠지면 안 되므로)."""
+        out = []
+        for args, rows, err in self._map(lambda p: list(self.list_meta(p)), [(p,) for p in prefixes]):
+            if err is not None:
+                raise err
+            out.extend(rows)
+        return out
+
+    def copy_many(self, pairs: Iterable[Tuple[str, str]], dst_bucket: Optional["Bucket"] = None):
+        """pairs: (src, dst). (src, dst, err) 목록을 돌려준다."""
+        return [(a[0], a[1], err) for a, _, err in self._map(lambda s, d: self.copy(s, d, dst_bucket), list(pairs))]
+
+
+class GCSBucket(Bucket):
+    def __init__(self, name: str):
+        self.name = name
+        self._bucket = get_client().bucket(name)
+
+    def blob(self, path: str):
+        return self._bucket.blob(path)
+
+    def put_bytes(self, path, data, content_type=None, cache_control=None):
+        blob = self._bucket.blob(path)
+        if cache_control:
+            blob.cache_control = cache_control
+        blob.upload_from_string(data, content_type=content_type)
+
+    def put_file(self, path, fileobj, content_type=None, cache_control=None, size=None, chunk_size=None):
+        # chunk_size 를 주면 resumable 업로드가 그 크기만큼만 메모리에 올려서 보낸다 (256KB 배수)
+        blob = self._bucket.blob(path, chunk_size=chunk_size)
+        if cache_control:
+            blob.cache_control = cache_control
+        blob.upload_from_file(fileobj, content_type=content_type, size=size)
+
+    def put_filename(self, path, local_path, content_type=None):
+        self._bucket.blob(path).upload_from_filename(local_path, content_type=content_type)
+
+    def get_bytes(self, path):
+        return self._bucket.blob(path).download_as_bytes()
+
+    def download(self, path, local_path):
+        self._bucket.blob(path).download_to_filename(local_path)
+
+    def exists(self, path):
+        return self._bucket.blob(path).exists()
+
+    def copy(self, src, dst, dst_bucket=None):
+        dest = dst_bucket._bucket if isinstance(dst_bucket, GCSBucket) else self._bucket
+        self._bucket.copy_blob(self._bucket.blob(src), dest, dst)
+
+    def list(self, prefix=""):
+        return [b.name for b in get_client().list_blobs(self.name, prefix=prefix)]
+
+    def list_meta(self, prefix=""):
+        for b in get_client().list_blobs(self.name, prefix=prefix):
+            yield b.name, b.size, b.md5_hash
+
+    def delete(self, path):
+        self._bucket.blob(path).delete()
+
+    def get_bytes_gen(self, path):
+        from google.api_core import exceptions as gexc
+        for _ in range(3):
+            blob = self._bucket.get_blob(path)
+            if blob is None:
+                return None
+            try:
+                return blob.download_as_bytes(if_generation_match=blob.generation), blob.generation
+            except (gexc.PreconditionFailed, gexc.NotFound):
+                continue   # 읽는 사이에 바뀜
+        raise PreconditionFailed(path)
+
+    def put_bytes_if(self, path, data, if_generation, content_type=None):
+        from google.api_core import exceptions as gexc
+        blob = self._bucket.blob(path)
+        try:
+            blob.upload_from_string(data, content_type=content_type, if_generation_match=if_generation)
+        except gexc.PreconditionFailed as e:
+            raise PreconditionFailed(path) from e
+        return blob.generation
+
+    def delete_if(self, path, if_generation):
+        from google.api_core import exceptions as gexc
+        try:
+            self._bucket.blob(path).delete(if_generation_match=if_generation)
+        except (gexc.PreconditionFailed, gexc.NotFound) as e:
+            raise PreconditionFailed(path) from e
+
+
+class LocalBucket(Bucket):
+    def __init__(self, name: str, root: Optional[str] = None):
+        self.name = name
+        self.root = os.path.join(root or os.environ.get("LOCAL_STORAGE_ROOT", "./local_storage"), name)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, path: str) -> str:
+        full = os.path.normpath(os.path.join(self.root, path))
+        if not full.startswith(os.path.normpath(self.root) + os.sep):
+            raise ValueError(f"invalid object path: {path}")
+        return full
+
+    def _write(self, path: str, write_fn) -> None:
+        full = self._path(path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        tmp = f"{full}.tmp{threading.get_ident()}"
+        with open(tmp, "wb") as f:
+            write_fn(f)
+        os.replace(tmp, full)
+
+    def put_bytes(self, path, data, content_type=None, cache_control=None):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._write(path, lambda f: f.write(data))
+
+    def put_file(self, path, fileobj, content_type=None, cache_control=None, size=None, chunk_size=None):
+        self._write(path, lambda f: shutil.copyfileobj(fileobj, f, chunk_size or 1024 * 1024))
+
+    def put_filename(self, path, local_path, content_type=None):
+        with open(local_path, "rb") as src:
+            self.put_file(path, src)
+
+    def get_bytes(self, path):
+        with open(self._path(path), "rb") as f:
+            return f.read()
+
+    def download(self, path, local_path):
+        shutil.copyfile(self._path(path), local_path)
+
+    def exists(self, path):
+        return os.path.isfile(self._path(path))
+
+    def copy(self, src, dst, dst_bucket=None):
+        dest = dst_bucket if isinstance(dst_bucket, LocalBucket) else self
+        with open(self._path(src), "rb") as f:
+            dest.put_file(dst, f)
+
+    def list(self, prefix=""):
+        names = []
+        for dirpath, _, files in os.walk(self.root):
+            for fn in files:
+                if ".tmp" in fn:
+                    continue
+                rel = os.path.relpath(os.path.join(dirpath, fn), self.root).replace(os.sep, "/")
+                if rel.startswith(prefix):
+                    names.append(rel)
+        return sorted(names)
+
+    def list_meta(self, prefix=""):
+        for name in self.list(prefix):
+            with open(self._path(name), "rb") as f:
+                data = f.read()
+            yield name, len(data), base64.b64encode(hashlib.md5(data).digest()).decode()
+
+    def delete(self, path):
+        os.remove(self._path(path))
+
+    @contextmanager
+    def _locked(self, path: str):
+        # 오브젝트별 lock 파일은 버킷 디렉터리 밖에 둔다 (list 에 안 섞이게)
+        lock_dir = self.root + ".locks"
+        os.makedirs(lock_dir, exist_ok=True)
+        with open(os.path.join(lock_dir, hashlib.md5(path.encode()).hexdigest()), "a") as lf:
+            fcntl.flock(lf, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lf, fcntl.LOCK_UN)
+
+    def _gen(self, path: str) -> int:
+        try:
+            return os.stat(self._path(path)).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def get_bytes_gen(self, path):
+        with self._locked(path):
+            gen = self._gen(path)
+            return (self.get_bytes(path), gen) if gen else None
+
+    def put_bytes_if(self, path, data, if_generation, content_type=None):
+        with self._locked(path):
+            cur = self._gen(path)
+            if cur != if_generation:
+                raise PreconditionFailed(path)
+            self.put_bytes(path, data)
+            gen = self._gen(path)
+            if gen <= cur:   # 같은 mtime 이 찍혀도 generation 은 항상 증가
+                gen = cur + 1
+                os.utime(self._path(path), ns=(gen, gen))
+            return gen
+
+    def delete_if(self, path, if_generation):
+        with self._locked(path):
+            if self._gen(path) != if_generation or not if_generation:
+                raise PreconditionFailed(path)
+            os.remove(self._path(path))
+
+
+def get_bucket(name: str) -> Bucket:
+    """버킷 핸들은 이름별로 하나만 만들어 재사용한다."""
+    b = _buckets.get(name)
+    if b is None:
+        with _client_lock:
+            b = _buckets.get(name)
+            if b is None:
+                backend = os.environ.get("STORAGE_BACKEND", "gcs")
+                b = LocalBucket(name) if backend == "local" else GCSBucket(name)
+                _buckets[name] = b
+    return b
+
+
+def download_to_file(bucket_name: str, source_blob_name: str, destination_file: str) -> None:
+    get_bucket(bucket_name).download(source_blob_name, destination_file)
+    print(f"✅ Downloaded gs://{bucket_name}/{source_blob_name} → {destination_file}")
+
+
+def upload_file(local_file_path: str, bucket_name: str, blob_name: str, content_type: Optional[str] = None) -> None:
+    get_bucket(bucket_name).put_filename(blob_name, local_file_path, content_type=content_type)
+    print(f"✅ Uploaded {local_file_path} to gs://{bucket_name}/{blob_name}")
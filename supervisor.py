@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import time
+import shlex
+import signal
+import argparse
+import subprocess
+from collections import deque
+from typing import Dict, List, Optional
+
+# 로컬 멀티 프로세스 크롤 감독자.
+#   - [start, end) 를 chunk_size 크기의 작은 chunk 로 나눠 대기열에 넣고 workers 개 프로세스를 돌린다
+#   - 일이 끝난 worker 자리는 대기열에 남은 chunk 를 바로 가져간다 → 느린 구간이 한 프로세스에 몰리지 않음
+#   - 비정상 종료한 chunk 는 대기열 맨 앞으로 되돌려 다시 띄운다 (각 스크립트의 cursor/sink 로 이어서 진행)
+#   - 완료한 chunk 는 state 파일에 남겨 감독자를 다시 띄워도 건너뛴다
+#   - report_every 초마다 전체 진행/ETA 와 worker 별 현재 chunk, 로그 마지막 줄을 한 화면에 출력
+# chunk 별 stdout/stderr 는 log_dir/{name}_{start}.log 로 간다.
+
+PRESETS = {
+    "zcx": "{python} zcx.py --start {start} --nums {size}",
+    "sel": "{python} sel.py --start {start} --nums {size}",
+    # snap 스크립트는 --index 번째 shard_size 구간을 맡는다 (마지막 chunk 도 같은 shard_size 로)
+    "snap_two": "{python} snap_two.py --index {chunk} --shard_size {step}",
+    "snap_three": "{python} snap_three.py --index {chunk} --shard_size {step}",
+}
+
+
+class Chunk:
+    def __init__(self, start: int, size: int, step: int):
+        self.start = start
+        self.size = size
+        self.step = step
+        self.attempts = 0
+        self.proc: Optional[subprocess.Popen] = None
+        self.t0 = 0.0
+        self.log_path = ""
+
+    def fmt(self, template: str) -> str:
+        return template.format(python=shlex.quote(sys.executable), start=self.start, size=self.size,
+                               end=self.start + self.size, step=self.step, chunk=self.start // self.step)
+
+
+def _tail(path: str, n: int = 2048) -> str:
+    """로그 마지막 한 줄 (tqdm 의 \\r 진행 표시도 마지막 것만)."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(f.tell() - n, 0))
+            text = f.read().decode("utf-8", "replace")
+    except OSError:
+        return ""
+    lines = [s.strip() for s in text.replace("\r", "\n").split("\n") if s.strip()]
+    return lines[-1][:120] if lines else ""
+
+
+class Supervisor:
+    def __init__(self, name: str, template: str, start: int, end: int, chunk_size: int, workers: int,
+                 extra: Optional[List[str]] = None, max_attempts: int = 3, state_path: Optional[str] = None,
+                 log_dir: str = "./supervisor_logs", report_every: float = 30.0):
+        self.name = name
+        self.template = template + "".join(" " + shlex.quote(a) for a in (extra or []))
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.report_every = report_every
+        self.log_dir = log_dir
+        self.state_path = state_path or f"./supervisor_{name}_{start}_{end}.json"
+        os.makedirs(log_dir, exist_ok=True)
+
+        self.done: Dict[int, float] = {}
+        self.failed: Dict[int, int] = {}
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "r") as f:
+                state = json.load(f)
+            self.done = {int(k): v for k, v in state.get("done", {}).items()}
+        self.queue = deque(Chunk(s, min(chunk_size, end - s), chunk_size) for s in range(start, end, chunk_size)
+                           if s not in self.done)
+        self.total = len(self.queue) + len(self.done)
+        self.running: List[Chunk] = []
+        self.restarts = 0
+        self.t0 = time.time()
+
+    def _save(self) -> None:
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"template": self.template, "done": self.done, "failed": self.failed}, f)
+        os.replace(tmp, self.state_path)
+
+    def _launch(self, c: Chunk) -> None:
+        c.attempts += 1
+        c.t0 = time.time()
+        c.log_path = os.path.join(self.log_dir, f"{self.name}_{c.start}.log")
+        log = open(c.log_path, "a")
+        log.write(f"\n===== attempt {c.attempts} : {c.fmt(self.template)}\n")
+        log.flush()
+        # 자식은 자기 프로세스 그룹으로 → 종료할 때 chrome 같은 손자 프로세스까지 함께
+        # 로그 마지막 줄로 진행을 보여주므로 자식 python 출력은 버퍼링하지 않는다
+        c.proc = subprocess.Popen(c.fmt(self.template), shell=True, stdout=log, stderr=subprocess.STDOUT,
+                                  start_new_session=True, env={**os.environ, "PYTHONUNBUFFERED": "1"})
+        log.close()
+        self.running.append(c)
+
+    def _reap(self) -> bool:
+        changed = False
+        for c in list(self.running):
+            rc = c.proc.poll()
+            if rc is None:
+                continue
+            self.running.remove(c)
+            changed = True
+            if rc == 0:
+                self.done[c.start] = round(time.time() - c.t0, 1)
+            elif c.attempts < self.max_attempts:
+                self.restarts += 1
+                print(f"[SUPERVISOR] chunk {c.start} exit {rc} (attempt {c.attempts}) → restart, log: {c.log_path}")
+                self.queue.appendleft(c)
+            else:
+                print(f"[SUPERVISOR] chunk {c.start} failed {c.attempts} times, giving up. log: {c.log_path}")
+                self.failed[c.start] = rc
+        if changed:
+            self._save()
+        return changed
+
+    def report(self) -> str:
+        el = time.time() - self.t0
+        durs = list(self.done.values())
+        avg = sum(durs) / len(durs) if durs else 0
+        left = len(self.queue) + len(self.running)
+        eta = avg * left / max(self.workers, 1) if avg else 0
+        lines = [f"[{self.name}] done {len(self.done)}/{self.total} running {len(self.running)} "
+                 f"queued {len(self.queue)} failed {len(self.failed)} restarts {self.restarts} | "
+                 f"{el / 60:.1f}min, avg chunk {avg:.0f}s, ETA {eta / 60:.1f}min"]
+        for c in sorted(self.running, key=lambda c: c.start):
+            lines.append(f"  - {c.start}+{c.size} #{c.attempts} {time.time() - c.t0:.0f}s | {_tail(c.log_path)}")
+        return "\n".join(lines)
+
+    def stop(self) -> None:
+        for c in self.running:
+            try:
+                os.killpg(c.proc.pid, signal.SIGTERM)
+            except OSError:
+                pass
+        for c in self.running:
+            try:
+                c.proc.wait(timeout=20)
+            except subprocess.TimeoutExpired:
+                os.killpg(c.proc.pid, signal.SIGKILL)
+        self._save()
+
+    def run(self, poll_sec: float = 0.5) -> bool:
+        """모든 chunk 가 끝나면 True (포기한 chunk 가 있으면 False)."""
+        last = 0.0
+        try:
+            while self.queue or self.running:
+                while self.queue and len(self.running) < self.workers:
+                    self._launch(self.queue.popleft())
+                changed = self._reap()
+                if time.time() - last >= self.report_every:
+                    print(self.report(), flush=True)
+                    last = time.time()
+                if not changed:
+                    time.sleep(poll_sec)
+        except KeyboardInterrupt:
+            print("[SUPERVISOR] interrupted, stopping workers (다시 실행하면 남은 chunk 부터)")
+            self.stop()
+            raise
+        self._save()
+        print(self.report(), flush=True)
+        return not self.failed
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="작은 chunk 단위로 크롤 프로세스를 돌리는 감독자",
+                                epilog="예) python supervisor.py --job zcx --range 1000000:1400000 --chunk_size 5000 "
+                                       "--workers 8 -- --concurrency 16")
+    p.add_argument("--job", type=str, choices=sorted(PRESETS), help="미리 정의된 명령")
+    p.add_argument("--cmd", type=str, default=None,
+                   help="직접 지정할 명령 템플릿 ({python} {start} {size} {end} {step} {chunk} 치환)")
+    p.add_argument("--range", type=str, required=True, help="START:END (zcx/sel 은 상품 id, snap 은 목록 위치)")
+    p.add_argument("--chunk_size", type=int, default=5000)
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--max_attempts", type=int, default=3, help="chunk 당 최대 실행 횟수 (비정상 종료 시 재시작)")
+    p.add_argument("--report_every", type=float, default=30.0, help="진행 상황 출력 간격(초)")
+    p.add_argument("--log_dir", type=str, default="./supervisor_logs")
+    p.add_argument("--state", type=str, default=None, help="완료 chunk 기록 파일 (기본: ./supervisor_{name}_{range}.json)")
+    p.add_argument("--dry_run", action="store_true", help="실행할 명령만 출력")
+    p.add_argument("extra", nargs=argparse.REMAINDER, help="-- 뒤의 인자는 모든 chunk 명령 뒤에 붙는다")
+    args = p.parse_args()
+
+    if not args.cmd and not args.job:
+        p.error("--job 또는 --cmd 가 필요합니다")
+    start, end = (int(x) for x in args.range.split(":"))
+    extra = args.extra[1:] if args.extra[:1] == ["--"] else args.extra
+    if args.job and args.job.startswith("snap_") and start % args.chunk_size:
+        p.error("snap 작업은 START 가 chunk_size 의 배수여야 합니다 (--index = START / chunk_size)")
+
+    sup = Supervisor(args.job or "custom", args.cmd or PRESETS[args.job], start, end, args.chunk_size, args.workers,
+                     extra=extra, max_attempts=args.max_attempts, state_path=args.state, log_dir=args.log_dir,
+                     report_every=args.report_every)
+    if args.dry_run:
+        for c in sup.queue:
+            print(c.fmt(sup.template))
+        sys.exit(0)
+    sys.exit(0 if sup.run() else 1)
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from discovery import Frontier, discover, listing_seeds, serve_standin
+
+
+class _Resp:
+    def __init__(self, status, text):
+        self.status_code = status
+        self.text = text
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class UrllibSession:
+    """discover() 가 쓰는 session.get(url, timeout) 만 urllib 로."""
+
+    def get(self, url, timeout=15):
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as r:
+                return _Resp(r.status, r.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            return _Resp(e.code, "")
+
+
+@pytest.fixture
+def standin():
+    server = serve_standin(port=0, pages=3, size=20, background=True)
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _listing(base, code, page):
+    with urllib.request.urlopen(f"{base}/api2/dp/v1/plp/goods?category={code}&page={page}") as r:
+        return [d["goodsNo"] for d in json.load(r)["data"]["list"]]
+
+
+def test_frontier_keeps_seed_and_page_order(standin):
+    frontier = discover(listing_seeds(["001", "002"], base=standin), UrllibSession(), Frontier(), delay=0)
+    expected = [pid for code in ("001", "002") for page in (1, 2, 3) for pid in _listing(standin, code, page)]
+    assert list(frontier) == expected
+    assert len(frontier) == 2 * 3 * 20
+
+
+def test_known_ids_are_deduped_but_do_not_stop_the_seed(standin, capsys):
+    # 같은 카테고리를 카테고리/브랜드 두 seed 로: 두 번째 seed 는 전부 아는 id 지만 빈 페이지까지 간다
+    seeds = listing_seeds(["001"], ["001"], base=standin)
+    frontier = discover(seeds, UrllibSession(), Frontier(), delay=0)
+    assert len(frontier) == 3 * 20
+    lines = [l for l in capsys.readouterr().out.splitlines() if l.startswith("[DISCOVER] ")]
+    brand = [l for l in lines if "brand=001" in l]
+    assert len(brand) == 4 and all("신규 0개" in l for l in brand)
+
+
+class PagedSession:
+    """url 의 page= 값으로 미리 정한 목록을 돌려준다 (같은 page 면 seed 와 상관없이)."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = 0
+
+    def get(self, url, timeout=15):
+        self.calls += 1
+        page = int(url.rsplit("page=", 1)[1].split("&")[0])
+        if "brand=" in url:
+            ids = self.pages["brand"].get(page, [])
+        else:
+            ids = self.pages["category"].get(page, [])
+        return _Resp(200, json.dumps({"data": {"list": [{"goodsNo": i} for i in ids]}}))
+
+
+def test_seed_overlapping_earlier_seeds_still_reaches_its_own_products():
+    # 브랜드 첫 페이지는 카테고리와 전부 겹치고, 둘째 페이지에만 그 브랜드만의 상품이 있다
+    session = PagedSession({"category": {1: [1001, 1002]}, "brand": {1: [1001, 1002], 2: [2001, 2002]}})
+    frontier = discover(listing_seeds(["c"], ["b"], base="http://x"), session, Frontier(), delay=0)
+    assert list(frontier) == [1001, 1002, 2001, 2002]
+
+
+def test_a_listing_that_repeats_the_same_page_stops():
+    session = PagedSession({"category": {p: [1001, 1002] for p in range(1, 50)}, "brand": {}})
+    discover(listing_seeds(["c"], base="http://x"), session, Frontier(), delay=0)
+    # page 2 가 page 1 과 같으면 멈춘다 (max_pages 까지 가지 않음)
+    assert session.calls == 2
+
+
+def test_stops_on_empty_page_and_max_pages(standin, capsys):
+    discover(listing_seeds(["003"], base=standin), UrllibSession(), Frontier(), delay=0)
+    pages = [l for l in capsys.readouterr().out.splitlines() if l.startswith("[DISCOVER] ")]
+    assert len(pages) == 4                      # 3 페이지 + 빈 4 페이지에서 멈춤
+    assert "-> 0개" in pages[-1]
+
+    frontier = discover(listing_seeds(["003"], base=standin), UrllibSession(), Frontier(), max_pages=2, delay=0)
+    assert len(frontier) == 2 * 20
+
+
+def test_frontier_file_resumes(standin, tmp_path):
+    path = str(tmp_path / "frontier.txt")
+    f1 = discover(listing_seeds(["004"], base=standin), UrllibSession(), Frontier(path), max_pages=1, delay=0)
+    f1.close()
+    # 다시 열면 파일의 id 를 이미 아는 것으로 보고 새 id 만 덧붙인다
+    f2 = Frontier(path)
+    assert len(f2) == 20
+    discover(listing_seeds(["004"], base=standin), UrllibSession(), f2, delay=0)
+    f2.close()
+    with open(path) as f:
+        lines = [int(x) for x in f.read().split()]
+    assert lines == list(f2) and len(lines) == len(set(lines)) == 3 * 20
+    assert lines[:20] == _listing(standin, "004", 1)
+
+
+def test_main_discover_against_standin(standin, tmp_path, monkeypatch):
+    zcx = pytest.importorskip("zcx")
+    import storage_backend
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("STORAGE_BACKEND", "local")
+    monkeypatch.setenv("LOCAL_STORAGE_ROOT", str(tmp_path / "bucket"))
+    monkeypatch.setattr(storage_backend, "_buckets", {})
+
+    asyncio.run(zcx.main_discover(["001"], [], 4, max_pages=5, tag="t", listing_base=standin,
+                                  product_base=standin))
+    with open(tmp_path / "musinsa_discovered_t_done.json") as f:
+        records = json.load(f)
+    frontier = [int(x) for x in open(tmp_path / "frontier_t.txt").read().split()]
+    # stand-in 은 7의 배수 상품을 404 로 준다
+    got = sorted(int(r["product_url"].rsplit("/", 1)[-1]) for r in records)
+    assert got == sorted(pid for pid in frontier if pid % 7)
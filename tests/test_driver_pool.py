@@ -0,0 +1,62 @@
+import pytest
+
+from driver_pool import DriverPool
+
+
+class InvalidSessionIdException(Exception):
+    pass
+
+
+class FakeDriver:
+    def __init__(self, n):
+        self.n = n
+        self.crashed = False
+        self.quits = 0
+
+    def get(self, url):
+        if self.crashed:
+            raise InvalidSessionIdException("invalid session id")
+
+    def quit(self):
+        self.quits += 1
+
+
+@pytest.fixture
+def pool():
+    made = []
+
+    def factory():
+        made.append(FakeDriver(len(made)))
+        return made[-1]
+
+    p = DriverPool(factory, size=1, max_rss_mb=0, watch_every=60)
+    p.made = made
+    yield p
+    p.close()
+
+
+def test_driver_is_reused_while_healthy(pool):
+    for _ in range(3):
+        with pool.page("http://x"):
+            pass
+    assert len(pool.made) == 1
+
+
+def test_crashed_session_is_replaced_on_next_page(pool):
+    with pool.page("http://x"):
+        pass
+    pool.made[0].crashed = True
+    with pytest.raises(InvalidSessionIdException):
+        with pool.page("http://x"):
+            pass
+    with pool.page("http://x") as driver:
+        assert driver is pool.made[1]
+    assert pool.made[0].quits == 1 and pool.stats["crashed"] == 1
+
+
+def test_session_lost_inside_the_page_block_is_replaced(pool):
+    with pytest.raises(RuntimeError):
+        with pool.page("http://x"):
+            raise RuntimeError("disconnected: not connected to DevTools")
+    with pool.page("http://x") as driver:
+        assert driver is pool.made[1]
@@ -0,0 +1,70 @@
+import os
+import re
+
+from feed_capture import (FEED_URL_PATTERN, ReplayCapture, records_from_responses, snap_ids_from_json, snap_ids_from_responses,
+                          total_count_from_json)
+
+# 손으로 만든 예시 응답 (실제 --record 캡처가 생기면 같은 검사를 그 파일로도 돌린다)
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures",
+                      "snap_feed_sample.jsonl")
+
+
+def test_replay_yields_one_response_per_scroll():
+    cap = ReplayCapture(SAMPLE)
+    steps = []
+    while True:
+        got = cap.poll()
+        if not got:
+            break
+        steps.append(snap_ids_from_responses(got))
+    assert steps == [[str(1100000 + 4 * i + j) for j in range(4)] for i in range(3)]
+
+
+def test_records_match_parse_item_div_shape():
+    recs = records_from_responses(ReplayCapture(SAMPLE, per_poll=10).poll())
+    assert len(recs) == 12
+    r = recs[0]
+    assert set(r) == {"snap_url", "snap_id", "account_name", "account_uuid", "model_info", "snap_like",
+                      "snap_desc", "img_urls", "products", "folder1", "folder2"}
+    assert r["snap_url"] == "https://www.musinsa.com/snap/1100000"
+    assert r["img_urls"][0] == "https://image.msscdn.net/snap/images/2025/01/01/1100000_0.jpg"
+    assert r["products"][0]["product_url"] == "https://www.musinsa.com/products/3000000"
+    assert r["folder2"] == r["account_uuid"]
+
+
+def test_nested_goods_are_not_snaps():
+    obj = {"data": {"list": [{"snapId": "1", "snapType": "USER", "profile": {"nickname": "a"},
+                              "images": [{"imageUrl": "//a/1.jpg"}],
+                              "goods": [{"id": "9", "images": [{"imageUrl": "//a/g.jpg"}]}]}]}}
+    assert snap_ids_from_json(obj) == ["1"]
+
+
+def test_unrecognised_responses_give_no_ids():
+    # 모양이 다른 응답 (설정/추천/빈 목록) 은 id 가 안 나온다 → 호출하는 쪽이 DOM 으로 돌아간다
+    got = [("https://content.musinsa.com/api2/content/snap/v1/config", {"data": {"tabs": ["A", "B"]}}),
+           ("https://content.musinsa.com/api2/content/snap/v1/snaps", {"data": {"list": [], "totalCount": 0}}),
+           ("https://content.musinsa.com/api2/content/snap/v1/snaps", {"data": {"list": [{"id": 5}]}})]
+    assert snap_ids_from_responses(got) == []
+    assert records_from_responses(got) == []
+    assert total_count_from_json(got[1][1]) == 0
+
+
+def test_only_the_feed_endpoint_is_captured():
+    pat = re.compile(FEED_URL_PATTERN)
+    assert pat.search("https://content.musinsa.com/api2/content/snap/v1/snaps?gf=A&page=2")
+    assert not pat.search("https://content.musinsa.com/api2/content/snap/v1/config")
+    assert not pat.search("https://content.musinsa.com/api2/content/snap/v1/snaps/1100000/comments")
+    assert not pat.search("https://www.musinsa.com/api2/content/banner")
+
+
+def test_entries_missing_snap_fields_are_skipped():
+    img = [{"imageUrl": "//a/1.jpg"}]
+    obj = {"data": {"list": [
+        {"snapId": "1", "snapType": "USER", "profile": {"nickname": "a"}, "images": img},
+        {"snapId": "2", "snapType": "USER", "images": img},                              # 작성자 없음
+        {"snapId": "3", "profile": {"nickname": "c"}, "images": img},                    # 타입 없음
+        {"id": "4", "snapType": "USER", "profile": {"nickname": "d"}, "images": img},    # snap id 가 아님
+    ]}}
+    recs = records_from_responses([("u", obj)])
+    assert [r["snap_id"] for r in recs] == ["1"]
+    assert recs[0]["account_name"] == "a"
@@ -0,0 +1,58 @@
+import time
+
+from id_bitmap import DEAD, LIVE, IdStatusMap, RoaringSet, plan_sweep
+
+
+def dense_then_sparse(path=None):
+    """[0, 1000) 은 live 가 절반, [1000, 2000) 은 전부 dead, 가장 큰 live 는 2500."""
+    m = IdStatusMap(path, block_size=1000)
+    for pid in range(0, 1000, 2):
+        m.mark(pid, LIVE)
+    for pid in range(1000, 2000, 10):
+        m.mark(pid, DEAD)
+    m.mark(2500, LIVE)
+    return m
+
+
+def fetched(m, ids, **kw):
+    return {pid for pid, fetch in plan_sweep(m, ids, **kw) if fetch}
+
+
+def test_roaring_max_covers_array_and_bitmap_chunks():
+    rs = RoaringSet()
+    assert rs.max() is None
+    for x in (5, 70000, 65536 * 3 + 7):
+        rs.add(x)
+    assert rs.max() == 65536 * 3 + 7
+    for x in range(5000):
+        rs.add(65536 * 4 + x)
+    assert rs.max() == 65536 * 4 + 4999
+
+
+def test_sparse_block_is_skipped_until_it_goes_stale():
+    m = dense_then_sparse()
+    got = fetched(m, range(1000, 2000))
+    assert got == set()
+    # 다 훑은 지 오래되면 dead 도 다시 가져오고, 그 시각이 갱신된다
+    m.checked[1000] = time.time() - 31 * 86400
+    assert fetched(m, range(1000, 2000)) == set(range(1000, 2000))
+    assert fetched(m, range(1000, 2000)) == set()
+
+
+def test_ids_at_or_above_highest_live_are_never_trusted_dead():
+    m = dense_then_sparse()
+    for pid in range(2501, 2600):
+        m.mark(pid, DEAD)
+    assert fetched(m, range(2400, 2600)) >= set(range(2500, 2600))
+
+
+def test_check_times_survive_save_load_and_merge(tmp_path):
+    m = dense_then_sparse(str(tmp_path / "a.bin"))
+    m.checked[1000] = 123.0
+    m.save()
+    back = IdStatusMap(str(tmp_path / "a.bin"), block_size=1000)
+    assert back.checked[1000] == 123.0 and back.max_live() == 2500
+    other = IdStatusMap(block_size=1000)
+    other.checked[1000] = 456.0
+    back.merge(other)
+    assert back.checked[1000] == 456.0
@@ -0,0 +1,110 @@
+import json
+import threading
+import time
+
+import pytest
+
+from range_lease import RangeLeases
+from storage_backend import LocalBucket
+
+
+@pytest.fixture
+def bucket(tmp_path):
+    return LocalBucket("leases", root=str(tmp_path))
+
+
+def node(bucket, name, lease_sec=30.0, start=0, end=30, chunk=10):
+    return RangeLeases(bucket, "job", start, end, chunk, node_id=name, lease_sec=lease_sec)
+
+
+def expire(bucket, leases, s):
+    """lease 본문의 만료 시각만 과거로 (generation 도 바뀐다)."""
+    path = leases._lease(s)
+    body = json.loads(bucket.get_bytes(path))
+    body["expires"] = time.time() - 1
+    bucket.put_bytes(path, json.dumps(body))
+
+
+def test_claim_gives_each_chunk_to_one_node(bucket):
+    a, b = node(bucket, "a"), node(bucket, "b")
+    got = [a.claim(), b.claim(), a.claim()]
+    assert sorted(got) == [0, 10, 20]
+    assert a.claim() is None and b.claim() is None
+    assert a.status() == {"chunks": 3, "done": 0, "leased": 3, "free": 0}
+
+
+def test_renew_extends_lease(bucket):
+    a = node(bucket, "a")
+    s = a.claim()
+    before = json.loads(bucket.get_bytes(a._lease(s)))["expires"]
+    time.sleep(0.01)
+    assert a.renew(s)
+    assert json.loads(bucket.get_bytes(a._lease(s)))["expires"] > before
+    assert a.stats["renewed"] == 1
+
+
+def test_expired_lease_is_reclaimed(bucket):
+    a, b = node(bucket, "a", end=10), node(bucket, "b", end=10)
+    assert a.claim() == 0
+    assert b.claim() is None
+    expire(bucket, a, 0)     # a 가 멈춰서 갱신이 끊긴 상태
+    assert b.claim() == 0
+    assert b.stats["reclaimed"] == 1
+
+
+def test_release_frees_chunk_immediately(bucket):
+    a, b = node(bucket, "a", end=10), node(bucket, "b", end=10)
+    assert a.claim() == 0
+    a.release(0)
+    assert not bucket.exists(a._lease(0))
+    assert b.claim() == 0
+
+
+def test_lost_lease_is_not_marked_done(bucket):
+    a, b = node(bucket, "a", end=10), node(bucket, "b", end=10)
+    assert a.claim() == 0
+    expire(bucket, a, 0)
+    assert b.claim() == 0
+    assert not a.renew(0)
+    assert 0 in a.lost
+    assert not a.complete(0)
+    assert not bucket.exists(a._done(0))
+    assert b.complete(0)
+    assert a.status()["done"] == 1
+
+
+def test_run_waits_for_dead_nodes_lease(bucket):
+    dead = node(bucket, "dead", lease_sec=0.5, end=20)
+    assert dead.claim() is not None      # 잡은 채로 죽음 (갱신 없음)
+    live = node(bucket, "live", lease_sec=0.5, end=20)
+    worked = []
+    assert live.run(lambda s, n: worked.append(s)) == 2
+    assert sorted(worked) == [0, 10]
+    assert live.stats["reclaimed"] == 1
+    assert live.status() == {"chunks": 2, "done": 2, "leased": 0, "free": 0}
+
+
+def test_run_stops_work_when_lease_is_taken(bucket):
+    a = node(bucket, "a", lease_sec=0.6, end=10)
+    stopped = {}
+
+    def steal():
+        time.sleep(0.3)
+        bucket.put_bytes(a._lease(0), json.dumps({"owner": "thief", "expires": time.time() + 60}))
+        time.sleep(0.5)
+        bucket.put_bytes(a._done(0), json.dumps({"owner": "thief"}))   # 새 주인이 끝냄
+
+    def work(s, n):
+        threading.Thread(target=steal, daemon=True).start()
+        t0 = time.time()
+        try:
+            while time.time() - t0 < 5:
+                time.sleep(0.05)
+        finally:
+            stopped["after"] = time.time() - t0
+
+    assert a.run(work) == 0
+    assert stopped["after"] < 2
+    assert a.stats["lost"] == 1
+    assert a.stats["completed"] == 0
+    assert json.loads(bucket.get_bytes(a._done(0)))["owner"] == "thief"
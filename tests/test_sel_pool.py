@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+sel = pytest.importorskip("sel")
+
+
+class InvalidSessionIdException(Exception):
+    pass
+
+
+class FakeDriver:
+    made = []
+
+    def __init__(self):
+        self.quit_called = False
+        FakeDriver.made.append(self)
+
+    def quit(self):
+        self.quit_called = True
+
+
+@pytest.fixture(autouse=True)
+def fresh(monkeypatch):
+    FakeDriver.made = []
+    monkeypatch.setattr(sel.time, "sleep", lambda s: None)
+
+
+def fake_page(crash_on=(), crash_always=False):
+    crashed = set()
+    lock = threading.Lock()
+
+    def get(driver, url):
+        pid = int(url.rsplit("/", 1)[-1])
+        with lock:
+            if pid in crash_on and (crash_always or pid not in crashed):
+                crashed.add(pid)
+                raise InvalidSessionIdException("invalid session id")
+        if pid % 10 == 0:
+            return None   # 상품 정보가 없는 페이지
+        return {"product_id": pid}, ["img"]
+    return get
+
+
+def test_crashed_browser_is_restarted_and_continues(monkeypatch):
+    monkeypatch.setattr(sel, "build_driver", lambda **kw: FakeDriver())
+    monkeypatch.setattr(sel, "get_from_url_selenium", fake_page(crash_on={3}))
+    out = {pid: (rec, err) for pid, rec, err in sel.iter_driver_pool(range(1, 11), 2)}
+    assert sorted(out) == list(range(1, 11))
+    assert all(err is None for _, err in out.values())
+    assert out[10][0] is None and out[3][0]["product_id"] == 3
+    assert len(FakeDriver.made) == 3 and all(d.quit_called for d in FakeDriver.made)
+
+
+def test_remaining_ids_come_back_as_errors_when_restarts_run_out(monkeypatch):
+    monkeypatch.setattr(sel, "build_driver", lambda **kw: FakeDriver())
+    monkeypatch.setattr(sel, "get_from_url_selenium", fake_page(crash_on={2}, crash_always=True))
+    out = {pid: err for pid, rec, err in sel.iter_driver_pool(range(1, 7), 2)}
+    # 첫 번째 브라우저 구간 [1, 2, 3] 중 2, 3 은 완료가 아니다
+    assert [pid for pid, err in sorted(out.items()) if err is not None] == [2, 3]
+
+
+def test_started_browsers_are_quit_when_one_fails_to_start(monkeypatch):
+    calls = []
+
+    def build(**kw):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("chrome failed to start")
+        return FakeDriver()
+    monkeypatch.setattr(sel, "build_driver", build)
+    with pytest.raises(RuntimeError):
+        list(sel.iter_driver_pool(range(6), 3))
+    assert len(FakeDriver.made) == 2 and all(d.quit_called for d in FakeDriver.made)
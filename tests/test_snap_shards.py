@@ -0,0 +1,16 @@
+from snap_shards import shard, shard_tag, snap_key
+
+
+def test_sorted_and_list_tags_never_collide():
+    for size in (5000, 200):
+        tags = {shard_tag(3, size, mode, 8) for mode in ("sorted", "list", "hash")}
+        assert len(tags) == 3
+    # 예전(list, 5000) 이름은 그대로
+    assert shard_tag(3, 5000, "list") == "3"
+
+
+def test_sorted_shard_ignores_input_order_and_duplicates():
+    urls = [f"https://www.musinsa.com/snap/{i}" for i in (30, 10, 20, 10, 40)]
+    a = [snap_key(u) for u in shard(urls, 0, 2, "sorted")]
+    b = [snap_key(u) for u in shard(list(reversed(urls)), 0, 2, "sorted")]
+    assert a == b == ["10", "20"]
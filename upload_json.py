@@ -1,6 +1,8 @@
-import os, json, re, argparse
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from google.cloud import storage
+import os, json, re, time, argparse, threading
+from concurrent.futures import ThreadPoolExecutor
+from storage_backend import get_bucket
+from image_dedup import ImageStore
+from upload_manifest import put_json_once, stream_once, get_manifest
 from tqdm import tqdm
 import requests
 
@@ -16,27 +18,102 @@ CATS = {
 }
 
 def gcs():
-    return storage.Client().bucket("vton-mss")
+    return get_bucket("vton-mss")
 
 def upload_json(bucket, data, folder, filename):
-    blob = bucket.blob(f"{folder}/{filename}")
-    blob.upload_from_string(json.dumps(data, ensure_ascii=False, indent=2),
-                            content_type="application/json")
+    # 같은 내용이 이미 올라가 있으면(manifest) 건너뛴다
+    put_json_once(bucket, f"{folder}/{filename}", data)
 
 def upload_image(bucket, url, gcs_path, session):
-    try:
-        r = session.get(url, timeout=15)
-        r.raise_for_status()
-        blob = bucket.blob(gcs_path)
-        blob.upload_from_string(r.content, content_type="image/jpeg")
-        return True
-    except Exception:
-        return False
+    # 실패는 그대로 raise → UploadPipeline 이 실패 목록에 url 과 함께 남긴다
+    stream_once(bucket, url, gcs_path, session=session, timeout=15)
 
 def to_img_url(u: str) -> str:
     return re.sub(r'_500\.jpg$', '_big.jpg?w=1200', u)
 
-def main(fromn: int, nums: int):
+def make_session(pool_size: int):
+    session = requests.Session()
+    session.headers.update({"User-Agent": "Mozilla/5.0"})
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+class UploadPipeline:
+    """
+    상품 전체에 걸쳐 하나만 쓰는 업로드 워커 풀.
+    JSON/이미지 작업을 상품 경계 없이 흘려 넣고, 대기 작업 수는 max_pending 으로 제한한다.
+    """
+
+    def __init__(self, bucket, session, concurrency: int = 16, max_pending: int = None, store: ImageStore = None):
+        self.bucket = bucket
+        self.session = session
+        self.store = store
+        self.ex = ThreadPoolExecutor(max_workers=concurrency)
+        self.slots = threading.BoundedSemaphore(max_pending or concurrency * 4)
+        self.lock = threading.Lock()
+        self.counts = {"json": 0, "image": 0, "manifest": 0}
+        self.failures = []
+
+    def _run(self, kind, fn, args, meta):
+        try:
+            fn(*args)
+            with self.lock:
+                self.counts[kind] += 1
+        except Exception as e:
+            with self.lock:
+                self.failures.append({"kind": kind, **meta, "error": str(e)})
+        finally:
+            self.slots.release()
+
+    def submit(self, kind, fn, args, meta):
+        self.slots.acquire()   # 큐가 꽉 차면 생산자(메인 루프)가 잠깐 기다린다
+        self.ex.submit(self._run, kind, fn, args, meta)
+
+    def put_json(self, data, folder, filename, product_id):
+        self.submit("json", upload_json, (self.bucket, data, folder, filename),
+                    {"product_id": product_id, "path": f"{folder}/{filename}"})
+
+    def put_image(self, url, gcs_path, product_id):
+        self.submit("image", upload_image, (self.bucket, url, gcs_path, self.session),
+                    {"product_id": product_id, "url": url, "path": gcs_path})
+
+    def _image_set(self, urls, base_dir, product_id):
+        def failed(idx, url, e):
+            with self.lock:
+                self.failures.append({"kind": "image", "product_id": product_id, "url": url,
+                                      "path": f"{base_dir}/{idx}.jpg", "error": str(e)})
+        manifest = self.store.upload_images(base_dir, urls, name=lambda i: f"{i}.jpg",
+                                            on_error=failed, session=self.session, timeout=15)
+        with self.lock:
+            self.counts["image"] += len(manifest)
+
+    def put_image_set(self, urls, base_dir, product_id):
+        # dedup 모드: 상품 하나의 이미지는 순서대로(썸네일=첫 갤러리 URL 재사용), 상품끼리는 병렬
+        self.submit("manifest", self._image_set, (urls, base_dir, product_id),
+                    {"product_id": product_id, "path": f"{base_dir}/manifest.json"})
+
+    def close(self):
+        self.ex.shutdown(wait=True)
+        return {"uploaded": dict(self.counts), "failed": len(self.failures), "failures": self.failures}
+
+def product_paths(d):
+    cat = CATS[d['category_depth1']]
+    g = 'uni' if ('남성' in d['genders'] and '여성' in d['genders']) else ('men' if '남성' in d['genders'] else 'women')
+    folder1 = f"{g}_{cat}"
+    folder2 = str(d['product_id'])[:3]
+    return f"jsons/{folder1}/{folder2}", f"images/{folder1}/{folder2}/{d['product_id']}"
+
+def write_report(report, report_path):
+    m = get_manifest()
+    if m:
+        report["manifest"] = {"skipped": m.skipped, "uploaded": m.uploaded}
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"uploaded json={report['uploaded']['json']} image={report['uploaded']['image']} | "
+          f"failed={report['failed']} → {report_path}")
+
+def main(fromn: int, nums: int, concurrency: int = 16, report_path: str = None, dedup: bool = False):
     with open('./allowed_data.json', 'r') as f:
         allowed_data = json.load(f)
 
@@ -44,40 +121,91 @@ def main(fromn: int, nums: int):
     end = min(len(allowed_data), fromn + nums)
     print(f"total={len(allowed_data)} | processing={end - fromn}")
 
-    session = requests.Session()
-    session.headers.update({"User-Agent": "Mozilla/5.0"})
-
+    store = ImageStore(bucket) if dedup else None
+    pipe = UploadPipeline(bucket, make_session(concurrency), concurrency, store=store)
+    t0 = time.time()
     for d in tqdm(allowed_data[fromn:end]):
         try:
-            cat = CATS[d['category_depth1']]
-            g = 'uni' if ('남성' in d['genders'] and '여성' in d['genders']) else ('men' if '남성' in d['genders'] else 'women')
-            folder1 = f"{g}_{cat}"
-            folder2 = str(d['product_id'])[:3]
             pid = str(d['product_id'])
+            json_folder, base_dir = product_paths(d)
 
             # 1) JSON 저장 (경로 동일, images만 jsons로 변경)
-            json_folder = f"jsons/{folder1}/{folder2}"
-            upload_json(bucket, d, json_folder, f"{pid}.json")
+            pipe.put_json(d, json_folder, f"{pid}.json", pid)
 
-            # 2) 이미지 병렬 업로드: images/{folder1}/{folder2}/{pid}/{idx}.jpg
+            # 2) 이미지: images/{folder1}/{folder2}/{pid}/{idx}.jpg — 상품을 기다리지 않고 공용 풀에 넣는다
             img_urls = [to_img_url(u) for u in d.get('image_urls', [])]
-            base_dir = f"images/{folder1}/{folder2}/{pid}"
-
-            with ThreadPoolExecutor(max_workers=4) as ex:
-                futs = []
-                for idx, url in enumerate(img_urls):
-                    gcs_path = f"{base_dir}/{idx}.jpg"
-                    futs.append(ex.submit(upload_image, bucket, url, gcs_path, session))
-                # 완료 체크(필요시 결과 사용)
-                for _ in as_completed(futs): pass
+            if store:
+                # 내용 해시로 blobs/ 에 한 번만 저장하고 {base_dir}/manifest.json 에 {idx}.jpg → blob 경로
+                pipe.put_image_set(img_urls, base_dir, pid)
+                continue
+            for idx, url in enumerate(img_urls):
+                pipe.put_image(url, f"{base_dir}/{idx}.jpg", pid)
 
         except Exception as e:
             print("ERR:", e)
             continue
 
+    report = pipe.close()
+    report["elapsed_sec"] = round(time.time() - t0, 1)
+    if store:
+        report["dedup"] = dict(store.stats)
+        print(store.summary())
+        store.close()
+    write_report(report, report_path or f"./upload_report_{fromn}.json")
+
+def retry(report_path: str, concurrency: int = 16):
+    """이전 리포트의 실패 항목만 다시 올린다. 남은 실패는 같은 파일에 덮어쓴다."""
+    with open(report_path, 'r', encoding="utf-8") as f:
+        report = json.load(f)
+    failures = report["failures"]
+    dedup = "dedup" in report or any(x["kind"] == "manifest" for x in failures)
+    # dedup 모드의 이미지/manifest 실패는 manifest 를 다시 써야 하므로 상품 단위로 재시도
+    need = {x["product_id"] for x in failures if x["kind"] in ("json", "manifest") or (dedup and x["kind"] == "image")}
+    products = {}
+    if need:
+        with open('./allowed_data.json', 'r') as f:
+            products = {str(d['product_id']): d for d in json.load(f) if str(d['product_id']) in need}
+
+    bucket = gcs()
+    store = ImageStore(bucket) if dedup else None
+    pipe = UploadPipeline(bucket, make_session(concurrency), concurrency, store=store)
+    redone = set()
+    kept = []   # 원본 상품을 못 찾아 다시 못 올린 실패는 리포트에 그대로 남긴다
+    for x in tqdm(failures):
+        pid = x["product_id"]
+        if x["kind"] == "image" and not dedup:
+            pipe.put_image(x["url"], x["path"], pid)
+        elif pid not in products:
+            kept.append(x)
+        elif x["kind"] == "json":
+            folder, filename = x["path"].rsplit("/", 1)
+            pipe.put_json(products[pid], folder, filename, pid)
+        elif pid not in redone:
+            redone.add(pid)
+            _, base_dir = product_paths(products[pid])
+            pipe.put_image_set([to_img_url(u) for u in products[pid].get('image_urls', [])], base_dir, pid)
+    result = pipe.close()
+    result["failures"] += kept
+    result["failed"] = len(result["failures"])
+    if store:
+        result["dedup"] = dict(store.stats)
+        store.close()
+    write_report(result, report_path)
+
 if __name__ == "__main__":
     p = argparse.ArgumentParser()
-    p.add_argument("--fromn", type=int, required=True, help="시작 인덱스")
-    p.add_argument("--nums", type=int, required=True, help="수집 개수")
+    p.add_argument("--fromn", type=int, help="시작 인덱스")
+    p.add_argument("--nums", type=int, help="수집 개수")
+    p.add_argument("--concurrency", type=int, default=16, help="업로드 워커 수 (상품 전체 공용)")
+    p.add_argument("--report", type=str, default=None, help="결과/실패 리포트 경로 (기본 ./upload_report_{fromn}.json)")
+    p.add_argument("--retry", action="store_true", help="--report 의 실패 항목만 다시 업로드")
+    p.add_argument("--dedup", action="store_true", help="이미지를 내용 해시로 한 번만 저장하고 상품별 manifest.json 으로 연결")
     a = p.parse_args()
-    main(a.fromn * a.nums, a.nums)
+    if a.retry:
+        if not a.report:
+            p.error("--retry 에는 --report 가 필요합니다")
+        retry(a.report, a.concurrency)
+    else:
+        if a.fromn is None or a.nums is None:
+            p.error("--fromn/--nums 가 필요합니다")
+        main(a.fromn * a.nums, a.nums, a.concurrency, a.report, a.dedup)
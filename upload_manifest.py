@@ -0,0 +1,189 @@
+import os
+import json
+import atexit
+import time
+import base64
+import hashlib
+import sqlite3
+import argparse
+import threading
+from typing import Callable, Dict, Optional
+
+from image_transfer import stream_to_bucket
+
+# 버킷에 이미 올라간 오브젝트 기록 (로컬 SQLite).
+# 업로드 함수가 먼저 여기서 확인하고, 같은 내용/같은 원본 URL 이면 전송을 건너뛴다.
+#   objects(bucket, path, logical, ext, size, checksum, source_url, updated_at)
+#   logical = 확장자를 뺀 경로 → 확장자를 응답 헤더로 정하는 스냅 이미지도 찾을 수 있다.
+# 버킷 목록 한 번으로 채워 넣을 수 있다 (python upload_manifest.py --seed --bucket vton-mss --prefix images/).
+# 여러 프로세스(supervisor 의 병렬 worker)가 같은 파일을 쓰므로 쓰기마다 바로 커밋하고(autocommit),
+# 잠겨 있으면 busy_timeout 만큼 기다린다. manifest 쓰기 실패는 경고만 — 이미 끝난 업로드를 실패로 만들지 않는다.
+
+DEFAULT_PATH = "./upload_manifest.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    bucket     TEXT NOT NULL,
+    path       TEXT NOT NULL,
+    logical    TEXT NOT NULL,
+    ext        TEXT NOT NULL,
+    size       INTEGER,
+    checksum   TEXT,
+    source_url TEXT,
+    updated_at REAL,
+    PRIMARY KEY (bucket, path)
+);
+CREATE INDEX IF NOT EXISTS objects_logical ON objects (bucket, logical);
+"""
+
+_COLS = ("bucket", "path", "logical", "ext", "size", "checksum", "source_url", "updated_at")
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def md5_b64(data: bytes) -> str:
+    return base64.b64encode(hashlib.md5(data).digest()).decode()
+
+
+class UploadManifest:
+    def __init__(self, path: str = DEFAULT_PATH, busy_timeout: float = 30.0):
+        self.path = path
+        # isolation_level=None: 암묵적 트랜잭션을 열어 두지 않는다 (다른 프로세스의 쓰기를 막지 않게)
+        self._conn = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        self._conn.execute(f"PRAGMA busy_timeout={int(busy_timeout * 1000)}")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self.skipped = 0
+        self.uploaded = 0
+
+    def _row(self, sql: str, args) -> Optional[Dict]:
+        try:
+            with self._lock:
+                r = self._conn.execute(sql, args).fetchone()
+        except sqlite3.Error as e:
+            print(f"[WARN] manifest read failed ({self.path}): {e}")
+            return None
+        return dict(zip(_COLS, r)) if r else None
+
+    def get(self, bucket: str, path: str) -> Optional[Dict]:
+        return self._row(f"SELECT {','.join(_COLS)} FROM objects WHERE bucket=? AND path=?", (bucket, path))
+
+    def find_logical(self, bucket: str, logical: str) -> Optional[Dict]:
+        return self._row(f"SELECT {','.join(_COLS)} FROM objects WHERE bucket=? AND logical=? "
+                         f"ORDER BY updated_at DESC LIMIT 1", (bucket, logical))
+
+    def record(self, bucket: str, path: str, size: Optional[int] = None, checksum: Optional[str] = None,
+               source_url: Optional[str] = None) -> None:
+        logical, ext = os.path.splitext(path)
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO objects VALUES (?,?,?,?,?,?,?,?)",
+                    (bucket, path, logical, ext, size, checksum, source_url, time.time()),
+                )
+        except sqlite3.Error as e:
+            # 업로드는 이미 끝났다. 기록만 빠지면 다음 실행에서 한 번 더 올릴 뿐
+            print(f"[WARN] manifest write failed for {bucket}/{path}: {e}")
+
+    def seed(self, bucket, prefix: str = "") -> int:
+        """버킷 목록 한 번으로 (path, size, md5) 를 채운다. 이미 있는 행의 source_url 은 유지."""
+        n = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for path, size, md5 in bucket.list_meta(prefix):
+                    logical, ext = os.path.splitext(path)
+                    self._conn.execute(
+                        "INSERT INTO objects VALUES (?,?,?,?,?,?,NULL,?) "
+                        "ON CONFLICT(bucket, path) DO UPDATE SET size=excluded.size, checksum=excluded.checksum",
+                        (bucket.name, path, logical, ext, size, md5, time.time()),
+                    )
+                    n += 1
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return n
+
+    def count(self, bucket: Optional[str] = None) -> int:
+        with self._lock:
+            if bucket:
+                return self._conn.execute("SELECT COUNT(*) FROM objects WHERE bucket=?", (bucket,)).fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def get_manifest() -> Optional[UploadManifest]:
+    """프로세스 공용 manifest. UPLOAD_MANIFEST="" 이면 끈다."""
+    global _manifest
+    path = os.environ.get("UPLOAD_MANIFEST", DEFAULT_PATH)
+    if not path:
+        return None
+    if _manifest is None:
+        with _manifest_lock:
+            if _manifest is None:
+                _manifest = UploadManifest(path)
+                atexit.register(_manifest.close)
+    return _manifest
+
+
+def put_json_once(bucket, path: str, data, manifest: Optional[UploadManifest] = None) -> bool:
+    """내용(md5)이 manifest 와 같으면 건너뛴다. 올렸으면 True."""
+    m = manifest or get_manifest()
+    body = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    checksum = md5_b64(body)
+    if m:
+        row = m.get(bucket.name, path)
+        if row and row["checksum"] == checksum:
+            m.skipped += 1
+            return False
+    bucket.put_bytes(path, body, content_type="application/json")
+    if m:
+        m.record(bucket.name, path, len(body), checksum)
+        m.uploaded += 1
+    return True
+
+
+def stream_once(bucket, url: str, dst_path: str, ext_from: Optional[Callable[[str, Optional[str]], str]] = None,
+                manifest: Optional[UploadManifest] = None, **kw) -> str:
+    """
+    이미지 업로드 (stream_to_bucket) 를 manifest 로 감싼다. 실제 저장된 경로(확장자 포함)를 돌려준다.
+    ext_from 이 있으면 dst_path 는 확장자 없는 논리 경로로 보고 같은 논리 경로의 기존 오브젝트를 찾는다.
+    기록된 원본 URL 이 다르면(이미지 교체) 다시 올린다. 버킷 목록으로 채운 행은 URL 이 없으므로 그대로 인정.
+    """
+    m = manifest or get_manifest()
+    if m:
+        row = m.find_logical(bucket.name, dst_path) if ext_from else m.get(bucket.name, dst_path)
+        if row and row["source_url"] in (None, url):
+            m.skipped += 1
+            return row["path"]
+    path, size, checksum = stream_to_bucket(bucket, url, dst_path, ext_from=ext_from, **kw)
+    if m:
+        m.record(bucket.name, path, size, checksum, source_url=url)
+        m.uploaded += 1
+    return path
+
+
+if __name__ == "__main__":
+    from storage_backend import get_bucket
+
+    p = argparse.ArgumentParser(description="업로드 manifest (SQLite) 관리")
+    p.add_argument("--db", type=str, default=os.environ.get("UPLOAD_MANIFEST") or DEFAULT_PATH)
+    p.add_argument("--seed", action="store_true", help="버킷 목록으로 manifest 채우기")
+    p.add_argument("--bucket", type=str, default="vton-mss")
+    p.add_argument("--prefix", type=str, default="")
+    args = p.parse_args()
+
+    m = UploadManifest(args.db)
+    if args.seed:
+        t0 = time.time()
+        n = m.seed(get_bucket(args.bucket), args.prefix)
+        print(f"✅ seeded {n} objects from gs://{args.bucket}/{args.prefix} ({time.time() - t0:.1f}s)")
+    print(f"{args.db}: {args.bucket}={m.count(args.bucket)} / total={m.count()}")
+    m.close()
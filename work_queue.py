@@ -0,0 +1,273 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import argparse
+import threading
+from typing import Any, Dict, List, Optional
+
+# Supabase "logs" 작업 큐 (url, status = wait / doing / done).
+#   - claim(n)     : wait 이거나 lease 가 만료된 doing 행 n 개를 한 번에 원자적으로 가져간다
+#   - heartbeat    : 처리 중인 행의 lease 연장 (백그라운드 스레드)
+#   - complete     : 완료 결과를 모아 두었다가 한 번에 기록
+# Supabase 쪽은 아래 LOGS_QUEUE_SQL 을 SQL editor 에서 한 번 실행해 두면 rpc 로 호출된다.
+# SqliteQueue 는 같은 동작의 로컬 stand-in (벤치마크/오프라인용).
+
+LOGS_QUEUE_SQL = """
+alter table logs add column if not exists lease_owner text;
+alter table logs add column if not exists lease_until timestamptz;
+alter table logs add column if not exists attempts int not null default 0;
+create index if not exists logs_status_lease on logs (status, lease_until);
+
+create or replace function claim_logs(p_worker text, p_limit int, p_lease_sec int)
+returns setof logs language sql as $$
+  update logs l
+     set status = 'doing', lease_owner = p_worker,
+         lease_until = now() + make_interval(secs => p_lease_sec), attempts = l.attempts + 1
+   where l.url in (
+         select url from logs
+          where status = 'wait' or (status = 'doing' and lease_until < now())
+          order by url
+          limit p_limit
+          for update skip locked)
+  returning l.*;
+$$;
+
+create or replace function heartbeat_logs(p_worker text, p_urls text[], p_lease_sec int)
+returns int language sql as $$
+  with u as (
+    update logs set lease_until = now() + make_interval(secs => p_lease_sec)
+     where url = any(p_urls) and lease_owner = p_worker and status = 'doing'
+    returning 1)
+  select count(*)::int from u;
+$$;
+
+create or replace function complete_logs(p_worker text, p_rows jsonb)
+returns int language sql as $$
+  with u as (
+    update logs l
+       set status = 'done', lease_until = null,
+           total_num = (r->>'total_num')::int, get_num = (r->>'get_num')::int
+      from jsonb_array_elements(p_rows) r
+     where l.url = r->>'url' and l.lease_owner = p_worker
+    returning 1)
+  select count(*)::int from u;
+$$;
+"""
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class _QueueBase:
+    def __init__(self, worker_id: Optional[str] = None, lease_sec: int = 600, complete_every: int = 20):
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_sec = lease_sec
+        self.complete_every = complete_every
+        self.held: Dict[str, Dict[str, Any]] = {}
+        self._done: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._hb_stop = threading.Event()
+        self._hb = None
+
+    # --- backend 별 구현 ---
+    def _claim(self, n: int) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def _heartbeat(self, urls: List[str]) -> int:
+        raise NotImplementedError
+
+    def _complete(self, rows: List[Dict[str, Any]]) -> int:
+        raise NotImplementedError
+
+    # --- 공통 ---
+    def claim(self, n: int = 1) -> List[Dict[str, Any]]:
+        self.flush()   # 완료 기록을 먼저 보내서 다른 워커가 헛 claim 하지 않게
+        rows = self._claim(n)
+        with self._lock:
+            for r in rows:
+                self.held[r["url"]] = r
+        return rows
+
+    def heartbeat(self) -> int:
+        with self._lock:
+            urls = list(self.held)
+        return self._heartbeat(urls) if urls else 0
+
+    def complete(self, url: str, **fields) -> None:
+        with self._lock:
+            self.held.pop(url, None)
+            self._done.append({"url": url, **fields})
+            full = len(self._done) >= self.complete_every
+        if full:
+            self.flush()
+
+    def release(self, url: str) -> None:
+        """처리 못 한 행은 wait 로 돌려놓지 않고 lease 만료에 맡긴다 (다른 워커가 재claim)."""
+        with self._lock:
+            self.held.pop(url, None)
+
+    def flush(self) -> int:
+        with self._lock:
+            rows, self._done = self._done, []
+        return self._complete(rows) if rows else 0
+
+    def start_heartbeat(self, every: Optional[float] = None) -> None:
+        every = every or max(self.lease_sec / 3, 1)
+
+        def loop():
+            while not self._hb_stop.wait(every):
+                try:
+                    self.heartbeat()
+                except Exception as e:
+                    print(f"[WARN] heartbeat failed: {e}")
+        self._hb = threading.Thread(target=loop, daemon=True)
+        self._hb.start()
+
+    def close(self) -> None:
+        self._hb_stop.set()
+        self.flush()
+
+
+class SupabaseQueue(_QueueBase):
+    def __init__(self, supabase, **kw):
+        super().__init__(**kw)
+        self.supabase = supabase
+
+    def _claim(self, n):
+        return self.supabase.rpc("claim_logs", {"p_worker": self.worker_id, "p_limit": n,
+                                                "p_lease_sec": self.lease_sec}).execute().data or []
+
+    def _heartbeat(self, urls):
+        return self.supabase.rpc("heartbeat_logs", {"p_worker": self.worker_id, "p_urls": urls,
+                                                    "p_lease_sec": self.lease_sec}).execute().data
+
+    def _complete(self, rows):
+        return self.supabase.rpc("complete_logs", {"p_worker": self.worker_id, "p_rows": rows}).execute().data
+
+
+class SqliteQueue(_QueueBase):
+    """logs 테이블 stand-in. BEGIN IMMEDIATE 로 claim 을 직렬화해서 같은 행을 두 워커가 가져가지 않는다."""
+
+    def __init__(self, path: str, **kw):
+        super().__init__(**kw)
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS logs (
+            url TEXT PRIMARY KEY, status TEXT NOT NULL DEFAULT 'wait',
+            total_num INTEGER, get_num INTEGER,
+            lease_owner TEXT, lease_until REAL, attempts INTEGER NOT NULL DEFAULT 0)""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS logs_status_lease ON logs (status, lease_until)")
+        self._db_lock = threading.Lock()   # 같은 connection 을 heartbeat 스레드와 공유
+
+    def _tx(self, fn):
+        with self._db_lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                out = fn(self.conn)
+                self.conn.execute("COMMIT")
+                return out
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def _claim(self, n):
+        now = time.time()
+
+        def run(c):
+            cur = c.execute(
+                "UPDATE logs SET status='doing', lease_owner=?, lease_until=?, attempts=attempts+1 "
+                "WHERE url IN (SELECT url FROM logs WHERE status='wait' OR (status='doing' AND lease_until < ?) "
+                "ORDER BY url LIMIT ?) RETURNING url, status, attempts",
+                (self.worker_id, now + self.lease_sec, now, n),
+            )
+            return [{"url": u, "status": s, "attempts": a} for u, s, a in cur.fetchall()]
+        return self._tx(run)
+
+    def _heartbeat(self, urls):
+        until = time.time() + self.lease_sec
+        return self._tx(lambda c: c.executemany(
+            "UPDATE logs SET lease_until=? WHERE url=? AND lease_owner=? AND status='doing'",
+            [(until, u, self.worker_id) for u in urls]).rowcount)
+
+    def _complete(self, rows):
+        return self._tx(lambda c: c.executemany(
+            "UPDATE logs SET status='done', lease_until=NULL, total_num=?, get_num=? WHERE url=? AND lease_owner=?",
+            [(r.get("total_num"), r.get("get_num"), r["url"], self.worker_id) for r in rows]).rowcount)
+
+    def seed(self, urls: List[str]) -> None:
+        self._tx(lambda c: c.executemany("INSERT OR IGNORE INTO logs (url) VALUES (?)", [(u,) for u in urls]))
+
+    def counts(self) -> Dict[str, int]:
+        with self._db_lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM logs GROUP BY status").fetchall())
+
+    def close(self):
+        super().close()
+        with self._db_lock:
+            self.conn.close()
+
+
+def bench(path: str, workers: int, rows: int, batch: int, lease_sec: int = 30) -> Dict[str, Any]:
+    """workers 개 스레드가 각자 connection 으로 claim → complete 를 반복. 중복 claim 이 없는지도 확인."""
+    if os.path.exists(path):
+        os.remove(path)
+    q = SqliteQueue(path)
+    q.seed([f"https://www.musinsa.com/snap/{i}" for i in range(rows)])
+    q.close()
+
+    seen: Dict[str, int] = {}
+    seen_lock = threading.Lock()
+    claims = [0]
+
+    def worker(i):
+        wq = SqliteQueue(path, worker_id=f"bench-{i}", lease_sec=lease_sec)
+        while True:
+            got = wq.claim(batch)
+            if not got:
+                break
+            with seen_lock:
+                claims[0] += 1
+                for r in got:
+                    seen[r["url"]] = seen.get(r["url"], 0) + 1
+            for r in got:
+                wq.complete(r["url"], total_num=1, get_num=1)
+        wq.close()
+
+    t0 = time.time()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    el = time.time() - t0
+
+    q = SqliteQueue(path)
+    result = {
+        "workers": workers, "rows": rows, "batch": batch, "elapsed_sec": round(el, 2),
+        "claim_calls_per_sec": round(claims[0] / el, 1), "rows_per_sec": round(len(seen) / el, 1),
+        "duplicate_claims": sum(v - 1 for v in seen.values()), "status": q.counts(),
+    }
+    q.close()
+    return result
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="logs 작업 큐: Supabase SQL 출력 / SQLite stand-in 벤치마크")
+    p.add_argument("--print_sql", action="store_true", help="Supabase 에 적용할 컬럼/함수 SQL 출력")
+    p.add_argument("--bench", action="store_true", help="SQLite stand-in 으로 claims/sec 측정")
+    p.add_argument("--db", type=str, default="./logs_queue_bench.sqlite")
+    p.add_argument("--workers", type=str, default="1,4,16,32", help="쉼표 구분 워커 수 목록")
+    p.add_argument("--rows", type=int, default=5000)
+    p.add_argument("--batch", type=int, default=8)
+    args = p.parse_args()
+
+    if args.print_sql:
+        print(LOGS_QUEUE_SQL)
+    if args.bench:
+        for w in [int(x) for x in args.workers.split(",") if x]:
+            print(json.dumps(bench(args.db, w, args.rows, args.batch), ensure_ascii=False))
@@ -1,16 +1,20 @@
-import re
-import os
-import json
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
-from google.cloud import storage
 import os
 import time
-import json
+import asyncio
+import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 import argparse
 
+from product_extract import extract_product
+from crawl_cursor import open_resumable_run
+from id_bitmap import IdStatusMap, LIVE, DEAD, RETRY, probe_ids, plan_sweep
+from record_sink import JsonlSink
+from discovery import Frontier, discover, listing_seeds, LISTING_BASE
+from storage_backend import get_bucket
+from range_lease import RangeLeases
+
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "./first-project-438808-dc1804307b11.json"
 
 def upload_to_gcs(local_file_path: str, bucket_name: str = "vton-mss", folder='', destination_name: str = None):
@@ -21,272 +25,288 @@ def upload_to_gcs(local_file_path: str, bucket_name: str = "vton-mss", folder=''
     if destination_name is None:
         destination_name = os.path.basename(local_file_path)
 
-    # GCS 클라이언트 생성 (환경변수 GOOGLE_APPLICATION_CREDENTIALS 필요)
-    storage_client = storage.Client()
     blob_name = f"{folder.rstrip('/')}/{destination_name}" if folder else destination_name
 
-
-    bucket = storage_client.bucket(bucket_name)
-    blob = bucket.blob(blob_name)
-
-    blob.upload_from_filename(local_file_path)
+    # 공유 클라이언트 (환경변수 GOOGLE_APPLICATION_CREDENTIALS 필요, STORAGE_BACKEND=local 이면 로컬 디스크)
+    get_bucket(bucket_name).put_filename(blob_name, local_file_path)
 
     print(f"✅ Uploaded {local_file_path} to gs://{bucket_name}/{blob_name}")
 
 
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
-                  "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-}
-
-def parse_from_next_data(soup):
-    node = soup.find("script", id="__NEXT_DATA__", type="application/json")
-    if not node:
-        return None
-    data = json.loads(node.text)
-
-    d = data["props"]["pageProps"]["meta"]["data"]
-    # 원하는 필드들
-    style_no = d.get("styleNo", "")
-    product_id = d.get("goodsNo", "")
-    product_name_korean = d.get("goodsNm", '')
-    product_name = d.get('goodsNmEng', '')
-    genders = d.get("sex", [])
-    brand_name_korean = d.get("brandInfo", {}).get("brandName", "")
-    brand_name = d.get("brandInfo", {}).get("brand", "")
-    cat1 = d.get("category", {}).get("categoryDepth1Name", "")
-    cat2 = d.get("category", {}).get("categoryDepth2Name", "")
-    price = d.get("goodsPrice", {}).get("salePrice", 0)
-    review_count = d.get('goodsReview', {}).get('totalCount', -1)
-    review_score = d.get('goodsReview', {}).get('satisfactionScore', -1)
-
-    mats = d.get('goodsMaterial', {}).get("materials", {})
-
-    extra_infos = []
-    if mats != {}:
-        for m in mats:
-            ifo = []
-            ifo.append(m['name'])
-            for item in m['items']:
-                isSelected = item.get('isSelected', False)
-                if isSelected:
-                    ifo.append(item['name'])
-            extra_infos.append(ifo)
-
-    return {
-        "style_no": style_no,
-        "product_id": product_id,
-        "product_name": product_name,
-        "product_name_korean": product_name_korean,
-        "genders": genders,
-        "brand_name": brand_name,
-        "brand_name_korean": brand_name_korean,
-        "category_depth1": cat1,
-        "category_depth2": cat2,
-        "price_krw": price,
-        "extra_infos": extra_infos,
-        'review_count':review_count,
-        'review_score':review_score
-    }
-
-def parse_from_window_state(html):
-    # window.__MSS__.product.state = { ... };
-    m = re.search(
-        r"window\.__MSS__\.product\.state\s*=\s*({.*?});\s*window\.__MSS__",
-        html, flags=re.S
-    )
-    if not m:
-        # 마지막에 한 번 더 정의돼 있을 수 있으니 완화된 패턴 시도
-        m = re.search(r"window\.__MSS__\.product\.state\s*=\s*({.*?});", html, re.S)
-        if not m:
-            return None
-    state = json.loads(m.group(1))
-
-    style_no = state.get("styleNo", "")
-    product_id = state.get("goodsNo", "")
-    product_name_korean = state.get("goodsNm", '')
-    product_name = state.get('goodsNmEng', '')
-    genders = state.get("sex", [])
-    brand_name_korean = state.get("brandInfo", {}).get("brandName", "")
-    brand_name = state.get("brandInfo", {}).get("brand", "")
-    cat1 = state.get("category", {}).get("categoryDepth1Name", "")
-    cat2 = state.get("category", {}).get("categoryDepth2Name", "")
-    price = state.get("goodsPrice", {}).get("salePrice", 0)
-    review_count = state.get('goodsReview', {}).get('totalCount', -1)
-    review_score = state.get('goodsReview', {}).get('satisfactionScore', -1)
-
-    mats = state.get('goodsMaterial', {}).get("materials", {})
-
-    extra_infos = []
-    if mats != {}:
-        for m in mats:
-            ifo = []
-            ifo.append(m['name'])
-            for item in m['items']:
-                isSelected = item.get('isSelected', False)
-                if isSelected:
-                    ifo.append(item['name'])
-            extra_infos.append(ifo)
-
-    return {
-        "style_no": style_no,
-        "product_id": product_id,
-        "product_name": product_name,
-        "product_name_korean": product_name_korean,
-        "genders": genders,
-        "brand_name": brand_name,
-        "brand_name_korean": brand_name_korean,
-        "category_depth1": cat1,
-        "category_depth2": cat2,
-        "price_krw": price,
-        "extra_infos": extra_infos,
-        'review_count':review_count,
-        'review_score':review_score
-    }
-
-def scrape_product_fields(soup, html):
-    soup = BeautifulSoup(html, "html.parser")
-
-    # 1순위: __NEXT_DATA__
-    info = parse_from_next_data(soup)
-    if info:
-        return info
-
-    # 2순위: window.__MSS__.product.state
-    info = parse_from_window_state(html)
-    if info:
-        return info
-
-    raise RuntimeError("상품 정보를 찾지 못했습니다.")
-
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
                   "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
     "Accept-Language": "ko,en;q=0.9",
 }
 
-def normalize(url: str) -> str:
-    # 무신사 이미지는 종종 //image... 형태 → https: 붙이기
-    if url.startswith("//"):
-        return "https:" + url
-    # /images/... 형태는 사이트 기준으로 절대화
-    return urljoin("https://image.msscdn.net/", url)
-
-def extract_from_next_data(soup):
-    node = soup.find("script", id="__NEXT_DATA__", type="application/json")
-    if not node: 
-        return [], []
-    data = json.loads(node.text)
-    d = data["props"]["pageProps"]["meta"]["data"]
-
-    # 1) 갤러리/디테일 이미지
-    gallery = [normalize(x["imageUrl"]) for x in d.get("goodsImages", []) if "imageUrl" in x]
+def make_requests_session(pool_size: int = 32) -> requests.Session:
+    s = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    return s
 
-    # 2) 상세설명 HTML 안의 <img src="...">
-    # goods_contents_html = d.get("goodsContents", "") or ""
-    # inner_soup = BeautifulSoup(goods_contents_html, "html.parser")
-    # content_imgs = [normalize(img.get("src")) for img in inner_soup.find_all("img", src=True)]
-
-    return gallery
-
-def extract_from_window_state(html):
-    m = re.search(r"window\.__MSS__\.product\.state\s*=\s*({.*?});", html, re.S)
-    if not m:
-        return [], []
-    state = json.loads(m.group(1))
-
-    gallery = [normalize(x["imageUrl"]) for x in state.get("goodsImages", []) if "imageUrl" in x]
-
-    # goods_contents_html = state.get("goodsContents", "") or ""
-    # inner_soup = BeautifulSoup(goods_contents_html, "html.parser")
-    # content_imgs = [normalize(img.get("src")) for img in inner_soup.find_all("img", src=True)]
-
-    return gallery
-
-def fetch_images(url):
-    r = requests.get(url, headers=HEADERS, timeout=15)
-    r.raise_for_status()
-    html = r.text
-    soup = BeautifulSoup(html, "html.parser")
-
-    g1 = extract_from_next_data(soup)
-    if len(g1) == 0:
-        g2 = extract_from_window_state(html)
-
-        images = list(dict.fromkeys(g1 + g2))  # 중복 제거(순서 유지)
-    else:
-        images = g1
-
-    return images
-
-def extract_meta_thumbnail(soup: BeautifulSoup):
-    # <meta property="og:image" ...>
-    meta = soup.find("meta", attrs={"property": "og:image"})
-    og_img = normalize(meta["content"]) if meta and meta.get("content") else None
-    return [og_img] if og_img else []
-
-def get_from_url(url):
-    response = requests.get(url)
+def get_from_url(url, session=None):
+    response = (session or requests).get(url, timeout=15)
     response.raise_for_status()  # 요청 실패 시 에러 발생
-    soup = BeautifulSoup(response.text, "html.parser")
-
-    info = scrape_product_fields(soup, response.text)
-    gal_images = extract_from_next_data(soup)
-    thumbnail = extract_meta_thumbnail(soup)
 
-    image_urls = [thumbnail[0]] + [ul for ul in gal_images]
-    # image_urls = [re.sub('500.jpg', 'big.jpg?w=1200', thumbnail[0])] + [re.sub('500.jpg', 'big.jpg?w=1200', ul) for ul in gal_images]
+    # soup 트리 없이 임베디드 JSON 을 한 번만 디코딩해서 필드/갤러리/og:image 를 뽑는다
+    info, image_urls = extract_product(response.content)
+    # image_urls = [re.sub('500.jpg', 'big.jpg?w=1200', ul) for ul in image_urls]
 
     return info, image_urls
 
+def restore_from_gcs(ori, bucket_name: str = "vton-mss"):
+    # 로컬 상태가 없으면(다른 박스에서 재시작) 업로드된 세그먼트와 cursor 를 받아온다
+    bucket = get_bucket(bucket_name)
+    for name in bucket.list(f'temporarysaves/musinsa_datas_{ori}/'):
+        bucket.download(name, os.path.basename(name))
+        print(f"✅ Restored gs://{bucket_name}/{name}")
+
+def record_product_id(d):
+    return int(d['product_url'].rsplit('/', 1)[-1])
+
+def open_run(ori, nums):
+    # 세그먼트가 확정될 때마다 그 조각과 cursor 만 올린다 (전체 리스트 재업로드 X)
+    return open_resumable_run(
+        f'musinsa_datas_{ori}', ori, ori + nums, record_product_id,
+        upload=lambda p: upload_to_gcs(p, folder=f'temporarysaves/musinsa_datas_{ori}'),
+        restore=lambda: restore_from_gcs(ori),
+    )
+
+def finalize_run(sink, cursor, ori):
+    cursor.save()
+    # 재시작한 경우 레코드 순서가 섞일 수 있으니 id 순으로 정렬
+    done_path = sink.finalize(f'musinsa_datas_{ori}_done.json', sort_key=record_product_id if cursor.resumed else None)
+    upload_to_gcs(done_path, folder='temporarysaves')
+
 def main(fromn, nums):
-    total_datas = []
+    sink, cursor = open_run(fromn, nums)
     st = time.time()
     ori = fromn
-    for i in tqdm(range(0, nums)):
-        url = f'https://www.musinsa.com/products/{ori + i}'
+    for i, pid in enumerate(tqdm(cursor.claim_iter(), total=cursor.remaining())):
+        url = f'https://www.musinsa.com/products/{pid}'
         
-        try:
-            if i%5000 == 4999:
-                json.dump(total_datas, open(f'musinsa_datas_{ori}.json', 'w'), ensure_ascii=False, indent=2)
-
-                print(f"데이터 저장: {ori} ~ {ori + i}")
-                print(f"총 {len(total_datas)}개의 상품 정보를 추출했습니다.")
-                print(f"총 {time.time() - st}초 소요되었습니다.\n\n")
-
-                # 여기서 GCS에 주기적으로 업로드
-                upload_to_gcs(f'musinsa_datas_{ori}.json', folder='temporarysaves')
-
-            if i%20000 == 19999:
-                json.dump(total_datas, open(f'musinsa_datas_{ori}_{i}.json', 'w'), ensure_ascii=False, indent=2)
-
-                print(f"데이터 저장: {ori} ~ {ori + i}")
-                print(f"총 {len(total_datas)}개의 상품 정보를 추출했습니다.")
-                print(f"총 {time.time() - st}초 소요되었습니다.\n\n")
-
-                upload_to_gcs(f'musinsa_datas_{ori}_{i}.json', folder='temporarysaves')
-        except Exception as e:
-            print(e)
-            continue
+        if i%5000 == 4999:
+            print(f"진행: {ori} ~ {pid}")
+            print(f"총 {sink.count}개의 상품 정보를 추출했습니다.")
+            print(f"총 {time.time() - st}초 소요되었습니다.\n\n")
 
         try:
             info, image_urls = get_from_url(url)
             # print({**info, 'product_url': url, 'image_urls': image_urls})
-            total_datas.append({**info, 'product_url': url, 'image_urls': image_urls})
+            sink.append({**info, 'product_url': url, 'image_urls': image_urls})
         except Exception as e:
             # print(e)
-            continue
+            pass
+        cursor.mark_done(pid)
     
-    json.dump(total_datas, open(f'musinsa_datas_{ori}_done.json', 'w'), ensure_ascii=False, indent=2)
-    upload_to_gcs(f'musinsa_datas_{ori}_done.json', folder='temporarysaves')
+    finalize_run(sink, cursor, ori)
     print("Finished!")
     
 
+PRODUCT_BASE = 'https://www.musinsa.com'
+
+async def iter_products(ids, concurrency: int = 16, session=None, product_base: str = PRODUCT_BASE):
+    """
+    ids 순서대로 (pid, url, info, image_urls, err) 를 yield.
+    요청은 최대 concurrency 개까지 동시에 진행하고, 결과는 id 순서를 유지한다.
+    """
+    session = session or make_requests_session(concurrency)
+    sem = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    # asyncio 기본 executor 는 스레드가 32개로 묶여 있어서 concurrency 만큼 따로 만든다
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    async def fetch(pid):
+        url = f'{product_base}/products/{pid}'
+        async with sem:
+            try:
+                info, image_urls = await loop.run_in_executor(executor, get_from_url, url, session)
+                return pid, url, info, image_urls, None
+            except Exception as e:
+                return pid, url, None, None, e
+
+    # 앞쪽 결과를 기다리는 동안에도 뒤쪽 요청이 계속 돌도록 window 만큼 미리 띄워둔다
+    window = deque()
+    try:
+        for pid in ids:
+            window.append(asyncio.create_task(fetch(pid)))
+            if len(window) >= concurrency * 2:
+                yield await window.popleft()
+        while window:
+            yield await window.popleft()
+    finally:
+        for task in window:
+            task.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def classify_error(err):
+    # 결과를 id 상태로: 404/410 만 dead, 차단/타임아웃/5xx 는 retry
+    # 200 인데 상품 정보가 없는 페이지(봇 차단 화면, 브라우저에서 그려지는 페이지)도 retry → 브라우저로 다시 시도
+    if err is None:
+        return LIVE
+    if isinstance(err, requests.HTTPError) and err.response is not None:
+        return DEAD if err.response.status_code in (404, 410) else RETRY
+    return RETRY
+
+def load_id_map(ori, bucket_name: str = "vton-mss"):
+    # 샤드마다 따로 올린 상태 비트맵을 모두 받아 합친다
+    idmap = IdStatusMap(f'id_status_{ori}.bin')
+    try:
+        bucket = get_bucket(bucket_name)
+        for name in bucket.list('temporarysaves/id_status/'):
+            local = f'./_{os.path.basename(name)}'
+            bucket.download(name, local)
+            idmap.merge(IdStatusMap(local))
+            os.remove(local)
+    except Exception as e:
+        print(f"[WARN] cannot load id status maps: {e}")
+    print(f"[ID-MAP] {idmap.summary()}")
+    return idmap
+
+def save_id_map(idmap, ori):
+    upload_to_gcs(idmap.save(), folder='temporarysaves/id_status')
+
+async def main_async(fromn, nums, concurrency, scan=False, sample_every=20, sparse_threshold=0.01,
+                     recheck_days=30.0):
+    sink, cursor = open_run(fromn, nums)
+    # 다른 샤드의 상태 비트맵은 --scan 에서 건너뛸 id 를 고를 때만 필요하다 (아니면 이 구간 것만 기록)
+    idmap = load_id_map(fromn) if scan else IdStatusMap(f'id_status_{fromn}.bin')
+    st = time.time()
+    ori = fromn
+    total = cursor.remaining()
+    pbar = tqdm(total=total)
+    fetched = 0
+
+    async def run(ids):
+        nonlocal fetched
+        async for pid, url, info, image_urls, err in iter_products(cursor.claim_iter(ids), concurrency):
+            if err is None:
+                sink.append({**info, 'product_url': url, 'image_urls': image_urls})
+            idmap.mark(pid, classify_error(err))
+            cursor.mark_done(pid)
+            pbar.update(1)
+            fetched += 1
+            if fetched % 100 == 99:
+                pbar.set_postfix(ids_per_sec=f"{fetched / (time.time() - st):.1f}")
+
+            if fetched % 5000 == 4999:
+                print(f"진행: {ori} ~ {pid}")
+                print(f"총 {sink.count}개의 상품 정보를 추출했습니다.")
+                print(f"총 {time.time() - st}초 소요되었습니다. ({fetched / (time.time() - st):.1f} ids/sec)\n\n")
+                idmap.save()
+
+    skipped = 0
+    if scan:
+        # 1) 밀도를 모르는 block 은 샘플만 먼저 찔러본다
+        await run(list(probe_ids(idmap, cursor.pending(), sample_every)))
+
+        # 2) 전체 스윕: dead 와 희박한 block 의 미확인 id 는 건너뛰고 cursor 에만 완료 처리
+        #    (가장 큰 live id 이상, recheck_days 동안 다 훑지 않은 block 은 다시 전부)
+        def sweep():
+            nonlocal skipped
+            for pid, fetch in plan_sweep(idmap, cursor.pending(), sparse_threshold, recheck_days * 86400):
+                if fetch:
+                    yield pid
+                else:
+                    cursor.mark_done(pid)
+                    skipped += 1
+                    pbar.update(1)
+        await run(sweep())
+    else:
+        await run(cursor.pending())
+    pbar.close()
+
+    finalize_run(sink, cursor, ori)
+    save_id_map(idmap, ori)
+    elapsed = time.time() - st
+    print(f"Finished! {total}개 id 중 {fetched}개 요청, {skipped}개 건너뜀, {elapsed:.1f}초, "
+          f"{fetched / max(elapsed, 1e-9):.1f} ids/sec (concurrency={concurrency})")
+    print(f"[ID-MAP] {idmap.summary()}")
+    
+
+async def main_discover(categories, brands, concurrency, max_pages=50, tag=None,
+                        listing_base=LISTING_BASE, product_base=PRODUCT_BASE):
+    # 목록 페이지에서 실제 상품번호만 모아서 그 id 들만 상세 파싱
+    tag = tag or time.strftime('%m_%d')
+    st = time.time()
+    session = make_requests_session(concurrency)
+    session.headers.update(HEADERS)
+    frontier = discover(listing_seeds(categories, brands, listing_base), session,
+                        Frontier(f'frontier_{tag}.txt'), max_pages=max_pages)
+    frontier.close()
+
+    sink = JsonlSink(
+        f'musinsa_discovered_{tag}',
+        upload=lambda p: upload_to_gcs(p, folder=f'temporarysaves/musinsa_discovered_{tag}'),
+    )
+    done = {record_product_id(r) for r in sink} if sink.count else set()
+    ids = [pid for pid in frontier if pid not in done]
+    print(f"[DISCOVER] frontier {len(frontier)}개, 이미 수집 {len(done)}개, 요청 {len(ids)}개 ({time.time() - st:.1f}초)")
+
+    pbar = tqdm(total=len(ids))
+    async for pid, url, info, image_urls, err in iter_products(ids, concurrency, session, product_base):
+        if err is None:
+            sink.append({**info, 'product_url': url, 'image_urls': image_urls})
+        pbar.update(1)
+    pbar.close()
+
+    done_path = sink.finalize(f'musinsa_discovered_{tag}_done.json')
+    upload_to_gcs(done_path, folder='temporarysaves')
+    print(f"Finished! {sink.count}개, {time.time() - st:.1f}초")
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Example with two arguments")
-    parser.add_argument("--fromn", type=int, required=True, help="Input file path")
-    parser.add_argument("--nums", type=int, required=True, help="Output file path")
+    parser.add_argument("--fromn", type=int, help="Input file path")
+    parser.add_argument("--nums", type=int, help="Output file path")
+    parser.add_argument("--start", type=int, default=None, help="시작 상품 id 를 직접 지정 (--fromn 배수 스킴 대신, supervisor 용)")
+    parser.add_argument("--lease_job", type=str, default=None, help="버킷 lease 로 여러 노드가 구간을 나눠 갖는 작업 이름")
+    parser.add_argument("--lease_range", type=str, default=None, help="--lease_job 의 전체 상품 id 구간 START:END")
+    parser.add_argument("--lease_chunk", type=int, default=5000, help="--lease_job 에서 한 번에 잡는 id 수")
+    parser.add_argument("--lease_sec", type=float, default=900, help="lease 만료 시간(초), 작업 중에는 자동 갱신")
+    parser.add_argument("--lease_bucket", type=str, default="vton-mss", help="lease 오브젝트를 둘 버킷")
+    parser.add_argument("--concurrency", type=int, default=16, help="동시 요청 수 (1이면 기존 순차 루프)")
+    parser.add_argument("--scan", action="store_true", help="dead id 는 건너뛰고, 희박한 block 은 샘플만 본 뒤 스윕")
+    parser.add_argument("--sample_every", type=int, default=20, help="--scan 샘플 간격")
+    parser.add_argument("--sparse_threshold", type=float, default=0.01, help="--scan 에서 이 밀도 미만인 block 은 스윕 생략")
+    parser.add_argument("--recheck_days", type=float, default=30.0, help="--scan 에서 이 기간 동안 다 훑지 않은 block 은 dead 도 다시 확인")
+    
+    parser.add_argument("--discover", action="store_true", help="id 를 증가시키는 대신 목록 페이지에서 상품번호 수집")
+    parser.add_argument("--categories", type=str, default="", help="--discover 카테고리 코드 (쉼표 구분)")
+    parser.add_argument("--brands", type=str, default="", help="--discover 브랜드 코드 (쉼표 구분)")
+    parser.add_argument("--max_pages", type=int, default=50, help="--discover seed 당 최대 페이지")
+    parser.add_argument("--tag", type=str, default=None, help="--discover 결과 파일 이름 (기본: 오늘 날짜)")
+    parser.add_argument("--listing_base", type=str, default=LISTING_BASE, help="목록 API 주소 (stand-in 서버용)")
+    parser.add_argument("--product_base", type=str, default=PRODUCT_BASE, help="상품 페이지 주소 (stand-in 서버용)")
     
     args = parser.parse_args()
 
-    main(args.fromn*200000 + 1000000, args.nums)
\ No newline at end of file
+    if args.discover:
+        asyncio.run(main_discover(args.categories.split(","), args.brands.split(","), max(args.concurrency, 1),
+                                  max_pages=args.max_pages, tag=args.tag,
+                                  listing_base=args.listing_base, product_base=args.product_base))
+    elif args.lease_job:
+        # 노드마다 --fromn 을 나눠 정하지 않고, 버킷 lease 로 남은 chunk 를 하나씩 잡아 처리
+        if not args.lease_range:
+            parser.error("--lease_job 에는 --lease_range START:END 가 필요합니다")
+        lo, hi = (int(x) for x in args.lease_range.split(":"))
+        leases = RangeLeases(get_bucket(args.lease_bucket), args.lease_job, lo, hi, args.lease_chunk,
+                             lease_sec=args.lease_sec)
+        if args.concurrency <= 1:
+            leases.run(main)
+        else:
+            leases.run(lambda s, n: asyncio.run(main_async(s, n, args.concurrency, scan=args.scan,
+                                                           sample_every=args.sample_every,
+                                                           sparse_threshold=args.sparse_threshold,
+                                                           recheck_days=args.recheck_days)))
+    elif (args.fromn is None and args.start is None) or args.nums is None:
+        parser.error("--fromn(또는 --start) 과 --nums 가 필요합니다 (--discover 제외)")
+    elif args.concurrency <= 1:
+        main(args.start if args.start is not None else args.fromn*200000 + 1000000, args.nums)
+    else:
+        asyncio.run(main_async(args.start if args.start is not None else args.fromn*200000 + 1000000,
+                               args.nums, args.concurrency,
+                               scan=args.scan, sample_every=args.sample_every, sparse_threshold=args.sparse_threshold,
+                               recheck_days=args.recheck_days))
\ No newline at end of file